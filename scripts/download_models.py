@@ -15,6 +15,7 @@ if __name__ == "__main__":
 from transformers import pipeline, VitsModel, AutoTokenizer
 from TTS.api import TTS
 import torch
+from src.config import WHISPER_MODELO
 
 def download_models():
     print("="*60)
@@ -26,7 +27,7 @@ def download_models():
     try:
         pipe_asr = pipeline(
             "automatic-speech-recognition",
-            model="openai/whisper-base",
+            model=WHISPER_MODELO,
             device=-1  # CPU para download
         )
         print("   ✓ Whisper baixado com sucesso!")
@@ -1,18 +1,52 @@
 
 import os
+import json
 import shutil
 import asyncio
+import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from typing import List
 
 # Importar lógica do pipeline
-from src.pipeline import executar_pipeline
-from src.config import OUTPUT_DIR, VIDEO_SAIDA_BASE
+from src.pipeline import executar_pipeline, caminhos_saida
+from src.config import (MOTOR_RENDER, DIARIZACAO, obter_device,
+                        JOBS_DIR, JOBS_DB, JOBS_WORKERS_GPU, JOBS_WORKERS_CPU)
 from src.services.youtube import baixar_video_youtube, validar_url_youtube
+from src.services.models import obter_registro
+from src.services.jobs import FilaJobs, PoolWorkers, CONCLUIDO, FALHOU
+from src.services.telemetria import obter_metricas, formatar_metrica
 
-app = FastAPI()
+fila_jobs = FilaJobs(JOBS_DB, JOBS_DIR)
+pool_workers = None
+recurso_jobs = None
+event_loop = None
+
+def recurso_do_host():
+    """
+    Pool que executa os jobs neste servidor: 'gpu' com CUDA, senão 'cpu'.
+
+    Todo job passa por Whisper, NLLB e TTS no dispositivo do host, então só
+    um pool recebe jobs: VIDEO_DUB_WORKERS_GPU workers com GPU ou
+    VIDEO_DUB_WORKERS_CPU sem ela. Importa o torch na primeira chamada.
+    """
+    return "gpu" if obter_device().startswith("cuda") else "cpu"
+
+@asynccontextmanager
+async def lifespan(app):
+    global pool_workers, recurso_jobs, event_loop
+    event_loop = asyncio.get_running_loop()
+    # A detecção do dispositivo importa o torch: fora do event loop
+    recurso_jobs = await asyncio.to_thread(recurso_do_host)
+    workers = {"gpu": JOBS_WORKERS_GPU, "cpu": JOBS_WORKERS_CPU}[recurso_jobs]
+    pool_workers = PoolWorkers(fila_jobs, executar_job, {recurso_jobs: workers})
+    pool_workers.iniciar()
+    yield
+    pool_workers.parar(timeout=5)
+
+app = FastAPI(lifespan=lifespan)
 
 # Configurar CORS (Permitir frontend rodando em outra porta)
 app.add_middleware(
@@ -55,12 +89,60 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
+def caminho_upload(upload_id):
+    """Arquivo de um upload (retornado por `/upload` ou `/download-youtube`)."""
+    return os.path.join(UPLOAD_DIR, f"{os.path.basename(upload_id)}.mp4")
+
+def publicar_log(msg, job_id=None):
+    """
+    Envia uma mensagem aos clientes WebSocket (seguro fora do event loop).
+
+    A mensagem vai como JSON `{"job_id": ..., "msg": ...}`: com vários jobs na
+    fila, cada cliente mostra só o log do job que ele enfileirou.
+    """
+    print(f"[{job_id or 'LOG'}] {msg}")
+    if event_loop:
+        payload = json.dumps({"job_id": job_id, "msg": msg}, ensure_ascii=False)
+        asyncio.run_coroutine_threadsafe(manager.broadcast(payload), event_loop)
+
+def executar_job(job):
+    """Executa um job da fila (chamado pelas threads do PoolWorkers)."""
+    p = job["parametros"]
+    
+    def progress_callback(msg):
+        publicar_log(msg, job["id"])
+        try:
+            fila_jobs.atualizar_progresso(job["id"], msg)
+        except Exception:
+            pass
+    
+    sucesso = executar_pipeline(
+        caminho_video=p["entrada"],
+        idioma_origem=p["idioma_origem"],
+        idioma_destino=p["idioma_destino"],
+        idioma_voz=p["idioma_voz"],
+        motor_tts=p["motor"],
+        modo_encoding=p["encoding"],
+        qwen3_mode=p["qwen3_mode"],
+        qwen3_speaker=p["qwen3_speaker"],
+        qwen3_instruct=p["qwen3_instruct"],
+        motor_render=p["motor_render"],
+        diretorio_saida=job["diretorio"],
+        retomar=p.get("retomar", False),
+        diarizar=p.get("diarizar"),
+        progress_callback=progress_callback
+    )
+    if not sucesso:
+        raise RuntimeError("Pipeline terminou com erro (ver progresso/logs).")
+    return {"video": caminhos_saida(job["diretorio"], p["motor"])["video"]}
+
 @app.post("/upload")
 async def upload_video(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, "video_entrada.mp4")
+    upload_id = uuid.uuid4().hex[:12]
+    file_path = caminho_upload(upload_id)
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
-    return {"filename": file.filename, "path": file_path}
+    return {"filename": file.filename, "path": file_path, "upload_id": upload_id}
 
 @app.post("/download-youtube")
 async def download_youtube(url: str = Form(...)):
@@ -77,22 +159,12 @@ async def download_youtube(url: str = Form(...)):
     if not validar_url_youtube(url):
         return {"status": "error", "message": "URL do YouTube inválida"}
     
-    file_path = os.path.join(UPLOAD_DIR, "video_entrada.mp4")
+    upload_id = uuid.uuid4().hex[:12]
+    file_path = caminho_upload(upload_id)
     
-    # Remover arquivo anterior se existir
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except:
-            pass
-    
-    # Obter o event loop atual
-    loop = asyncio.get_event_loop()
-    
-    # Callback para enviar progresso via WebSocket
+    # Callback para enviar progresso via WebSocket (sem job: fora do log dos jobs)
     def progress_callback(msg):
-        print(f"[YOUTUBE] {msg}")
-        asyncio.run_coroutine_threadsafe(manager.broadcast(msg), loop)
+        publicar_log(msg)
     
     # Função wrapper para rodar no executor
     def run_download():
@@ -102,7 +174,7 @@ async def download_youtube(url: str = Form(...)):
     success = await asyncio.to_thread(run_download)
     
     if success:
-        return {"status": "success", "path": file_path, "message": "Vídeo baixado com sucesso!"}
+        return {"status": "success", "path": file_path, "upload_id": upload_id, "message": "Vídeo baixado com sucesso!"}
     else:
         return {"status": "error", "message": "Falha ao baixar o vídeo do YouTube"}
 
@@ -112,52 +184,119 @@ async def process_video(
     encoding: str = Form(...),
     qwen3_mode: str = Form("custom"),
     qwen3_speaker: str = Form("vivian"),
-    qwen3_instruct: str = Form("")
+    qwen3_instruct: str = Form(""),
+    motor_render: str = Form(MOTOR_RENDER),
+    diarizar: bool = Form(DIARIZACAO),
+    upload_id: str = Form(...)
 ):
-    video_path = os.path.join(UPLOAD_DIR, "video_entrada.mp4")
+    """
+    Enfileira um job de dublagem e retorna imediatamente o seu ID.
+
+    O vídeo enviado é movido para o diretório do job, que recebe também todos
+    os arquivos intermediários e o resultado. Acompanhe via `/jobs/{job_id}`.
+    """
+    video_path = caminho_upload(upload_id)
     
     if not os.path.exists(video_path):
         return {"error": "Vídeo não encontrado via upload."}
 
-    # Obter o event loop atual
-    loop = asyncio.get_event_loop()
+    parametros = {
+        "idioma_origem": "eng_Latn",
+        "idioma_destino": "por_Latn",
+        "idioma_voz": "por",
+        "motor": motor,
+        "encoding": encoding,
+        "qwen3_mode": qwen3_mode,
+        "qwen3_speaker": qwen3_speaker,
+        "qwen3_instruct": qwen3_instruct,
+        "motor_render": motor_render,
+        "diarizar": diarizar,
+    }
+    job = await asyncio.to_thread(fila_jobs.criar, parametros, recurso_jobs, video_path)
+    pool_workers.notificar(recurso_jobs)
     
-    # Callback seguro para enviar mensagens via WebSocket
-    def progress_callback(msg):
-        print(f"[LOG] {msg}")
-        # Agendar broadcast no event loop de forma thread-safe
-        asyncio.run_coroutine_threadsafe(manager.broadcast(msg), loop)
-    
-    # Função wrapper para rodar no executor
-    def run_pipeline():
-        return executar_pipeline(
-            caminho_video=video_path,
-            idioma_origem="eng_Latn",
-            idioma_destino="por_Latn",
-            idioma_voz="por",
-            motor_tts=motor,
-            modo_encoding=encoding,
-            qwen3_mode=qwen3_mode,
-            qwen3_speaker=qwen3_speaker,
-            qwen3_instruct=qwen3_instruct,
-            progress_callback=progress_callback
-        )
+    return {
+        "status": "queued",
+        "job_id": job["id"],
+        "posicao": fila_jobs.posicao(job["id"]),
+        "status_url": f"/jobs/{job['id']}",
+        "video_url": f"/jobs/{job['id']}/result",
+    }
 
-    # Executa blocking code em outra thread
-    success = await asyncio.to_thread(run_pipeline)
-    
-    if success:
-        return {"status": "success", "video_url": f"/download/{motor}"}
-    else:
-        return {"status": "error"}
-
-@app.get("/download/{motor}")
-async def download_video(motor: str):
-    filename = f"video_dublado_{motor}.mp4"
-    path = os.path.join(OUTPUT_DIR, filename)
-    if os.path.exists(path):
-        return FileResponse(path, media_type="video/mp4", filename=filename)
-    return {"error": "File not found"}
+@app.get("/jobs")
+async def list_jobs(status: str = None):
+    """Lista os jobs mais recentes (opcionalmente filtrando por status)."""
+    return {"jobs": [_job_publico(j) for j in fila_jobs.listar(status=status)]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status de um job: pendente, executando, concluido ou falhou."""
+    job = fila_jobs.obter(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job não encontrado"})
+    return _job_publico(job)
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Reenfileira um job que falhou; ele recomeça da primeira etapa sem checkpoint válido."""
+    job = fila_jobs.obter(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job não encontrado"})
+    if job["status"] != FALHOU:
+        return JSONResponse(status_code=409, content={"error": f"Apenas jobs que falharam podem ser retomados ({job['status']})"})
+    job = await asyncio.to_thread(fila_jobs.reenfileirar, job_id, recurso_jobs)
+    if job is None:
+        return JSONResponse(status_code=409, content={"error": "Job mudou de estado"})
+    pool_workers.notificar(job["recurso"])
+    return _job_publico(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Vídeo dublado de um job concluído."""
+    job = fila_jobs.obter(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job não encontrado"})
+    if job["status"] != CONCLUIDO:
+        return JSONResponse(status_code=409, content={"error": f"Job não concluído ({job['status']})"})
+    path = job["resultado"]["video"]
+    if not os.path.exists(path):
+        return JSONResponse(status_code=404, content={"error": "File not found"})
+    return FileResponse(path, media_type="video/mp4", filename=f"video_dublado_{job_id}.mp4")
+
+def _job_publico(job):
+    """Campos do job expostos pela API (sem caminhos internos)."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "recurso": job["recurso"],
+        "motor": job["parametros"].get("motor"),
+        "progresso": job["progresso"],
+        "erro": job["erro"],
+        "posicao": fila_jobs.posicao(job["id"]),
+        "criado_em": job["criado_em"],
+        "iniciado_em": job["iniciado_em"],
+        "finalizado_em": job["finalizado_em"],
+        "video_url": f"/jobs/{job['id']}/result" if job["status"] == CONCLUIDO else None,
+    }
+
+@app.get("/api/models/stats")
+async def get_model_stats():
+    """Retorna estatísticas do registro de modelos (hits, misses, memória residente)."""
+    return obter_registro().estatisticas()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Métricas no formato Prometheus: spans por estágio, registro de modelos e fila de jobs."""
+    modelos = obter_registro().estatisticas()
+    linhas = []
+    for campo, tipo in [("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                        ("tempo_carga_s", "counter"), ("bytes_residentes", "gauge")]:
+        linhas += formatar_metrica(f"video_dub_modelos_{campo}", tipo, f"Registro de modelos: {campo}",
+                                   [({}, modelos[campo])])
+    jobs = fila_jobs.contar_por_status()
+    linhas += formatar_metrica("video_dub_jobs", "gauge", "Jobs por status",
+                               [({"status": status}, n) for status, n in sorted(jobs.items())])
+    return obter_metricas().prometheus() + "\n".join(linhas) + "\n"
 
 @app.get("/api/qwen3/speakers")
 async def get_qwen3_speakers():
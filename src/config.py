@@ -1,13 +1,116 @@
 
 import os
-import torch
 
 # ============================================================================
 # CONFIGURAÇÕES GERAIS
 # ============================================================================
 
-# Defina o dispositivo: "cuda:0" para GPU ou "cpu"
-DEVICE = "cuda:0" if torch.cuda.is_available() else "cpu"
+# Dispositivo: "cuda:0" para GPU ou "cpu". Detectado sob demanda (importar o
+# torch custa segundos); VIDEO_DUB_DEVICE força um valor sem importar o torch.
+_device = None
+
+def obter_device():
+    """Retorna o dispositivo de inferência, detectando-o na primeira chamada."""
+    global _device
+    if _device is None:
+        _device = os.environ.get("VIDEO_DUB_DEVICE")
+        if not _device:
+            import torch
+            _device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    return _device
+
+def __getattr__(nome):
+    # Compatibilidade: `from src.config import DEVICE` continua funcionando
+    if nome == "DEVICE":
+        return obter_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+# ============================================================================
+# REGISTRO DE MODELOS
+# ============================================================================
+# Modelos (Whisper, NLLB, MMS, Qwen3) ficam carregados entre execuções.
+# Orçamento de memória (MB) para modelos ociosos; acima dele, os menos usados
+# recentemente são descarregados. 0 = sem limite.
+MODEL_REGISTRY_BUDGET_MB = int(os.environ.get("VIDEO_DUB_MODEL_REGISTRY_BUDGET_MB", "0"))
+
+# ============================================================================
+# TELEMETRIA
+# ============================================================================
+# Intervalo (s) da amostragem de RSS e memória da GPU durante os spans abertos
+# (pico de cada estágio, ver `src.services.telemetria`).
+TELEMETRIA_AMOSTRAGEM_S = float(os.environ.get("VIDEO_DUB_TELEMETRIA_AMOSTRAGEM_S", "0.05"))
+
+# ============================================================================
+# TRANSCRIÇÃO (WHISPER)
+# ============================================================================
+# O áudio do vídeo é decodificado uma única vez, direto na taxa nativa do
+# Whisper (mono PCM16); transcrição, VAD e referência de voz leem esse WAV por
+# memory-map, sem decodificar o vídeo de novo.
+AUDIO_SR = 16000
+# Modelo Whisper (ID do Hugging Face) usado pelo pipeline; entra na chave de cache
+# e no checkpoint da transcrição.
+WHISPER_MODELO = os.environ.get("VIDEO_DUB_WHISPER_MODELO", "openai/whisper-base")
+# Áudios mais longos que isto são transcritos em janelas sobrepostas lidas por
+# memory-map (memória limitada, segmentos produzidos progressivamente).
+WHISPER_STREAMING_MIN_S = 20 * 60
+# Pré-filtro de fala (VAD por energia): só as regiões com fala vão ao Whisper,
+# em lotes de até WHISPER_VAD_LOTE regiões; silêncios longos deixam de custar
+# inferência (e de gerar alucinações). VIDEO_DUB_VAD=0 transcreve a faixa inteira.
+WHISPER_VAD = os.environ.get("VIDEO_DUB_VAD", "1") != "0"
+WHISPER_VAD_LOTE = 8
+# Agrupamento das palavras em segmentos de legenda (ver `PoliticaSegmentacao`):
+# um segmento fecha numa pausa longa, após pontuação final ou ao exceder a
+# duração / o número de caracteres máximos.
+SEGMENTO_MAX_CARACTERES = 80
+SEGMENTO_MAX_DURACAO = 7.0
+SEGMENTO_PAUSA_MIN = 0.5
+
+# ============================================================================
+# DIARIZAÇÃO (VÁRIOS FALANTES)
+# ============================================================================
+# Após a transcrição, os segmentos são agrupados por falante (embeddings de
+# voz + agrupamento aglomerativo) e cada falante é dublado com uma voz própria.
+# VIDEO_DUB_DIARIZACAO=1 ativa por padrão (também: --diarize / diarizar=True).
+DIARIZACAO = os.environ.get("VIDEO_DUB_DIARIZACAO", "0") == "1"
+# Modelo de embeddings x-vector; sem ele (offline, sem pesos) usa estatísticas
+# de MFCC, mais fracas porém sem modelo.
+DIARIZACAO_MODELO = "microsoft/wavlm-base-plus-sv"
+DIARIZACAO_LOTE = 32          # Segmentos por chamada do modelo de embeddings
+DIARIZACAO_MAX_S = 6.0        # Trecho central máximo de cada segmento usado no embedding
+DIARIZACAO_MIN_S = 0.8        # Segmentos mais curtos herdam o falante do vizinho mais próximo
+DIARIZACAO_LIMIAR = 0.35      # Distância de cosseno máxima para unir dois grupos (x-vectors)
+DIARIZACAO_LIMIAR_MFCC = 1.0  # Idem para os embeddings de MFCC (padronizados, mais dispersos)
+DIARIZACAO_MAX_FALANTES = 8
+
+# ============================================================================
+# TRADUÇÃO (NLLB)
+# ============================================================================
+# Batching dinâmico: segmentos ordenados por comprimento e agrupados em lotes
+# limitados pelo total de tokens (incluindo padding) e pelo número de itens.
+TRADUCAO_MAX_TOKENS_LOTE = 4096
+TRADUCAO_MAX_SEGMENTOS_LOTE = 64
+
+# ============================================================================
+# INFERÊNCIA EM CPU (WHISPER E NLLB SEM GPU)
+# ============================================================================
+# Backend usado quando não há GPU (ver `src.services.inferencia_cpu`):
+#   "torch" - pipelines float32 originais (padrão)
+#   "int8"  - quantização dinâmica int8 das camadas lineares (sem dependências extras)
+#   "onnx"  - modelos exportados para ONNX Runtime (requer `optimum`; exportados
+#             uma vez para MODELOS_ONNX_DIR)
+BACKEND_CPU = os.environ.get("VIDEO_DUB_BACKEND_CPU", "torch")
+# Threads intra-op por pipeline. 0 = CPUs disponíveis divididas entre os
+# workers de CPU do backend (JOBS_WORKERS_CPU).
+CPU_THREADS = int(os.environ.get("VIDEO_DUB_CPU_THREADS", "0"))
+
+# ============================================================================
+# SÍNTESE MMS-TTS (VITS)
+# ============================================================================
+# Tamanho máximo do lote de síntese; o lote efetivo é estimado a partir da
+# memória livre (~MMS_BYTES_POR_TOKEN por token do maior texto) e reduzido
+# pela metade a cada OOM.
+MMS_LOTE_MAX = 32
+MMS_BYTES_POR_TOKEN = 4 * 1024 * 1024
 
 # Qwen3-TTS Configuration
 # ============================================================================
@@ -15,6 +118,14 @@ QWEN3_DEFAULT_SPEAKER = "vivian"  # Lowercase conforme modelo
 QWEN3_MODELO_VARIANTE = "1.7B"
 QWEN3_MODEL_NAME = "Qwen/Qwen3-TTS-12Hz-1.7B-CustomVoice"
 
+# Síntese em lotes: segmentos ordenados por comprimento, até QWEN3_LOTE_MAX
+# por chamada (por variante do modelo) e QWEN3_CARACTERES_LOTE caracteres no
+# lote (maior texto x itens); o lote é reduzido pela metade a cada OOM. O log
+# de cada lote mostra a vazão (caracteres/s e segundos de áudio/s) para
+# calibrar estes valores.
+QWEN3_LOTE_MAX = {"0.6B": 16, "1.7B": 8}
+QWEN3_CARACTERES_LOTE = 2000
+
 # Speakers disponíveis para Qwen3-CustomVoice (APENAS os suportados pelo modelo)
 # Fonte: Modelo Qwen3-TTS-12Hz-1.7B-CustomVoice
 QWEN3_SPEAKERS = {
@@ -29,6 +140,16 @@ QWEN3_SPEAKERS = {
     "uncle_fu": "masculino, voz mais velha"
 }
 
+# Descrições de voz (VoiceDesign) atribuídas aos falantes da diarização; a
+# primeira é também a voz padrão quando não há instrução.
+QWEN3_INSTRUCOES_FALANTES = [
+    "Voz clara e natural, tom neutro e profissional",
+    "Voz masculina grave, ritmo calmo e articulado",
+    "Voz feminina jovem, tom leve e expressivo",
+    "Voz masculina jovem, tom casual e animado",
+    "Voz feminina madura, tom sereno e firme",
+]
+
 # ============================================================================
 # MODO OFFLINE - Desabilita verificação de internet para modelos Hugging Face
 # ============================================================================
@@ -49,6 +170,22 @@ INPUT_DIR = os.path.join(BASE_DIR, "input")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 YOUTUBE_DOWNLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 
+# Cache persistente de resultados (transcrição, tradução, TTS)
+# Inspecionar/limpar: python -m src.services.cache {info,purge}
+CACHE_ATIVO = os.environ.get("VIDEO_DUB_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get("VIDEO_DUB_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+CACHE_MAX_MB = int(os.environ.get("VIDEO_DUB_CACHE_MAX_MB", "4096"))  # 0 = sem limite
+
+# Modelos exportados para ONNX (BACKEND_CPU = "onnx")
+MODELOS_ONNX_DIR = os.environ.get("VIDEO_DUB_MODELOS_ONNX_DIR", os.path.join(BASE_DIR, "models_onnx"))
+
+# Fila de jobs do backend: cada job tem um diretório próprio em JOBS_DIR e o
+# estado persistido em SQLite (sobrevive a reinícios do servidor).
+JOBS_DIR = os.environ.get("VIDEO_DUB_JOBS_DIR", os.path.join(BASE_DIR, "jobs"))
+JOBS_DB = os.path.join(JOBS_DIR, "jobs.sqlite3")
+JOBS_WORKERS_GPU = int(os.environ.get("VIDEO_DUB_WORKERS_GPU", "1"))  # Jobs simultâneos na GPU
+JOBS_WORKERS_CPU = int(os.environ.get("VIDEO_DUB_WORKERS_CPU", "2"))  # Jobs simultâneos sem GPU
+
 # Garantir existência
 os.makedirs(INPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -73,6 +210,51 @@ IDIOMA_VOZ_PADRAO = "por"
 MOTORES_TTS = ["mms", "coqui", "qwen3"]
 MODOS_ENCODING = ["rapido", "qualidade"]
 
+# Motor de renderização: "ffmpeg" (filtergraph único, sem loop de quadros em
+# Python) ou "moviepy" (concatenate_videoclips)
+MOTORES_RENDER = ["ffmpeg", "moviepy"]
+MOTOR_RENDER = os.environ.get("VIDEO_DUB_RENDER", "ffmpeg")
+
+# Codificação do vídeo final: codec ("h264", "hevc" ou "av1"). Os encoders
+# disponíveis (CPU, NVENC, QSV, VAAPI) são sondados uma vez e o perfil vem
+# dessa sonda; VIDEO_DUB_ENCODER força um encoder (ex: "libx264").
+CODEC_VIDEO = os.environ.get("VIDEO_DUB_CODEC", "h264")
+ENCODER_VIDEO = os.environ.get("VIDEO_DUB_ENCODER", "")
+VAAPI_DISPOSITIVO = os.environ.get("VIDEO_DUB_VAAPI", "/dev/dri/renderD128")
+
+# Renderização em partes paralelas (encoders de CPU): o plano é dividido em
+# partes codificadas por processos FFmpeg simultâneos e emendadas sem
+# recodificar. VIDEO_DUB_RENDER_PARTES=0 decide pelo número de núcleos.
+RENDER_PARTES = int(os.environ.get("VIDEO_DUB_RENDER_PARTES", "0"))
+RENDER_THREADS_PARTE = 4     # Núcleos por parte no modo automático
+RENDER_PARTE_MIN_S = 20.0    # Duração mínima de uma parte (segundos de saída)
+
+# Encaixe da dublagem no tempo do vídeo: "audio" acelera a fala (WSOLA, sem
+# mudar o tom) até AJUSTE_ESTICAR_MAX e usa o silêncio vizinho, mantendo a
+# duração do vídeo original (o vídeo só é desacelerado em último caso);
+# "video" muda a velocidade de cada trecho do vídeo para casar com a fala.
+AJUSTES_TEMPO = ["audio", "video"]
+AJUSTE_TEMPO = os.environ.get("VIDEO_DUB_AJUSTE", "audio")
+AJUSTE_ESTICAR_MAX = 0.25    # Aceleração máxima da fala (1.25x)
+AJUSTE_ANTECIPAR_MAX = 0.3   # Segundos que a fala pode começar antes do segmento
+
+# Pipeline sobreposto: transcrição, tradução, TTS e montagem rodam como
+# estágios concorrentes ligados por filas limitadas (backpressure).
+PIPELINE_SOBREPOSTO = os.environ.get("VIDEO_DUB_SOBREPOSTO", "0") == "1"
+PIPELINE_FILA_MAX = 64   # Itens em espera entre dois estágios
+PIPELINE_LOTE_MAX = 16   # Micro-lote máximo de tradução/TTS
+
+# Lote de vídeos (`python src/main.py --batch`): extração (CPU), dublagem
+# (GPU) e render (CPU) de vídeos diferentes rodam ao mesmo tempo, com os
+# modelos carregados uma vez no registro.
+LOTE_EXTENSOES = (".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4v")
+LOTE_FILA_MAX = 1        # Vídeos prontos em espera entre dois estágios
+
+# Vários idiomas de destino (`executar_pipeline_multi`): extração e transcrição
+# uma vez, tradução num lote só, TTS + render de até ALVOS_PARALELOS idiomas
+# ao mesmo tempo.
+ALVOS_PARALELOS = int(os.environ.get("VIDEO_DUB_ALVOS_PARALELOS", "2"))
+
 # Configurações Qwen3-TTS
 QWEN3_DEFAULT_SPEAKER = "Vivian"  # Speaker padrão para português
 QWEN3_MODELO_VARIANTE = "1.7B"    # ou "0.6B" para menor uso de memória
@@ -0,0 +1,223 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from src.config import LOTE_EXTENSOES, LOTE_FILA_MAX
+from src.pipeline import caminhos_saida, executar_pipeline
+from src.pipeline_concorrente import FIM, PipelineCancelado, _Canal
+from src.services.models import obter_registro
+from src.services.video import VideoEditor
+
+# Estágios do lote, na ordem: (nome, `ate_etapa` do pipeline); extração e render na CPU, dublagem na GPU
+ESTAGIOS_LOTE = [("extracao", "extracao"), ("dublagem", "plano"), ("render", None)]
+
+
+def listar_videos(entrada):
+    """
+    Vídeos de um lote, em ordem.
+
+    Args:
+        entrada (str): Diretório (vídeos com extensão em LOTE_EXTENSOES, sem
+            descer em subdiretórios), padrão glob (ex: 'aulas/*.mp4') ou
+            manifesto: arquivo .txt com um caminho por linha (linhas vazias e
+            começando com '#' são ignoradas) ou .json com uma lista de
+            caminhos. Caminhos relativos do manifesto partem do diretório dele.
+
+    Returns:
+        list: Caminhos dos vídeos, sem repetições.
+
+    Raises:
+        FileNotFoundError: Entrada inexistente ou vídeo do manifesto ausente.
+    """
+    if os.path.isdir(entrada):
+        videos = sorted(os.path.join(entrada, nome) for nome in os.listdir(entrada)
+                        if nome.lower().endswith(LOTE_EXTENSOES))
+    elif os.path.isfile(entrada) and entrada.lower().endswith((".txt", ".json")):
+        with open(entrada, encoding="utf-8") as f:
+            if entrada.lower().endswith(".json"):
+                linhas = json.load(f)
+            else:
+                linhas = [l.strip() for l in f if l.strip() and not l.strip().startswith("#")]
+        base = os.path.dirname(os.path.abspath(entrada))
+        videos = [os.path.join(base, caminho) for caminho in linhas]
+        ausentes = [v for v in videos if not os.path.isfile(v)]
+        if ausentes:
+            raise FileNotFoundError(f"Vídeos do manifesto não encontrados: {', '.join(ausentes)}")
+    elif os.path.isfile(entrada):
+        videos = [entrada]
+    else:
+        videos = sorted(v for v in glob.glob(entrada) if os.path.isfile(v))
+        if not videos:
+            raise FileNotFoundError(f"Nenhum vídeo encontrado em: {entrada}")
+    return list(dict.fromkeys(os.path.abspath(v) for v in videos))
+
+
+def _diretorios_saida(videos, diretorio_saida):
+    """Um diretório de trabalho por vídeo, pelo nome do arquivo (sufixo se repetido)."""
+    diretorios, usados = [], set()
+    for video in videos:
+        nome = os.path.splitext(os.path.basename(video))[0]
+        candidato, n = nome, 2
+        while candidato in usados:
+            candidato, n = f"{nome}_{n}", n + 1
+        usados.add(candidato)
+        diretorios.append(os.path.join(diretorio_saida, candidato))
+    return diretorios
+
+
+def _duracao_video(caminho):
+    editor = VideoEditor(caminho)
+    try:
+        return editor.duration
+    finally:
+        editor.close()
+
+
+def executar_lote(videos, diretorio_saida, idioma_origem, idioma_destino, idioma_voz,
+                  motor_tts, modo_encoding, log_callback=None, retomar=False, **opcoes):
+    """
+    Dubla vários vídeos num único processo, sobrepondo os estágios.
+
+    Cada vídeo passa por três estágios, cada um numa thread própria ligada à
+    seguinte por uma fila limitada (LOTE_FILA_MAX): extração do áudio (CPU,
+    FFmpeg), dublagem (transcrição, tradução, TTS e plano de tempo; GPU) e
+    render (CPU, FFmpeg). Enquanto o vídeo N está na GPU, o N+1 é extraído e
+    o N-1 renderizado. Os estágios usam `executar_pipeline` com `ate_etapa` e
+    os checkpoints do diretório de cada vídeo; os modelos ficam carregados no
+    registro do processo entre um vídeo e outro. A falha de um vídeo não
+    interrompe os demais.
+
+    Args:
+        videos (list): Caminhos dos vídeos (ver `listar_videos`).
+        diretorio_saida (str): Diretório base; cada vídeo ganha um
+            subdiretório com o nome do arquivo.
+        idioma_origem (str): Código NLLB do idioma original.
+        idioma_destino (str): Código NLLB do idioma de destino.
+        idioma_voz (str): Código do idioma da voz gerada (ex: 'por').
+        motor_tts (str): Motor de TTS ('mms', 'coqui', 'qwen3').
+        modo_encoding (str): 'rapido' ou 'qualidade'.
+        log_callback (callable, optional): Função para logar mensagens.
+        retomar (bool): Reaproveita checkpoints de uma execução anterior.
+        **opcoes: Demais argumentos de `executar_pipeline` (ex: diarizar,
+            motor_render, qwen3_mode).
+
+    Returns:
+        list: Um dict por vídeo, na ordem de entrada: 'video', 'saida' (vídeo
+              final ou None), 'ok', 'erro', 'duracao_s' (do vídeo original) e
+              'tempos' (segundos em cada estágio).
+    """
+    def log(msg):
+        if log_callback: log_callback(msg)
+        else: print(msg)
+
+    resultados = [{"video": video, "saida": None, "ok": False, "erro": None, "duracao_s": None,
+                   "tempos": {}} for video in videos]
+    diretorios = _diretorios_saida(videos, diretorio_saida)
+    cancelar = threading.Event()
+    canais = [_Canal(cancelar, tamanho=LOTE_FILA_MAX) for _ in ESTAGIOS_LOTE[1:]]
+    erros = []
+
+    def processar(n, nome, ate_etapa):
+        resultado = resultados[n]
+        inicio = time.time()
+        try:
+            if nome == "extracao":
+                resultado["duracao_s"] = _duracao_video(resultado["video"])
+            ok = executar_pipeline(resultado["video"], idioma_origem, idioma_destino, idioma_voz,
+                                   motor_tts, modo_encoding, diretorio_saida=diretorios[n],
+                                   retomar=retomar or nome != "extracao", ate_etapa=ate_etapa, **opcoes)
+            if not ok:
+                resultado["erro"] = f"falha na etapa '{nome}'"
+        except Exception as e:
+            ok = False
+            resultado["erro"] = f"{nome}: {e}"
+        resultado["tempos"][nome] = time.time() - inicio
+        if not ok:
+            log(f"   ❌ [{n + 1}/{len(videos)}] {os.path.basename(resultado['video'])}: {resultado['erro']}")
+        return ok
+
+    def estagio(i, nome, ate_etapa):
+        def alvo():
+            entrada = canais[i - 1] if i > 0 else None
+            saida = canais[i] if i < len(canais) else None
+            try:
+                pendentes = iter(range(len(videos)))
+                while True:
+                    n = entrada.retirar() if entrada else next(pendentes, FIM)
+                    if n is FIM:
+                        break
+                    # Vídeo que falhou num estágio anterior só segue para constar do resumo
+                    if resultados[n]["erro"] is None and processar(n, nome, ate_etapa) and saida is None:
+                        resultados[n]["ok"] = True
+                        resultados[n]["saida"] = caminhos_saida(diretorios[n], motor_tts)["video"]
+                        log(f"   ✅ [{n + 1}/{len(videos)}] {os.path.basename(resultados[n]['video'])}")
+                    if saida: saida.colocar(n)
+                if saida: saida.colocar(FIM)
+            except PipelineCancelado:
+                pass
+            except Exception as e:
+                erros.append(e)
+                cancelar.set()
+        return threading.Thread(target=alvo, name=f"lote-{nome}", daemon=True)
+
+    log(f"📚 Lote: {len(videos)} vídeos -> {diretorio_saida}")
+    os.makedirs(diretorio_saida, exist_ok=True)
+    inicio = time.time()
+    threads = [estagio(i, nome, ate_etapa) for i, (nome, ate_etapa) in enumerate(ESTAGIOS_LOTE)]
+    for t in threads: t.start()
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(timeout=0.5)
+    except BaseException:
+        cancelar.set()
+        raise
+    if erros:
+        raise erros[0]
+
+    total = time.time() - inicio
+    tabela = resumo_lote(resultados, total)
+    log(tabela)
+    log(f"   📊 {obter_registro().resumo()}")
+    with open(os.path.join(diretorio_saida, "resumo_lote.txt"), "w", encoding="utf-8") as f:
+        f.write(tabela + "\n")
+    return resultados
+
+
+def resumo_lote(resultados, total_s):
+    """
+    Formata a tabela de tempos por vídeo e a vazão do lote.
+
+    Args:
+        resultados (list): Saída de `executar_lote`.
+        total_s (float): Tempo de parede do lote inteiro.
+
+    Returns:
+        str: Tabela com, por vídeo, a duração, o tempo de cada estágio e a
+             velocidade (segundos de vídeo por segundo de processamento), e
+             uma linha de totais com a vazão do lote.
+    """
+    estagios = [nome for nome, _ in ESTAGIOS_LOTE]
+    titulos = {"extracao": "Extração", "dublagem": "Dublagem", "render": "Render"}
+    linhas = [f"   {'Vídeo':<28} {'Duração':>8} " + " ".join(f"{titulos[nome]:>9}" for nome in estagios)
+              + f" {'Total':>9} {'Veloc.':>7}  Status"]
+    for r in resultados:
+        nome = os.path.basename(r["video"])
+        nome = nome if len(nome) <= 28 else nome[:25] + "..."
+        soma = sum(r["tempos"].values())
+        duracao = r["duracao_s"] or 0.0
+        tempos = " ".join(f"{r['tempos'][e]:>8.1f}s" if e in r["tempos"] else f"{'-':>9}" for e in estagios)
+        velocidade = f"{duracao / soma:>6.2f}x" if r["ok"] and soma > 0 else f"{'-':>7}"
+        status = "ok" if r["ok"] else f"falhou ({r['erro']})"
+        linhas.append(f"   {nome:<28} {duracao:>7.1f}s {tempos} {soma:>8.1f}s {velocidade}  {status}")
+
+    concluidos = [r for r in resultados if r["ok"]]
+    video_s = sum(r["duracao_s"] or 0.0 for r in concluidos)
+    sequencial = sum(sum(r["tempos"].values()) for r in resultados)
+    linhas.append(f"   {len(concluidos)}/{len(resultados)} vídeos em {total_s:.1f}s "
+                  f"({video_s / total_s if total_s > 0 else 0.0:.2f}x tempo real, "
+                  f"{len(concluidos) * 60 / total_s if total_s > 0 else 0.0:.2f} vídeos/min); "
+                  f"soma dos estágios {sequencial:.1f}s")
+    return "\n".join(linhas)
@@ -1,15 +1,18 @@
 
 import os
 import sys
+import argparse
 
 # Adicionar diretório raiz ao path para imports funcionarem
 if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.config import *
-from src.pipeline import executar_pipeline
+from src.pipeline import executar_pipeline, executar_pipeline_multi
+from src.lote import executar_lote, listar_videos
+from src.services.models import obter_registro
 
-def menu():
+def menu(retomar=False, diarizar=None, destinos=None, multipistas=False):
     print("\n" + "="*50)
     print("   DUBBLER PRO (MODULAR v2.0)")
     print("="*50)
@@ -26,8 +29,8 @@ def menu():
         motor = "mms"
     
     print("\nModo de Encoding:")
-    print("1. Rápido (GPU NVENC) - Recomendado")
-    print("2. Qualidade (CPU libx264) - Lento")
+    print("1. Rápido (GPU NVENC/QSV/VAAPI, se houver) - Recomendado")
+    print("2. Qualidade (CPU libx264/libx265/SVT-AV1) - Lento")
     
     enc_opt = input("Escolha (1 ou 2): ").strip()
     encoding = "qualidade" if enc_opt == "2" else "rapido"
@@ -36,19 +39,86 @@ def menu():
         print(f"Erro: {VIDEO_ENTRADA} não encontrado.")
         return
         
+    if destinos:
+        resultado = executar_pipeline_multi(
+            caminho_video=VIDEO_ENTRADA,
+            idioma_origem=IDIOMA_ORIGEM,
+            alvos=[{"idioma_destino": destino, "motor_tts": motor} for destino in destinos],
+            modo_encoding=encoding,
+            retomar=retomar,
+            diarizar=diarizar,
+            multipistas=multipistas
+        )
+        for rotulo, video in resultado["videos"].items():
+            print(f"   {'✅' if video else '❌'} {rotulo}: {video or 'falhou'}")
+        if resultado["multipistas"]:
+            print(f"   🎚️ Multipistas: {resultado['multipistas']}")
+        print(f"\n📊 {obter_registro().resumo()}")
+        return
+    
     sucesso = executar_pipeline(
         caminho_video=VIDEO_ENTRADA,
         idioma_origem=IDIOMA_ORIGEM,
         idioma_destino=IDIOMA_DESTINO,
         idioma_voz="por",
         motor_tts=motor,
-        modo_encoding=encoding
+        modo_encoding=encoding,
+        retomar=retomar,
+        diarizar=diarizar
     )
     
     if sucesso:
         print("\n✅ Processo concluído com sucesso!")
     else:
         print("\n❌ Falha no processo.")
+    
+    print(f"\n📊 {obter_registro().resumo()}")
+
+def lote(args):
+    """Modo não interativo: dubla todos os vídeos de `args.batch` (ver `src.lote`)."""
+    try:
+        videos = listar_videos(args.batch)
+    except FileNotFoundError as e:
+        print(f"Erro: {e}")
+        return 1
+    if not videos:
+        print(f"Erro: nenhum vídeo em {args.batch}.")
+        return 1
+    
+    resultados = executar_lote(
+        videos,
+        diretorio_saida=args.output,
+        idioma_origem=args.source_lang,
+        idioma_destino=args.target_lang,
+        idioma_voz=args.voice_lang or args.target_lang.split("_")[0],
+        motor_tts=args.engine,
+        modo_encoding=args.encoding,
+        retomar=args.resume,
+        diarizar=args.diarize
+    )
+    return 0 if all(r["ok"] for r in resultados) else 1
 
 if __name__ == "__main__":
-    menu()
+    parser = argparse.ArgumentParser(description="Dubbler Pro - dublagem automática de vídeos")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma a execução anterior a partir dos checkpoints válidos em output/")
+    parser.add_argument("--diarize", action="store_true", default=None,
+                        help="Identifica os falantes e dubla cada um com uma voz própria")
+    parser.add_argument("--batch", metavar="ENTRADA",
+                        help="Dubla vários vídeos sem menu: diretório, padrão glob ou manifesto (.txt/.json)")
+    parser.add_argument("--source-lang", default=IDIOMA_ORIGEM, help="Idioma original (código NLLB)")
+    parser.add_argument("--target-lang", default=IDIOMA_DESTINO, help="Idioma de destino (código NLLB)")
+    parser.add_argument("--voice-lang", help="Idioma da voz (default: prefixo do idioma de destino)")
+    parser.add_argument("--engine", choices=MOTORES_TTS, default="mms", help="Motor de TTS")
+    parser.add_argument("--encoding", choices=MODOS_ENCODING, default="rapido", help="Modo de encoding")
+    parser.add_argument("--output", default=OUTPUT_DIR,
+                        help="Diretório de saída do lote (um subdiretório por vídeo)")
+    parser.add_argument("--targets", metavar="IDIOMAS",
+                        help="Dubla para vários idiomas com uma só transcrição (ex: por_Latn,spa_Latn,fra_Latn)")
+    parser.add_argument("--multitrack", action="store_true",
+                        help="Com --targets, gera também um MP4 com uma pista de áudio e legenda por idioma")
+    args = parser.parse_args()
+    if args.batch:
+        sys.exit(lote(args))
+    destinos = [d.strip() for d in args.targets.split(",") if d.strip()] if args.targets else None
+    menu(retomar=args.resume, diarizar=args.diarize, destinos=destinos, multipistas=args.multitrack)
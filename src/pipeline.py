@@ -1,17 +1,55 @@
 
+import glob
 import os
-import shutil
-import time
+from concurrent.futures import ThreadPoolExecutor
 from src.config import *
-from src.services.audio import extrair_referencia_voz, extrair_audio, transcrever_audio_whisper
-from src.services.translation import traduzir_segmentos
+from src.services.audio import (extrair_referencia_voz, extrair_audio, transcrever_audio_whisper,
+                                PoliticaSegmentacao)
+from src.services.translation import traduzir_multi, traduzir_segmentos, MODELO_TRADUCAO
 from src.services.tts import TTSEngine
-from src.services.video import VideoEditor
+from src.services.diarizacao import diarizar_segmentos, extrair_referencias_falantes, mapear_vozes
+from src.services.video import VideoEditor, multiplexar_pistas
+from src.services.models import obter_registro
+from src.pipeline_concorrente import dublar_sobreposto, resumo_estagios
+from src.services.telemetria import Rastreador, span
+from src.services.checkpoints import ManifestoJob, fingerprint_arquivo
+from src.services.cache import chave_cache
+from src.services.inferencia_cpu import identificador_modelo
 from src.utils import segmentos_para_srt
 
+# Etapas em que uma execução parcial pode parar (None = pipeline completo)
+ETAPAS_PARCIAIS = (None, "extracao", "transcricao", "plano")
+
+def caminhos_saida(diretorio_saida, motor_tts):
+    """
+    Caminhos dos arquivos gerados por uma execução do pipeline.
+
+    Args:
+        diretorio_saida (str): Diretório de trabalho da execução (criado se necessário).
+        motor_tts (str): Motor de TTS (compõe o nome do vídeo final).
+
+    Returns:
+        dict: Caminhos 'audio_extraido', 'audio_referencia', 'legenda_original',
+              'legenda_traduzida', 'legenda_final', 'video', 'trace' e
+              'diretorio' (onde fica o manifesto de checkpoints).
+    """
+    os.makedirs(diretorio_saida, exist_ok=True)
+    return {
+        "diretorio": diretorio_saida,
+        "audio_extraido": os.path.join(diretorio_saida, os.path.basename(AUDIO_EXTRAIDO)),
+        "audio_referencia": os.path.join(diretorio_saida, os.path.basename(AUDIO_REFERENCIA)),
+        "legenda_original": os.path.join(diretorio_saida, os.path.basename(LEGENDA_ORIGINAL)),
+        "legenda_traduzida": os.path.join(diretorio_saida, os.path.basename(LEGENDA_TRADUZIDA)),
+        "legenda_final": os.path.join(diretorio_saida, os.path.basename(LEGENDA_FINAL)),
+        "video": os.path.join(diretorio_saida, f"{os.path.basename(VIDEO_SAIDA_BASE)}_{motor_tts}.mp4"),
+        "trace": os.path.join(diretorio_saida, f"trace_{motor_tts}.json"),
+    }
+
 def executar_pipeline(caminho_video, idioma_origem, idioma_destino, idioma_voz, 
                      motor_tts, modo_encoding, progress_callback=None,
-                     qwen3_mode="custom", qwen3_speaker="vivian", qwen3_instruct=""):
+                     qwen3_mode="custom", qwen3_speaker="vivian", qwen3_instruct="",
+                     motor_render=None, sobreposto=None, diretorio_saida=None, retomar=False,
+                     diarizar=None, ate_etapa=None, arquivos_compartilhados=None):
     """
     Pipeline principal de dublagem de vídeo.
 
@@ -26,10 +64,39 @@ def executar_pipeline(caminho_video, idioma_origem, idioma_destino, idioma_voz,
         qwen3_mode (str): Modalidade Qwen3 ('custom', 'design', 'clone').
         qwen3_speaker (str): Speaker para CustomVoice (ex: 'Vivian').
         qwen3_instruct (str): Instrução de voz para CustomVoice/VoiceDesign.
+        motor_render (str, optional): 'ffmpeg' (filtergraph único) ou 'moviepy'.
+            Default: MOTOR_RENDER em config.
+        sobreposto (bool, optional): Executa transcrição, tradução e TTS como
+            estágios concorrentes (ver `src.pipeline_concorrente`).
+            Default: PIPELINE_SOBREPOSTO em config.
+        diretorio_saida (str, optional): Diretório dos arquivos gerados (áudio,
+            legendas, vídeo). Default: OUTPUT_DIR em config.
+        retomar (bool): Reaproveita os checkpoints válidos de uma execução
+            anterior no mesmo diretório e recomeça da primeira etapa cujo
+            checkpoint esteja ausente ou inválido (ver `src.services.checkpoints`).
+        diarizar (bool, optional): Identifica os falantes após a transcrição e
+            dubla cada um com uma voz própria (ver `src.services.diarizacao`).
+            Incompatível com o modo sobreposto, que é desativado.
+            Default: DIARIZACAO em config.
+        ate_etapa (str, optional): Para após a etapa dada e deixa as seguintes
+            para outra chamada com `retomar=True`: 'extracao' (etapa 1),
+            'transcricao' (etapa 2 e a diarização) ou 'plano' (etapas 2 a 4 e
+            o plano de tempo, sem o render). Usado pelo lote de vídeos (ver
+            `src.lote`) e por `executar_pipeline_multi`.
+        arquivos_compartilhados (dict, optional): Caminhos de `caminhos_saida`
+            que ficam fora do diretório de saída (ex: áudio extraído e
+            referência de voz comuns a vários idiomas).
 
     Returns:
         bool: True se o pipeline foi executado com sucesso, False caso contrário.
+
+    Cada etapa é medida (ver `src.services.telemetria`); o trace JSON da
+    execução é salvo em `trace_{motor}.json` no diretório de saída
+    (`trace_{motor}_{ate_etapa}.json` numa execução parcial).
     """
+    if ate_etapa not in ETAPAS_PARCIAIS:
+        raise ValueError(f"Etapa inválida: {ate_etapa}")
+
     def log(msg):
         print(msg)
         if progress_callback:
@@ -37,86 +104,481 @@ def executar_pipeline(caminho_video, idioma_origem, idioma_destino, idioma_voz,
                 progress_callback(msg)
             except: pass
 
+    motor_render = motor_render or MOTOR_RENDER
+    if sobreposto is None: sobreposto = PIPELINE_SOBREPOSTO
+    if diarizar is None: diarizar = DIARIZACAO
+    
     log("="*60)
-    log(f"PIPELINE WEB: {motor_tts.upper()} | {modo_encoding.upper()}")
+    log(f"PIPELINE WEB: {motor_tts.upper()} | {modo_encoding.upper()} | {motor_render.upper()}")
     log("="*60)
     
-    # 0. Limpeza prévia
-    nome_saida = f"{VIDEO_SAIDA_BASE}_{motor_tts}.mp4"
-    if os.path.exists(nome_saida):
-        try: os.remove(nome_saida)
-        except: pass
-    
-    # Limpeza de arquivos de legenda e áudio antigos
-    for arquivo in [AUDIO_REFERENCIA, AUDIO_EXTRAIDO, LEGENDA_ORIGINAL, LEGENDA_TRADUZIDA, LEGENDA_FINAL]:
-        if os.path.exists(arquivo):
+    # 0. Limpeza prévia (ao retomar, os arquivos intermediários são checkpoints)
+    arquivos = caminhos_saida(diretorio_saida or OUTPUT_DIR, motor_tts)
+    manifesto = ManifestoJob(arquivos["diretorio"])
+    if retomar:
+        log(f"♻️ Retomando a partir dos checkpoints em {arquivos['diretorio']}")
+    else:
+        manifesto.limpar()
+        nome_saida = arquivos["video"]
+        if os.path.exists(nome_saida):
+            try: os.remove(nome_saida)
+            except: pass
+        
+        # Limpeza de arquivos de legenda e áudio antigos
+        for chave in ["audio_referencia", "audio_extraido", "legenda_original", "legenda_traduzida", "legenda_final"]:
+            arquivo = arquivos[chave]
+            if os.path.exists(arquivo):
+                try: os.remove(arquivo)
+                except: pass
+        raiz_referencia = os.path.splitext(arquivos["audio_referencia"])[0]
+        for arquivo in glob.glob(f"{glob.escape(raiz_referencia)}_falante*.wav"):
             try: os.remove(arquivo)
             except: pass
+    arquivos.update(arquivos_compartilhados or {})
+
+    with Rastreador("pipeline", motor_tts=motor_tts, motor_render=motor_render,
+                    modo_encoding=modo_encoding, sobreposto=sobreposto, retomar=retomar,
+                    diarizar=diarizar, ate_etapa=ate_etapa) as rastreador:
+        ok = _executar_etapas(caminho_video, idioma_origem, idioma_destino, idioma_voz,
+                              motor_tts, modo_encoding, motor_render, sobreposto, arquivos, log,
+                              qwen3_mode, qwen3_speaker, qwen3_instruct, manifesto, diarizar, ate_etapa)
+    
+    caminho_trace = arquivos["trace"]
+    if ate_etapa:
+        caminho_trace = f"{os.path.splitext(caminho_trace)[0]}_{ate_etapa}.json"
+    try:
+        rastreador.salvar_json(caminho_trace)
+    except Exception as e:
+        log(f"   ⚠️ Falha ao salvar trace: {e}")
+    log("   ⏱️ Tempo por estágio:")
+    log(rastreador.resumo())
+    return ok
+
+
+def _normalizar_alvos(alvos):
+    """Alvos de `executar_pipeline_multi` com os defaults preenchidos e um rótulo único cada."""
+    normalizados, rotulos = [], []
+    for alvo in alvos:
+        alvo = {"idioma_voz": alvo["idioma_destino"].split("_")[0], "motor_tts": "mms", "qwen3_mode": "custom",
+                "qwen3_speaker": "vivian", "qwen3_instruct": "", **alvo}
+        rotulo, n = f"{alvo['idioma_destino']}_{alvo['motor_tts']}", 2
+        while rotulo in rotulos:
+            rotulo, n = f"{alvo['idioma_destino']}_{alvo['motor_tts']}_{n}", n + 1
+        normalizados.append(alvo)
+        rotulos.append(rotulo)
+    return normalizados, rotulos
+
+
+def executar_pipeline_multi(caminho_video, idioma_origem, alvos, modo_encoding, progress_callback=None,
+                            motor_render=None, diretorio_saida=None, retomar=False, diarizar=None,
+                            multipistas=False, paralelos=None):
+    """
+    Dubla um vídeo para vários idiomas a partir de uma única transcrição.
+
+    A extração do áudio e a transcrição (e a diarização) rodam uma vez, no
+    diretório de saída; as traduções para todos os idiomas saem de uma única
+    chamada de `traduzir_multi`; TTS, plano e render rodam por alvo, em
+    paralelo, cada um num subdiretório próprio cujo manifesto de checkpoints
+    é semeado com as etapas comuns (ver `executar_pipeline`).
+
+    Args:
+        caminho_video (str): Caminho do vídeo de entrada.
+        idioma_origem (str): Código do idioma original (ex: 'eng_Latn').
+        alvos (list): Dicts com 'idioma_destino' (código NLLB) e, opcionais,
+            'idioma_voz' (default: prefixo do destino), 'motor_tts' (default
+            'mms'), 'qwen3_mode', 'qwen3_speaker' e 'qwen3_instruct'.
+        modo_encoding (str): Modo de codificação ('rapido' ou 'qualidade').
+        progress_callback (callable, optional): Função para notificar progresso.
+        motor_render (str, optional): 'ffmpeg' ou 'moviepy'. Default: MOTOR_RENDER.
+        diretorio_saida (str, optional): Diretório das etapas comuns; cada alvo
+            ganha o subdiretório '{idioma_destino}_{motor_tts}'. Default: OUTPUT_DIR.
+        retomar (bool): Reaproveita os checkpoints válidos de uma execução anterior.
+        diarizar (bool, optional): Ver `executar_pipeline`. Default: DIARIZACAO.
+        multipistas (bool): Gera também 'video_dublado_multi.mp4' com uma pista
+            de áudio e uma de legenda por alvo. Requer que todas as dublagens
+            mantenham o vídeo original (ver `VideoEditor.mantem_video`).
+        paralelos (int, optional): Alvos sintetizados e renderizados ao mesmo
+            tempo. Default: ALVOS_PARALELOS em config.
+
+    Returns:
+        dict: {'videos': {rótulo do alvo: vídeo final ou None se falhou},
+               'multipistas': MP4 multipistas ou None}.
+    """
+    def log(msg):
+        print(msg)
+        if progress_callback:
+            try:
+                progress_callback(msg)
+            except: pass
+
+    motor_render = motor_render or MOTOR_RENDER
+    if diarizar is None: diarizar = DIARIZACAO
+    alvos, rotulos = _normalizar_alvos(alvos)
+    base = diretorio_saida or OUTPUT_DIR
+    resultado = {"videos": {rotulo: None for rotulo in rotulos}, "multipistas": None}
+
+    def impressoes(alvo):
+        return _fingerprints(caminho_video, idioma_origem, alvo["idioma_destino"], alvo["idioma_voz"],
+                             alvo["motor_tts"], modo_encoding, motor_render, alvo["qwen3_mode"],
+                             alvo["qwen3_speaker"], alvo["qwen3_instruct"], diarizar)
+
+    def executar(alvo, **kwargs):
+        return executar_pipeline(caminho_video, idioma_origem, modo_encoding=modo_encoding,
+                                 progress_callback=progress_callback, motor_render=motor_render,
+                                 sobreposto=False, diarizar=diarizar, **alvo, **kwargs)
+
+    log("=" * 60)
+    log(f"PIPELINE MULTI-IDIOMA: {', '.join(rotulos)}")
+    log("=" * 60)
+
+    # 1-2. Etapas comuns; um alvo com Voice Clone (se houver) faz extrair a referência de voz
+    comum = next((a for a in alvos if a["motor_tts"] == "qwen3" and a["qwen3_mode"] == "clone"), alvos[0])
+    if not executar(comum, diretorio_saida=base, retomar=retomar, ate_etapa="transcricao"):
+        log("❌ Falha nas etapas comuns (extração/transcrição).")
+        return resultado
+    compartilhados = caminhos_saida(base, comum["motor_tts"])
+    manifesto = ManifestoJob(base)
+    fp = impressoes(comum)
+    comuns = {etapa: manifesto.carregar_json(etapa, fp[etapa])
+              for etapa in (["transcricao", "diarizacao"] if diarizar else ["transcricao"])}
+    segmentos = comuns["diarizacao"]["segmentos"] if diarizar else comuns["transcricao"]
+
+    # Manifestos dos alvos semeados com as etapas comuns (o áudio fica no diretório base)
+    diretorios = [os.path.join(base, rotulo) for rotulo in rotulos]
+    manifestos = [ManifestoJob(diretorio) for diretorio in diretorios]
+    fps = [impressoes(alvo) for alvo in alvos]
+    for m, f in zip(manifestos, fps):
+        if not retomar:
+            m.limpar()
+        m.registrar("extracao", f["extracao"], compartilhados["audio_extraido"])
+        if manifesto.valido("referencia", fp["referencia"]):
+            m.registrar("referencia", f["referencia"], compartilhados["audio_referencia"])
+        for etapa, valor in comuns.items():
+            m.salvar_json(etapa, f[etapa], valor)
+
+    # 3. Tradução para todos os idiomas que ainda não têm checkpoint, numa chamada só
+    faltam = [alvo["idioma_destino"] for alvo, m, f in zip(alvos, manifestos, fps)
+              if not m.valido("traducao", f["traducao"])]
+    if faltam:
+        log(f"3. Traduzindo para {', '.join(dict.fromkeys(faltam))} (NLLB, lote multi-idioma)...")
+        traducoes = traduzir_multi(segmentos, idioma_origem, faltam, log_callback=log)
+        for alvo, m, f in zip(alvos, manifestos, fps):
+            if alvo["idioma_destino"] in traducoes and not m.valido("traducao", f["traducao"]):
+                m.salvar_json("traducao", f["traducao"], traducoes[alvo["idioma_destino"]])
+
+    # 4-5. TTS, plano e render por alvo, em paralelo
+    arquivos_comuns = {chave: compartilhados[chave] for chave in ("audio_extraido", "audio_referencia")}
+    paralelos = max(1, min(paralelos or ALVOS_PARALELOS, len(alvos)))
+    log(f"4-5. Sintetizando e renderizando {len(alvos)} idiomas ({paralelos} em paralelo)...")
+    with ThreadPoolExecutor(max_workers=paralelos) as pool:
+        concluidos = list(pool.map(lambda par: executar(par[0], diretorio_saida=par[1], retomar=True,
+                                                        arquivos_compartilhados=arquivos_comuns),
+                                   zip(alvos, diretorios)))
+    for rotulo, alvo, diretorio, ok in zip(rotulos, alvos, diretorios, concluidos):
+        resultado["videos"][rotulo] = caminhos_saida(diretorio, alvo["motor_tts"])["video"] if ok else None
+        log(f"   {'✅' if ok else '❌'} {rotulo}")
+
+    if multipistas:
+        resultado["multipistas"] = _multiplexar_alvos(caminho_video, alvos, rotulos, diretorios, fps,
+                                                      resultado["videos"], base, log)
+    return resultado
+
+
+def _multiplexar_alvos(caminho_video, alvos, rotulos, diretorios, fps, videos, base, log):
+    """MP4 com uma pista de áudio e legenda por alvo concluído, se todos mantiveram o vídeo original."""
+    prontos = [n for n, rotulo in enumerate(rotulos) if videos[rotulo]]
+    if not prontos:
+        return None
+    editor = VideoEditor(caminho_video)
+    try:
+        # Manifestos relidos: os planos foram gravados pelas execuções de cada alvo
+        planos = [ManifestoJob(diretorios[n]).carregar_json("plano", fps[n]["plano"]) for n in prontos]
+        mantido = all(p is not None and editor.mantem_video(p["plano"]) for p in planos)
+    finally:
+        editor.close()
+    if not mantido:
+        log("   ⚠️ Multipistas: alguma dublagem alterou o tempo do vídeo; mantidos os MP4 por idioma.")
+        return None
+
+    pistas = []
+    for n in prontos:
+        legenda = caminhos_saida(diretorios[n], alvos[n]["motor_tts"])["legenda_final"]
+        pistas.append({"video": videos[rotulos[n]], "legenda": legenda if os.path.exists(legenda) else None,
+                       "idioma": alvos[n]["idioma_destino"].split("_")[0], "titulo": rotulos[n]})
+    saida = os.path.join(base, f"{os.path.basename(VIDEO_SAIDA_BASE)}_multi.mp4")
+    return saida if multiplexar_pistas(pistas[0]["video"], pistas, saida, log_callback=log) else None
+
+
+def _fingerprints(caminho_video, idioma_origem, idioma_destino, idioma_voz, motor_tts,
+                  modo_encoding, motor_render, qwen3_mode, qwen3_speaker, qwen3_instruct, diarizar=False):
+    """
+    Impressões digitais encadeadas das entradas de cada etapa: mudar um
+    parâmetro invalida a etapa que o usa e todas as seguintes.
+    """
+    fp = {"extracao": chave_cache("extracao", fingerprint_arquivo(caminho_video), AUDIO_SR)}
+    fp["referencia"] = chave_cache("referencia", fp["extracao"])
+    fp["transcricao"] = chave_cache("transcricao", fp["extracao"], identificador_modelo(WHISPER_MODELO),
+                                    *PoliticaSegmentacao().parametros(), WHISPER_VAD)
+    diarizacao = [DIARIZACAO_MODELO, DIARIZACAO_LIMIAR, DIARIZACAO_MIN_S] if diarizar else []
+    fp["diarizacao"] = chave_cache("diarizacao", fp["transcricao"], *diarizacao)
+    fp["traducao"] = chave_cache("traducao", fp["diarizacao"], idioma_origem, idioma_destino,
+                                 identificador_modelo(MODELO_TRADUCAO))
+    voz = [qwen3_mode, qwen3_speaker, qwen3_instruct] if motor_tts == "qwen3" else []
+    fp["tts"] = chave_cache("tts", fp["traducao"], motor_tts, idioma_voz, *voz)
+    ajuste = [AJUSTE_TEMPO] + ([AJUSTE_ESTICAR_MAX, AJUSTE_ANTECIPAR_MAX] if AJUSTE_TEMPO == "audio" else [])
+    fp["plano"] = chave_cache("plano", fp["tts"], *ajuste)
+    fp["render"] = chave_cache("render", fp["plano"], modo_encoding, motor_render)
+    return fp
+
+
+def _executar_etapas(caminho_video, idioma_origem, idioma_destino, idioma_voz,
+                     motor_tts, modo_encoding, motor_render, sobreposto, arquivos, log,
+                     qwen3_mode, qwen3_speaker, qwen3_instruct, manifesto, diarizar=False, ate_etapa=None):
+    """
+    Etapas 1 a 5 do pipeline (ver `executar_pipeline`).
 
+    Cada etapa concluída grava um checkpoint no manifesto; etapas com
+    checkpoint válido (mesma impressão digital) são puladas.
+    """
+    fp = _fingerprints(caminho_video, idioma_origem, idioma_destino, idioma_voz, motor_tts,
+                       modo_encoding, motor_render, qwen3_mode, qwen3_speaker, qwen3_instruct, diarizar)
+    
     # 1. Extração de Áudio
-    log("1. Extraindo áudio original...")
-    if not extrair_audio(caminho_video, AUDIO_EXTRAIDO, log_callback=log): 
-        log("❌ Falha na extração de áudio.")
-        return False
+    if manifesto.valido("extracao", fp["extracao"]):
+        log("1. ♻️ Áudio original: checkpoint válido.")
+    else:
+        log("1. Extraindo áudio original...")
+        with span("extracao_audio"):
+            extraido = extrair_audio(caminho_video, arquivos["audio_extraido"], log_callback=log)
+        if not extraido: 
+            log("❌ Falha na extração de áudio.")
+            return False
+        manifesto.registrar("extracao", fp["extracao"], arquivos["audio_extraido"])
     
     # Extração de referência de voz para Voice Clone (Qwen3)
-    if motor_tts == "qwen3" and qwen3_mode == "clone":
+    if motor_tts == "qwen3" and qwen3_mode == "clone" and not manifesto.valido("referencia", fp["referencia"]):
         log("1.1. Extraindo referência de voz (Voice Clone)...")
-        extrair_referencia_voz(caminho_video, AUDIO_REFERENCIA, log_callback=log)
+        with span("referencia_voz"):
+            if extrair_referencia_voz(arquivos["audio_extraido"], arquivos["audio_referencia"], log_callback=log):
+                manifesto.registrar("referencia", fp["referencia"], arquivos["audio_referencia"])
+    if ate_etapa == "extracao":
+        return True
+    
+    # O modo sobreposto só compensa partindo da transcrição; com checkpoints
+    # intermediários válidos, as etapas restantes rodam em sequência. A
+    # diarização precisa da transcrição inteira, então também a dispensa.
+    if sobreposto and diarizar:
+        log("   ⚠️ Diarização ativa: o modo sobreposto é desativado.")
+    elif sobreposto and ate_etapa != "transcricao" and not manifesto.valido("transcricao", fp["transcricao"]):
+        return _executar_sobreposto(caminho_video, idioma_origem, idioma_destino, idioma_voz,
+                                    motor_tts, modo_encoding, motor_render, arquivos, log,
+                                    qwen3_mode, qwen3_speaker, qwen3_instruct, manifesto, fp, ate_etapa)
         
     # 2. Transcrição
-    log("2. Transcrevendo áudio (Whisper)...")
-    segmentos = transcrever_audio_whisper(AUDIO_EXTRAIDO, log_callback=log)
-    if not segmentos: 
-        log("❌ Nenhum diálogo detectado ou falha na transcrição.")
-        return False
+    segmentos = manifesto.carregar_json("transcricao", fp["transcricao"])
+    if segmentos is not None:
+        log(f"2. ♻️ Transcrição: checkpoint válido ({len(segmentos)} segmentos).")
+    else:
+        log("2. Transcrevendo áudio (Whisper)...")
+        with span("transcricao") as sp:
+            segmentos = transcrever_audio_whisper(arquivos["audio_extraido"], modelo=WHISPER_MODELO, log_callback=log)
+            sp.definir(itens=len(segmentos or []))
+        if not segmentos: 
+            log("❌ Nenhum diálogo detectado ou falha na transcrição.")
+            return False
+        manifesto.salvar_json("transcricao", fp["transcricao"], segmentos)
     
     # Salvar legenda original
-    with open(LEGENDA_ORIGINAL, "w", encoding="utf-8") as f:
+    with open(arquivos["legenda_original"], "w", encoding="utf-8") as f:
         f.write(segmentos_para_srt(segmentos))
     
+    # 2.1. Diarização: falante de cada segmento e referência de voz de cada falante
+    vozes = None
+    if diarizar:
+        diarizacao = manifesto.carregar_json("diarizacao", fp["diarizacao"])
+        if diarizacao is not None and all(r is None or os.path.exists(r) for r in diarizacao["referencias"]):
+            log("2.1. ♻️ Diarização: checkpoint válido.")
+        else:
+            log("2.1. Identificando falantes (diarização)...")
+            with span("diarizacao", itens=len(segmentos)) as sp:
+                segmentos_falantes = diarizar_segmentos(arquivos["audio_extraido"], segmentos, log_callback=log)
+                referencias = extrair_referencias_falantes(arquivos["audio_extraido"], segmentos_falantes,
+                                                           arquivos["audio_referencia"], log_callback=log)
+                sp.definir(falantes=len(referencias))
+            diarizacao = {"segmentos": segmentos_falantes, "referencias": referencias}
+            manifesto.salvar_json("diarizacao", fp["diarizacao"], diarizacao)
+        segmentos = diarizacao["segmentos"]
+        vozes = mapear_vozes(len(diarizacao["referencias"]), motor_tts, qwen3_mode, qwen3_speaker,
+                             qwen3_instruct, diarizacao["referencias"])
+        if len(diarizacao["referencias"]) > 1 and not vozes:
+            log(f"   ⚠️ {motor_tts.upper()} tem uma única voz por idioma: todos os falantes usam a mesma voz.")
+    if ate_etapa == "transcricao":
+        return True
+    
     # 3. Tradução
-    log(f"3. Traduzindo para {idioma_destino} (NLLB)...")
-    seg_traduzidos = traduzir_segmentos(segmentos, idioma_origem, idioma_destino, log_callback=log)
+    seg_traduzidos = manifesto.carregar_json("traducao", fp["traducao"])
+    if seg_traduzidos is not None:
+        log("3. ♻️ Tradução: checkpoint válido.")
+    else:
+        log(f"3. Traduzindo para {idioma_destino} (NLLB)...")
+        with span("traducao", itens=len(segmentos)):
+            seg_traduzidos = traduzir_segmentos(segmentos, idioma_origem, idioma_destino, log_callback=log)
+        manifesto.salvar_json("traducao", fp["traducao"], seg_traduzidos)
     
     # Salvar legenda traduzida
-    with open(LEGENDA_TRADUZIDA, "w", encoding="utf-8") as f:
+    with open(arquivos["legenda_traduzida"], "w", encoding="utf-8") as f:
         f.write(segmentos_para_srt(seg_traduzidos))
     
     # 4. Síntese TTS
-    log(f"4. Sintetizando Voz ({motor_tts})...")
+    audios = manifesto.carregar_audios("tts", fp["tts"])
+    if audios is not None:
+        log(f"4. ♻️ Síntese de voz: checkpoint válido ({len(audios)} áudios).")
+    else:
+        log(f"4. Sintetizando Voz ({motor_tts})...")
+        tts = TTSEngine(
+            motor=motor_tts, 
+            idioma=idioma_voz, 
+            ref_wav=arquivos["audio_referencia"],
+            log_callback=log,
+            qwen3_mode=qwen3_mode,
+            qwen3_speaker=qwen3_speaker,
+            qwen3_instruct=qwen3_instruct,
+            vozes=vozes
+        )
+        
+        textos = [s["text"] for s in seg_traduzidos]
+        falantes = [s.get("falante", 0) for s in seg_traduzidos] if vozes else None
+        
+        # Retorna lista de (audio_np, sample_rate)
+        log(f"   Gerando áudio para {len(textos)} segmentos...")
+        try:
+            with span("tts", itens=len(textos), motor=motor_tts):
+                if falantes:
+                    audios = tts.sintetizar_batch(textos, falantes=falantes)
+                else:
+                    audios = tts.sintetizar_batch(textos)
+        finally:
+            tts.liberar()
+        manifesto.salvar_audios("tts", fp["tts"], audios)
+    
+    # 5. Edição de Vídeo
+    if manifesto.valido("render", fp["render"]):
+        log("5. ♻️ Vídeo final: checkpoint válido, nada a refazer.")
+        log(f"✅ Pipeline concluída com sucesso!")
+        return True
+    
+    log("5. Editando e Sincronizando Vídeo...")
+    editor = VideoEditor(caminho_video)
+    retomado = manifesto.carregar_plano(fp["plano"], audios)
+    if retomado is not None:
+        log("   ♻️ Plano de tempo: checkpoint válido.")
+        plano, legendas_sync = retomado
+    else:
+        try:
+            with span("planejamento", itens=len(seg_traduzidos)):
+                plano, legendas_sync = editor.planejar_segmentos(seg_traduzidos, audios, log_callback=log)
+        except Exception as e:
+            editor.close()
+            log(f"❌ Falha na edição: {e}")
+            return False
+        manifesto.salvar_plano(fp["plano"], plano, legendas_sync)
+    if ate_etapa == "plano":
+        editor.close()
+        return True
+    return _renderizar(editor, plano, legendas_sync, arquivos, modo_encoding, motor_render, log,
+                       manifesto, fp["render"])
+
+
+def _executar_sobreposto(caminho_video, idioma_origem, idioma_destino, idioma_voz,
+                         motor_tts, modo_encoding, motor_render, arquivos, log,
+                         qwen3_mode, qwen3_speaker, qwen3_instruct, manifesto, fp, ate_etapa=None):
+    """
+    Etapas 2 a 5 com transcrição, tradução e TTS sobrepostas: o plano de
+    tempo do vídeo fica pronto quando o último segmento é sintetizado.
+    Os checkpoints das etapas 2 a 4 são gravados ao final.
+    """
+    log(f"2-4. Transcrevendo, traduzindo ({idioma_destino}) e sintetizando ({motor_tts}) em paralelo...")
     tts = TTSEngine(
         motor=motor_tts, 
         idioma=idioma_voz, 
-        ref_wav=AUDIO_REFERENCIA,
+        ref_wav=arquivos["audio_referencia"],
         log_callback=log,
         qwen3_mode=qwen3_mode,
         qwen3_speaker=qwen3_speaker,
         qwen3_instruct=qwen3_instruct
     )
+    editor = VideoEditor(caminho_video)
     
-    textos = [s["text"] for s in seg_traduzidos]
+    try:
+        with span("sobreposto") as sp:
+            segmentos, seg_traduzidos, plano, legendas_sync, estatisticas = dublar_sobreposto(
+                arquivos["audio_extraido"], editor, tts, idioma_origem, idioma_destino,
+                modelo_whisper=WHISPER_MODELO, log_callback=log)
+            sp.definir(itens=len(segmentos))
+    except Exception as e:
+        log(f"❌ Falha no pipeline sobreposto: {e}")
+        editor.close()
+        return False
+    finally:
+        tts.liberar()
+    log(resumo_estagios(estatisticas))
     
-    # Retorna lista de (audio_np, sample_rate)
-    log(f"   Gerando áudio para {len(textos)} segmentos...")
-    audios = tts.sintetizar_batch(textos)
+    if not segmentos:
+        log("❌ Nenhum diálogo detectado ou falha na transcrição.")
+        editor.close()
+        return False
     
-    # 5. Edição de Vídeo
-    log("5. Editando e Sincronizando Vídeo...")
-    editor = VideoEditor(caminho_video)
-    temp_files = []
+    with open(arquivos["legenda_original"], "w", encoding="utf-8") as f:
+        f.write(segmentos_para_srt(segmentos))
+    with open(arquivos["legenda_traduzida"], "w", encoding="utf-8") as f:
+        f.write(segmentos_para_srt(seg_traduzidos))
+    
+    # Segmentos fora do plano (fora do vídeo ou curtos demais) não precisam do
+    # áudio: ao replanejar a partir do checkpoint eles são descartados de novo.
+    audios = [(None, None)] * len(seg_traduzidos)
+    for item in plano:
+        if item["indice"] is None: continue
+        audios[item["indice"]] = (item["audio"], item["sr"])
+    manifesto.salvar_json("transcricao", fp["transcricao"], segmentos)
+    manifesto.salvar_json("traducao", fp["traducao"], seg_traduzidos)
+    manifesto.salvar_audios("tts", fp["tts"], audios)
+    manifesto.salvar_plano(fp["plano"], plano, legendas_sync)
+    if ate_etapa == "plano":
+        editor.close()
+        return True
+    
+    log("5. Renderizando vídeo sincronizado...")
+    return _renderizar(editor, plano, legendas_sync, arquivos, modo_encoding, motor_render, log,
+                       manifesto, fp["render"])
+
+
+def _renderizar(editor, plano, legendas_sync, arquivos, modo_encoding, motor_render, log,
+                manifesto=None, fingerprint=None):
+    """Renderiza o plano de tempo, salva o SRT final e fecha o editor."""
+    nome_saida = arquivos["video"]
     ok = False
     
     try:
-        clips, temp_wavs, legendas_sync = editor.processar_segmentos(seg_traduzidos, audios, log_callback=log)
-        temp_files.extend(temp_wavs)
-        
-        log(f"   Renderizando vídeo final: {os.path.basename(nome_saida)}")
-        ok = editor.renderizar_video(clips, nome_saida, modo=modo_encoding, log_callback=log)
+        with span("render", itens=len(plano), motor=motor_render):
+            if motor_render == "ffmpeg" and editor.preserva_tempo(plano):
+                # Tempo do original mantido: cópia do vídeo, recodificando só GOPs alterados
+                log(f"   Renderizando vídeo final (FFmpeg, cópia do vídeo): {os.path.basename(nome_saida)}")
+                ok = editor.renderizar_preservando(plano, nome_saida, modo=modo_encoding, log_callback=log)
+            elif motor_render == "ffmpeg":
+                log(f"   Renderizando vídeo final (FFmpeg): {os.path.basename(nome_saida)}")
+                ok = editor.renderizar_ffmpeg(plano, nome_saida, modo=modo_encoding, log_callback=log)
+            else:
+                clips = editor.clips_do_plano(plano)
+                trilha = editor.montar_trilha(plano)
+                
+                log(f"   Renderizando vídeo final: {os.path.basename(nome_saida)}")
+                ok = editor.renderizar_video(clips, nome_saida, modo=modo_encoding, log_callback=log, trilha=trilha)
         if ok:
             # Salvar SRT final
-            with open(LEGENDA_FINAL, "w", encoding="utf-8") as f:
+            with open(arquivos["legenda_final"], "w", encoding="utf-8") as f:
                 f.write(segmentos_para_srt(legendas_sync))
+            if manifesto is not None:
+                manifesto.registrar("render", fingerprint, nome_saida)
             log(f"✅ Pipeline concluída com sucesso!")
             
     except Exception as e:
@@ -127,14 +589,6 @@ def executar_pipeline(caminho_video, idioma_origem, idioma_destino, idioma_voz,
         
     finally:
         editor.close()
-        # Limpeza robusta
-        log("   🧹 Limpando arquivos temporários...")
-        for f in temp_files:
-            try:
-                if os.path.exists(f): os.remove(f)
-            except: 
-                time.sleep(0.5)
-                try: os.remove(f)
-                except: pass
+        log(f"   📊 {obter_registro().resumo()}")
                 
     return ok
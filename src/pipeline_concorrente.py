@@ -0,0 +1,326 @@
+import contextvars
+import queue
+import threading
+import time
+
+from src.config import AJUSTE_TEMPO, PIPELINE_FILA_MAX, PIPELINE_LOTE_MAX, WHISPER_MODELO
+from src.services.audio import (transcrever_audio_whisper_stream, transcrever_regioes_fala,
+                                chave_transcricao, vad_aplicavel)
+from src.services.cache import obter_cache
+from src.services.translation import traduzir_segmentos
+from src.services.telemetria import span
+
+# Marcador de fim de fluxo entre estágios
+FIM = object()
+
+
+class PipelineCancelado(Exception):
+    """Um estágio falhou ou o pipeline foi cancelado."""
+
+
+class EstatisticasEstagio:
+    """Tempo ocupado/ocioso e itens processados por um estágio."""
+    def __init__(self, nome):
+        self.nome = nome
+        self.ocupado_s = 0.0
+        self.ocioso_s = 0.0
+        self.itens = 0
+
+    @property
+    def utilizacao(self):
+        total = self.ocupado_s + self.ocioso_s
+        return self.ocupado_s / total if total > 0 else 0.0
+
+    def como_dict(self):
+        return {
+            "estagio": self.nome,
+            "ocupado_s": round(self.ocupado_s, 2),
+            "ocioso_s": round(self.ocioso_s, 2),
+            "itens": self.itens,
+            "utilizacao": round(self.utilizacao, 3),
+        }
+
+
+class _Canal:
+    """
+    Fila limitada entre dois estágios, com cancelamento cooperativo.
+
+    `colocar` bloqueia quando a fila está cheia (backpressure) e `retirar`
+    quando está vazia; ambos desistem se o evento de cancelamento for ativado.
+    """
+    def __init__(self, cancelar, tamanho=PIPELINE_FILA_MAX):
+        self._fila = queue.Queue(maxsize=tamanho)
+        self._cancelar = cancelar
+
+    def colocar(self, item, stats=None):
+        inicio = time.time()
+        while True:
+            if self._cancelar.is_set():
+                raise PipelineCancelado()
+            try:
+                self._fila.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        if stats: stats.ocioso_s += time.time() - inicio
+
+    def retirar(self, stats=None):
+        inicio = time.time()
+        while True:
+            if self._cancelar.is_set():
+                raise PipelineCancelado()
+            try:
+                item = self._fila.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        if stats: stats.ocioso_s += time.time() - inicio
+        return item
+
+    def retirar_lote(self, maximo, stats=None):
+        """
+        Retira um item (bloqueando) e, sem bloquear, os que já estiverem
+        disponíveis, até `maximo`. Retorna (itens, fim_do_fluxo).
+        """
+        primeiro = self.retirar(stats)
+        if primeiro is FIM:
+            return [], True
+        itens = [primeiro]
+        while len(itens) < maximo:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is FIM:
+                return itens, True
+            itens.append(item)
+        return itens, False
+
+
+def executar_estagios_sobrepostos(segmentos_iter, traduzir, sintetizar, montar, log_callback=None,
+                                  tamanho_lote=PIPELINE_LOTE_MAX):
+    """
+    Executa transcrição → tradução → TTS → montagem como estágios concorrentes.
+
+    Cada segmento finalizado pelo Whisper entra numa fila limitada; um worker
+    de tradução, um de TTS e o montador da linha do tempo consomem as filas
+    ao mesmo tempo, processando em micro-lotes o que já estiver disponível.
+    Filas cheias bloqueiam o estágio anterior (backpressure). Uma exceção em
+    qualquer estágio cancela os demais.
+
+    Args:
+        segmentos_iter (iterable): Segmentos {'start', 'end', 'text'} da
+            transcrição (ex: gerador de `transcrever_audio_whisper_stream`).
+        traduzir (callable): list[seg] -> list[seg traduzido].
+        sintetizar (callable): list[str] -> list[(audio, sr)].
+        montar (callable): Recebe (seg_traduzido, (audio, sr)) em ordem.
+        log_callback (callable, optional): Função para logar mensagens.
+        tamanho_lote (int): Máximo de segmentos por micro-lote.
+
+    Returns:
+        list: EstatisticasEstagio de cada estágio (transcrição, tradução, TTS, montagem).
+
+    Raises:
+        Exception: A primeira exceção levantada por um dos estágios.
+    """
+    cancelar = threading.Event()
+    erros = []
+    para_traducao = _Canal(cancelar)
+    para_tts = _Canal(cancelar)
+    para_montagem = _Canal(cancelar)
+
+    stats = {nome: EstatisticasEstagio(nome) for nome in ("transcricao", "traducao", "tts", "montagem")}
+
+    def executar(nome, corpo):
+        def alvo():
+            inicio = time.time()
+            try:
+                with span(f"estagio.{nome}") as sp:
+                    corpo(stats[nome])
+                    sp.definir(itens=stats[nome].itens)
+            except PipelineCancelado:
+                pass
+            except Exception as e:
+                erros.append(e)
+                if log_callback: log_callback(f"   ❌ Estágio '{nome}' falhou: {e}")
+                cancelar.set()
+            finally:
+                total = time.time() - inicio
+                stats[nome].ocupado_s = max(0.0, total - stats[nome].ocioso_s)
+        # Copia o contexto para que os spans da thread entrem no rastreador ativo
+        contexto = contextvars.copy_context()
+        return threading.Thread(target=contexto.run, args=(alvo,), name=f"estagio-{nome}", daemon=True)
+
+    def transcricao(st):
+        iterador = iter(segmentos_iter)
+        try:
+            while True:
+                if cancelar.is_set():
+                    raise PipelineCancelado()
+                try:
+                    seg = next(iterador)
+                except StopIteration:
+                    break
+                st.itens += 1
+                para_traducao.colocar(seg, st)
+            para_traducao.colocar(FIM, st)
+        finally:
+            # Fecha o gerador (libera o modelo Whisper) também em caso de cancelamento
+            fechar = getattr(iterador, "close", None)
+            if fechar: fechar()
+
+    def traducao(st):
+        while True:
+            lote, fim = para_traducao.retirar_lote(tamanho_lote, st)
+            if lote:
+                for seg in traduzir(lote):
+                    st.itens += 1
+                    para_tts.colocar(seg, st)
+            if fim:
+                para_tts.colocar(FIM, st)
+                return
+
+    def tts(st):
+        while True:
+            lote, fim = para_tts.retirar_lote(tamanho_lote, st)
+            if lote:
+                audios = sintetizar([seg["text"] for seg in lote])
+                for seg, audio in zip(lote, audios):
+                    st.itens += 1
+                    para_montagem.colocar((seg, audio), st)
+            if fim:
+                para_montagem.colocar(FIM, st)
+                return
+
+    def montagem(st):
+        while True:
+            item = para_montagem.retirar(st)
+            if item is FIM:
+                return
+            montar(*item)
+            st.itens += 1
+
+    threads = [
+        executar("transcricao", transcricao),
+        executar("traducao", traducao),
+        executar("tts", tts),
+        executar("montagem", montagem),
+    ]
+    for t in threads: t.start()
+    try:
+        for t in threads:
+            while t.is_alive():
+                t.join(timeout=0.5)
+    except BaseException:
+        # Ex: KeyboardInterrupt no thread principal
+        cancelar.set()
+        raise
+
+    if erros:
+        raise erros[0]
+    return [stats[nome] for nome in ("transcricao", "traducao", "tts", "montagem")]
+
+
+def resumo_estagios(estatisticas):
+    """Formata a tabela de tempo ocupado/ocioso por estágio."""
+    linhas = [f"   {'Estágio':<12} {'Ocupado':>9} {'Ocioso':>9} {'Itens':>6} {'Uso':>5}"]
+    for st in estatisticas:
+        linhas.append(f"   {st.nome:<12} {st.ocupado_s:>8.1f}s {st.ocioso_s:>8.1f}s {st.itens:>6} {st.utilizacao:>5.0%}")
+    gargalo = max(estatisticas, key=lambda st: st.ocupado_s)
+    linhas.append(f"   Gargalo: {gargalo.nome}")
+    return "\n".join(linhas)
+
+
+def _fonte_transcricao(caminho_audio, modelo, log_callback=None):
+    """
+    Gera os segmentos da transcrição: do cache, se houver, ou do Whisper sobre
+    as regiões com fala (`transcrever_regioes_fala`) ou em janelas
+    (`transcrever_audio_whisper_stream`), salvando no cache ao final.
+    """
+    vad = vad_aplicavel(caminho_audio)
+    cache = obter_cache()
+    chave = chave_transcricao(caminho_audio, modelo, vad) if cache else None
+    if cache:
+        segmentos = cache.obter_json("transcricao", chave)
+        if segmentos is not None:
+            if log_callback: log_callback(f"   ♻️ Transcrição em cache: {len(segmentos)} segmentos.")
+            yield from segmentos
+            return
+
+    segmentos = []
+    if vad:
+        gerador = transcrever_regioes_fala(caminho_audio, modelo, log_callback=log_callback)
+    else:
+        gerador = transcrever_audio_whisper_stream(caminho_audio, modelo, log_callback=log_callback)
+    try:
+        for seg in gerador:
+            segmentos.append(seg)
+            yield seg
+    finally:
+        gerador.close()
+    if cache and segmentos:
+        cache.salvar_json("transcricao", chave, segmentos)
+
+
+def dublar_sobreposto(caminho_audio, editor, tts, idioma_origem, idioma_destino,
+                      modelo_whisper=WHISPER_MODELO, log_callback=None):
+    """
+    Etapas 2 a 4 do pipeline (transcrição, tradução, TTS) sobrepostas, com o
+    plano de tempo do vídeo montado incrementalmente. No ajuste pelo áudio
+    (AJUSTE_TEMPO='audio') o encaixe de cada fala depende do segmento
+    seguinte, e o plano é calculado quando o último áudio chega.
+
+    Args:
+        caminho_audio (str): WAV extraído do vídeo.
+        editor (VideoEditor): Editor do vídeo de entrada (usado para planejar).
+        tts (TTSEngine): Motor de TTS já configurado.
+        idioma_origem (str): Código NLLB do idioma original.
+        idioma_destino (str): Código NLLB do idioma de destino.
+        modelo_whisper (str, optional): ID do modelo Whisper.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Returns:
+        tuple: (segmentos, seg_traduzidos, plano, novas_legendas, estatisticas)
+    """
+    segmentos = []
+    seg_traduzidos = []
+    plano = []
+    novas_legendas = []
+    tempo_acumulado = [0.0]
+    recebidos = [0]
+
+    def fonte():
+        for seg in _fonte_transcricao(caminho_audio, modelo_whisper, log_callback):
+            segmentos.append(seg)
+            yield seg
+
+    def traduzir(lote):
+        traduzidos = traduzir_segmentos(lote, idioma_origem, idioma_destino, log_callback=log_callback)
+        seg_traduzidos.extend(traduzidos)
+        return traduzidos
+
+    montados = []
+
+    def montar(seg, audio):
+        if AJUSTE_TEMPO == "audio":
+            montados.append((seg, audio))
+            return
+        audio_data, sr = audio
+        item = editor.planejar_item(recebidos[0], seg, audio_data, sr)
+        recebidos[0] += 1
+        if item is None: return
+        plano.append(item)
+        novas_legendas.append({
+            "start": tempo_acumulado[0],
+            "end": tempo_acumulado[0] + item["duracao"],
+            "text": seg["text"]
+        })
+        tempo_acumulado[0] += item["duracao"]
+
+    estatisticas = executar_estagios_sobrepostos(fonte(), traduzir, tts.sintetizar_batch, montar,
+                                                 log_callback=log_callback)
+    if montados:
+        plano, novas_legendas = editor.planejar_segmentos([seg for seg, _ in montados],
+                                                          [audio for _, audio in montados],
+                                                          log_callback=log_callback)
+    return segmentos, seg_traduzidos, plano, novas_legendas, estatisticas
@@ -1,21 +1,28 @@
 
 import os
-import torch
 import subprocess
-from transformers import pipeline
-from src.config import DEVICE
+from bisect import bisect_right
+from itertools import chain, compress
+import numpy as np
+from src.config import (obter_device, AUDIO_SR, WHISPER_STREAMING_MIN_S, WHISPER_VAD, WHISPER_VAD_LOTE,
+                        WHISPER_MODELO, SEGMENTO_MAX_CARACTERES, SEGMENTO_MAX_DURACAO, SEGMENTO_PAUSA_MIN)
 from src.utils import obter_ffmpeg_exe
+from src.services.models import obter_registro
+from src.services.cache import obter_cache, chave_cache, hash_arquivo
+from src.services.telemetria import span
+from src.services.vad import detectar_fala
+from src.services.inferencia_cpu import backend_efetivo, criar_pipeline_cpu, identificador_modelo
 
-FFMPEG_EXE = obter_ffmpeg_exe()
 
-def extrair_referencia_voz(caminho_video, caminho_saida, duracao=10, log_callback=None):
+def extrair_referencia_voz(caminho_audio, caminho_saida, duracao=10, log_callback=None):
     """
-    Extrai os primeiros segundos de áudio do vídeo para usar como referência de clonagem.
+    Recorta os primeiros segundos do áudio extraído para usar como referência de clonagem.
     
-    Usado principalmente pelo Coqui TTS para capturar o timbre original da voz.
+    Usado principalmente pelo Coqui/Qwen3 TTS para capturar o timbre original da voz.
+    Lê o WAV de `extrair_audio` por memory-map: o vídeo não é decodificado de novo.
 
     Args:
-        caminho_video (str): Path do vídeo de entrada.
+        caminho_audio (str): Path do áudio extraído (ver `extrair_audio`).
         caminho_saida (str): Path onde o áudio de referência será salvo (.wav).
         duracao (int, optional): Duração em segundos do trecho a extrair. Default: 10s.
         log_callback (callable, optional): Função para logar mensagens.
@@ -27,12 +34,11 @@ def extrair_referencia_voz(caminho_video, caminho_saida, duracao=10, log_callbac
     if log_callback: log_callback(msg)
     else: print(msg)
 
-    video = None
     try:
-        from moviepy import VideoFileClip
-        video = VideoFileClip(caminho_video)
-        trecho = video.subclipped(0, min(duracao, video.duration))
-        trecho.audio.write_audiofile(caminho_saida, fps=22050, nbytes=2, codec='pcm_s16le', logger=None)
+        import soundfile as sf
+        amostras, sr, n_frames = _abrir_wav_memmap(caminho_audio)
+        trecho = _janela_mono_float32(amostras, 0, min(n_frames, int(duracao * sr)))
+        sf.write(caminho_saida, trecho, sr, subtype="PCM_16")
         
         msg_ok = f"✓ Referência salva em: {caminho_saida}"
         if log_callback: log_callback(msg_ok)
@@ -44,22 +50,20 @@ def extrair_referencia_voz(caminho_video, caminho_saida, duracao=10, log_callbac
         if log_callback: log_callback(msg_err)
         else: print(msg_err)
         return False
-    finally:
-        if video:
-            try: video.close()
-            except: pass
 
-def extrair_audio(caminho_video, caminho_audio_saida, log_callback=None):
+def extrair_audio(caminho_video, caminho_audio_saida, log_callback=None, sr=AUDIO_SR):
     """
     Extrai a faixa de áudio completa de um vídeo usando FFmpeg.
     
-    O áudio é extraído sem recompressão desnecessária (-q:a 9) para garantir qualidade
-    na transcrição subsequente.
+    O áudio é decodificado uma única vez, direto para WAV mono PCM16 na taxa
+    do Whisper; transcrição, VAD e referência de voz leem esse arquivo por
+    memory-map (ver `ler_audio_mono`), sem reamostrar nem decodificar de novo.
 
     Args:
         caminho_video (str): Path do vídeo de entrada.
         caminho_audio_saida (str): Path de saída do áudio (.wav).
         log_callback (callable, optional): Função para logar mensagens.
+        sr (int, optional): Taxa de amostragem. Default: AUDIO_SR em config.
 
     Returns:
         bool: True se sucesso, False caso contrário.
@@ -70,8 +74,8 @@ def extrair_audio(caminho_video, caminho_audio_saida, log_callback=None):
 
     try:
         cmd = [
-            FFMPEG_EXE, "-y", "-i", caminho_video,
-            "-q:a", "9",
+            obter_ffmpeg_exe(), "-y", "-i", caminho_video,
+            "-vn", "-ac", "1", "-ar", str(sr), "-c:a", "pcm_s16le",
             caminho_audio_saida
         ]
         # output silenciado para limpeza, exceto erros
@@ -88,7 +92,66 @@ def extrair_audio(caminho_video, caminho_audio_saida, log_callback=None):
         else: print(msg_err)
         return False
 
-def transcrever_audio_whisper(caminho_audio, modelo="openai/whisper-base", log_callback=None):
+def ler_audio_mono(caminho_audio):
+    """
+    Amostras float32 mono de um WAV, lidas do memory-map (sem decodificar de novo).
+
+    Returns:
+        tuple: (np.ndarray float32 [-1, 1], sample_rate)
+    """
+    amostras, sr, n_frames = _abrir_wav_memmap(caminho_audio)
+    return _janela_mono_float32(amostras, 0, n_frames), sr
+
+def _carregador_whisper(modelo):
+    """
+    Retorna (carregador, dtype) da pipeline ASR para o registro de modelos.
+
+    Sem GPU, a pipeline usa o backend de CPU configurado (ver
+    `src.services.inferencia_cpu`) e o dtype passa a ser o nome do backend.
+    """
+    DEVICE = obter_device()
+    if "cuda" not in DEVICE:
+        carregar = lambda: criar_pipeline_cpu("automatic-speech-recognition", modelo, chunk_length_s=30)
+        return carregar, backend_efetivo()
+    
+    import torch
+    dtype = torch.float16
+    
+    def carregar():
+        from transformers import pipeline
+        return pipeline(
+            task="automatic-speech-recognition",
+            model=modelo,
+            device=0 if DEVICE == "cuda:0" else -1,
+            torch_dtype=dtype,
+            chunk_length_s=30,
+        )
+    return carregar, dtype
+
+def chave_transcricao(caminho_audio, modelo, vad, politica=None):
+    """
+    Chave de cache da transcrição: áudio, modelo e política de segmentação
+    (default: config); com VAD, uma entrada separada.
+    """
+    politica = politica or PoliticaSegmentacao()
+    return chave_cache(hash_arquivo(caminho_audio), identificador_modelo(modelo), *politica.parametros(),
+                       *(["vad"] if vad else []))
+
+def vad_aplicavel(caminho_audio, vad=None):
+    """
+    Resolve o uso do VAD: default WHISPER_VAD, e apenas para WAVs que o
+    memmap consegue ler (outros formatos seguem pelo caminho sem VAD).
+    """
+    if vad is None: vad = WHISPER_VAD
+    if not vad: return False
+    try:
+        _abrir_wav_memmap(caminho_audio)
+        return True
+    except Exception:
+        return False
+
+def transcrever_audio_whisper(caminho_audio, modelo=WHISPER_MODELO, log_callback=None, usar_cache=True,
+                              streaming=None, vad=None):
     """
     Transcreve áudio para texto com timestamps precisos usando o modelo Whisper.
 
@@ -98,8 +161,14 @@ def transcrever_audio_whisper(caminho_audio, modelo="openai/whisper-base", log_c
 
     Args:
         caminho_audio (str): Path do arquivo de áudio (.wav).
-        modelo (str, optional): ID do modelo Whisper no Hugging Face. Default: "openai/whisper-base".
+        modelo (str, optional): ID do modelo Whisper no Hugging Face. Default: WHISPER_MODELO em config.
         log_callback (callable, optional): Função para logar mensagens.
+        usar_cache (bool): Reutiliza segmentos em cache para o mesmo áudio e modelo.
+        streaming (bool, optional): Transcreve em janelas com memória limitada
+            (ver `transcrever_audio_whisper_stream`). Default: automático para
+            áudios mais longos que WHISPER_STREAMING_MIN_S.
+        vad (bool, optional): Transcreve apenas as regiões com fala (ver
+            `transcrever_regioes_fala`). Default: WHISPER_VAD em config.
 
     Returns:
         list: Lista de dicionários de segmentos processados (ver `_processar_chunks_whisper`).
@@ -108,28 +177,68 @@ def transcrever_audio_whisper(caminho_audio, modelo="openai/whisper-base", log_c
     if log_callback: log_callback(msg)
     else: print(msg)
     
-    try:
-        if log_callback: log_callback("   Carregando modelo Whisper...")
-        
-        pipe = pipeline(
-            task="automatic-speech-recognition",
-            model=modelo,
-            device=0 if DEVICE == "cuda:0" else -1,
-            torch_dtype=torch.float16 if "cuda" in DEVICE else torch.float32,
-            chunk_length_s=30,
-        )
-        
-        # Word-level timestamps preferencialmente
+    vad = vad_aplicavel(caminho_audio, vad)
+    cache = obter_cache() if usar_cache else None
+    chave = None
+    if cache:
+        chave = chave_transcricao(caminho_audio, modelo, vad)
+        segmentos = cache.obter_json("transcricao", chave)
+        if segmentos is not None:
+            msg_cache = f"   ♻️ Transcrição em cache: {len(segmentos)} segmentos."
+            if log_callback: log_callback(msg_cache)
+            else: print(msg_cache)
+            return segmentos
+    
+    if streaming is None:
         try:
-            if log_callback: log_callback("   Processando (word timestamps)...")
-            resultado = pipe(caminho_audio, return_timestamps="word")
-        except:
-            warn = "   ⚠️ Word timestamps falhou, fallback para default."
-            if log_callback: log_callback(warn)
-            else: print(warn)
-            resultado = pipe(caminho_audio, return_timestamps=True)
+            _, sr, n_frames = _abrir_wav_memmap(caminho_audio)
+            streaming = n_frames / sr > WHISPER_STREAMING_MIN_S
+        except Exception:
+            streaming = False
+    
+    try:
+        if vad:
+            segmentos = list(transcrever_regioes_fala(caminho_audio, modelo, log_callback=log_callback))
+            msg_ok = f"✓ Transcrição: {len(segmentos)} segmentos gerados."
+            if log_callback: log_callback(msg_ok)
+            else: print(msg_ok)
+        elif streaming:
+            segmentos = list(transcrever_audio_whisper_stream(caminho_audio, modelo, log_callback=log_callback))
+            msg_ok = f"✓ Transcrição: {len(segmentos)} segmentos gerados."
+            if log_callback: log_callback(msg_ok)
+            else: print(msg_ok)
+        else:
+            if log_callback: log_callback("   Carregando modelo Whisper...")
             
-        return _processar_chunks_whisper(resultado, log_callback)
+            # Amostras já decodificadas (WAV de `extrair_audio`); outros formatos
+            # são decodificados pela própria pipeline. A pipeline consome o dict
+            # de entrada, então cada chamada recebe um novo.
+            try:
+                audio, sr = ler_audio_mono(caminho_audio)
+                entrada = lambda: {"raw": audio, "sampling_rate": sr}
+            except ValueError:
+                entrada = lambda: caminho_audio
+            
+            carregar, dtype = _carregador_whisper(modelo)
+            with obter_registro().usar(modelo, carregar, device=obter_device(), dtype=dtype,
+                                       modo="asr", log_callback=log_callback) as pipe:
+                # Word-level timestamps preferencialmente
+                with span("whisper.inferencia", modelo=modelo) as sp:
+                    try:
+                        if log_callback: log_callback("   Processando (word timestamps)...")
+                        resultado = pipe(entrada(), return_timestamps="word")
+                    except:
+                        warn = "   ⚠️ Word timestamps falhou, fallback para default."
+                        if log_callback: log_callback(warn)
+                        else: print(warn)
+                        resultado = pipe(entrada(), return_timestamps=True)
+                    sp.definir(itens=len(resultado.get("chunks", [])))
+                
+            segmentos = _processar_chunks_whisper(resultado, log_callback)
+        
+        if cache and segmentos:
+            cache.salvar_json("transcricao", chave, segmentos)
+        return segmentos
         
     except Exception as e:
         err = f"✗ Erro na transcrição: {e}"
@@ -137,72 +246,459 @@ def transcrever_audio_whisper(caminho_audio, modelo="openai/whisper-base", log_c
         else: print(err)
         return []
 
-def _processar_chunks_whisper(resultado, log_callback=None):
-    """Reagrupa palavras/chunks em segmentos de legenda."""
-    raw_chunks = resultado.get("chunks", [])
-    if not raw_chunks:
-        text = resultado.get("text", "")
-        return [{"start": 0.0, "end": 5.0, "text": text}] if text else []
+def _abrir_wav_memmap(caminho_audio):
+    """
+    Mapeia em memória as amostras de um WAV PCM (16/32 bits) ou float32.
+
+    Lê apenas o cabeçalho RIFF; as amostras ficam no disco e são carregadas
+    sob demanda pelo sistema operacional ao fatiar o array.
+
+    Args:
+        caminho_audio (str): Path do arquivo .wav.
+
+    Returns:
+        tuple: (np.memmap de shape (frames, canais), sample_rate, n_frames)
+
+    Raises:
+        ValueError: Se o arquivo não for um WAV PCM/float suportado.
+    """
+    with open(caminho_audio, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"Arquivo não é WAV: {caminho_audio}")
+        
+        formato = None
+        while True:
+            cabecalho = f.read(8)
+            if len(cabecalho) < 8:
+                raise ValueError("Chunk 'data' não encontrado no WAV")
+            id_chunk = cabecalho[:4]
+            tamanho = int.from_bytes(cabecalho[4:], "little")
+            if id_chunk == b"fmt ":
+                fmt = f.read(tamanho)
+                codigo = int.from_bytes(fmt[0:2], "little")
+                canais = int.from_bytes(fmt[2:4], "little")
+                sr = int.from_bytes(fmt[4:8], "little")
+                bits = int.from_bytes(fmt[14:16], "little")
+                if codigo == 0xFFFE and len(fmt) >= 26:
+                    # WAVE_FORMAT_EXTENSIBLE: o subformato está no GUID
+                    codigo = int.from_bytes(fmt[24:26], "little")
+                formato = (codigo, canais, sr, bits)
+                if tamanho % 2: f.read(1)
+            elif id_chunk == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(tamanho + (tamanho % 2), os.SEEK_CUR)
+    
+    if formato is None:
+        raise ValueError("Chunk 'fmt ' não encontrado no WAV")
+    codigo, canais, sr, bits = formato
+    tipos = {(1, 16): np.int16, (1, 32): np.int32, (3, 32): np.float32}
+    if (codigo, bits) not in tipos:
+        raise ValueError(f"Formato WAV não suportado (codec={codigo}, bits={bits})")
+    
+    dtype = np.dtype(tipos[(codigo, bits)])
+    # Tamanho real pelo arquivo (o campo do chunk pode ser 0/0xFFFFFFFF em streams)
+    n_frames = (os.path.getsize(caminho_audio) - offset) // (dtype.itemsize * canais)
+    amostras = np.memmap(caminho_audio, dtype=dtype, mode="r", offset=offset, shape=(n_frames, canais))
+    return amostras, sr, n_frames
 
-    segmentos = []
-    MAX_CHARS = 80
-    MAX_DUR = 7.0
-    MIN_PAUSE = 0.5
+def _janela_mono_float32(amostras, inicio, fim):
+    """Converte um trecho do memmap (frames, canais) em float32 mono [-1, 1]."""
+    trecho = np.asarray(amostras[inicio:fim], dtype=np.float32)
+    if np.issubdtype(amostras.dtype, np.integer):
+        trecho /= float(np.iinfo(amostras.dtype).max + 1)
+    return trecho.mean(axis=1) if trecho.shape[1] > 1 else trecho[:, 0]
+
+def transcrever_audio_whisper_stream(caminho_audio, modelo=WHISPER_MODELO, janela_s=30.0,
+                                     sobreposicao_s=5.0, log_callback=None):
+    """
+    Transcreve o áudio em janelas sobrepostas, produzindo segmentos à medida que
+    são finalizados.
+
+    O WAV é lido por memory-map, então apenas a janela corrente fica em memória
+    (independente da duração do áudio). Palavras na região de sobreposição são
+    costuradas pelo ponto médio: cada janela só confirma palavras que começam
+    antes de `fim - sobreposicao/2`; a próxima descarta as que começam antes disso.
+
+    Args:
+        caminho_audio (str): Path do arquivo de áudio (.wav PCM).
+        modelo (str, optional): ID do modelo Whisper no Hugging Face.
+        janela_s (float): Duração de cada janela (segundos). Default: 30s.
+        sobreposicao_s (float): Sobreposição entre janelas (segundos). Default: 5s.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Yields:
+        dict: Segmentos {'start', 'end', 'text'} na ordem do áudio.
+    """
+    if sobreposicao_s >= janela_s:
+        raise ValueError("sobreposicao_s deve ser menor que janela_s")
     
-    buffer_words = []
-    seg_start = 0.0
-    last_end = 0.0
-    buffer_len = 0
+    amostras, sr, n_frames = _abrir_wav_memmap(caminho_audio)
+    duracao = n_frames / sr
+    passo = janela_s - sobreposicao_s
+    n_janelas = max(1, int(np.ceil(max(0.0, duracao - sobreposicao_s) / passo)))
     
-    for chunk in raw_chunks:
-        text = chunk.get("text", "").strip()
-        times = chunk.get("timestamp")
-        
-        if not text: continue
-        
-        if isinstance(times, (list, tuple)):
-            start, end = times
-        else:
-            start, end = last_end, last_end + 1.0 # fallback
+    msg = f"   Streaming: {duracao / 60:.1f} min em {n_janelas} janelas de {janela_s:.0f}s"
+    if log_callback: log_callback(msg)
+    else: print(msg)
+    
+    agrupador = AgrupadorSegmentos()
+    carregar, dtype = _carregador_whisper(modelo)
+    
+    with obter_registro().usar(modelo, carregar, device=obter_device(), dtype=dtype,
+                               modo="asr", log_callback=log_callback) as pipe:
+        confirmado_ate = 0.0
+        t0 = 0.0
+        n = 0
+        while t0 < duracao:
+            n += 1
+            t1 = min(t0 + janela_s, duracao)
+            ultima = t1 >= duracao
+            corte = t1 if ultima else t1 - sobreposicao_s / 2
+            
+            janela = _janela_mono_float32(amostras, int(t0 * sr), int(t1 * sr))
+            entrada = {"raw": janela, "sampling_rate": sr}
+            with span("whisper.janela", inicio_s=round(t0, 2)) as sp:
+                try:
+                    resultado = pipe(entrada, return_timestamps="word")
+                except Exception:
+                    resultado = pipe({"raw": janela, "sampling_rate": sr}, return_timestamps=True)
+                sp.definir(itens=len(resultado.get("chunks", [])))
+            
+            for chunk in resultado.get("chunks", []):
+                times = chunk.get("timestamp")
+                start, end = times if isinstance(times, (list, tuple)) else (None, None)
+                start = t0 + start if start is not None else None
+                end = t0 + end if end is not None else None
+                
+                # Costura: palavras já confirmadas pela janela anterior ou que
+                # pertencem à próxima janela são ignoradas aqui
+                ref = start if start is not None else agrupador.last_end
+                if ref < confirmado_ate or ref >= corte:
+                    continue
+                for seg in agrupador.adicionar(chunk.get("text", ""), start, end):
+                    yield seg
+            
+            confirmado_ate = corte
+            prog = f"   ... Janela {n}/{n_janelas} ({t1 / duracao * 100:.0f}%)"
+            if log_callback: log_callback(prog)
+            else: print(prog)
+            
+            if ultima: break
+            t0 += passo
+    
+    for seg in agrupador.finalizar():
+        yield seg
+
+def transcrever_regioes_fala(caminho_audio, modelo=WHISPER_MODELO, regioes=None,
+                             tamanho_lote=WHISPER_VAD_LOTE, log_callback=None):
+    """
+    Transcreve apenas as regiões com fala do áudio, em lotes.
+
+    Um VAD por energia (`src.services.vad.detectar_fala`) marca as regiões
+    com fala; cada lote de regiões vai ao Whisper numa única chamada e os
+    timestamps das palavras são deslocados de volta para a linha do tempo
+    original. O WAV é lido por memory-map, então só o lote corrente fica em
+    memória. O custo da ASR cai na proporção do trecho sem fala do vídeo.
+
+    Args:
+        caminho_audio (str): Path do arquivo de áudio (.wav PCM).
+        modelo (str, optional): ID do modelo Whisper no Hugging Face.
+        regioes (list, optional): Regiões (início_s, fim_s) já detectadas.
+            Default: detectadas aqui.
+        tamanho_lote (int): Regiões por chamada do Whisper.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Yields:
+        dict: Segmentos {'start', 'end', 'text'} na ordem do áudio.
+    """
+    amostras, sr, n_frames = _abrir_wav_memmap(caminho_audio)
+    duracao = n_frames / sr
+    if regioes is None:
+        with span("vad") as sp:
+            regioes = detectar_fala(amostras, sr)
+            sp.definir(itens=len(regioes))
+    
+    fala = sum(fim - inicio for inicio, fim in regioes)
+    msg = (f"   🔇 VAD: {len(regioes)} regiões de fala, {fala / 60:.1f} de {duracao / 60:.1f} min "
+           f"({fala / max(duracao, 1e-9):.0%}) enviados ao Whisper")
+    if log_callback: log_callback(msg)
+    else: print(msg)
+    if not regioes:
+        return
+    
+    agrupador = AgrupadorSegmentos()
+    carregar, dtype = _carregador_whisper(modelo)
+    n_lotes = (len(regioes) + tamanho_lote - 1) // tamanho_lote
+    
+    with obter_registro().usar(modelo, carregar, device=obter_device(), dtype=dtype,
+                               modo="asr", log_callback=log_callback) as pipe:
+        for n, k in enumerate(range(0, len(regioes), tamanho_lote), start=1):
+            lote = regioes[k:k + tamanho_lote]
+            janelas = [_janela_mono_float32(amostras, int(inicio * sr), int(fim * sr)) for inicio, fim in lote]
+            with span("whisper.lote_vad", itens=len(lote)) as sp:
+                # A pipeline consome os dicts de entrada: recriados no fallback
+                try:
+                    resultados = pipe([{"raw": j, "sampling_rate": sr} for j in janelas],
+                                      return_timestamps="word", batch_size=len(lote))
+                except Exception:
+                    resultados = pipe([{"raw": j, "sampling_rate": sr} for j in janelas],
+                                      return_timestamps=True, batch_size=len(lote))
+                sp.definir(palavras=sum(len(r.get("chunks", [])) for r in resultados))
+            
+            for (inicio, fim), resultado in zip(lote, resultados):
+                for chunk in resultado.get("chunks", []):
+                    times = chunk.get("timestamp")
+                    start, end = times if isinstance(times, (list, tuple)) else (None, None)
+                    start = min(inicio + start, fim) if start is not None else None
+                    end = min(inicio + end, fim) if end is not None else None
+                    for seg in agrupador.adicionar(chunk.get("text", ""), start, end):
+                        yield seg
             
-        if start is None: start = last_end
+            prog = f"   ... Lote {n}/{n_lotes} ({lote[-1][1] / duracao * 100:.0f}%)"
+            if log_callback: log_callback(prog)
+            else: print(prog)
+    
+    for seg in agrupador.finalizar():
+        yield seg
+
+class PoliticaSegmentacao:
+    """
+    Regras de quebra das palavras em segmentos de legenda.
+
+    Um segmento é fechado antes de uma palavra quando a pausa desde a palavra
+    anterior passa de `pausa_min`, quando a palavra anterior termina com um
+    caractere de `pontuacao_final`, ou quando a palavra faria o segmento passar
+    de `max_duracao` segundos (do início do segmento ao fim da palavra) ou de
+    `max_caracteres` caracteres.
+    """
+    def __init__(self, max_caracteres=SEGMENTO_MAX_CARACTERES, max_duracao=SEGMENTO_MAX_DURACAO,
+                 pausa_min=SEGMENTO_PAUSA_MIN, pontuacao_final=".?!"):
+        self.max_caracteres = max_caracteres
+        self.max_duracao = max_duracao
+        self.pausa_min = pausa_min
+        self.pontuacao_final = pontuacao_final
+
+    def parametros(self):
+        """Valores das regras, para chaves de cache e checkpoints."""
+        return [self.max_caracteres, self.max_duracao, self.pausa_min, self.pontuacao_final]
+
+class AgrupadorSegmentos:
+    """
+    Agrupa palavras (chunks do Whisper) em segmentos de legenda, incrementalmente.
+
+    Usado nos caminhos que produzem palavras aos poucos (streaming e VAD); com
+    todas as palavras em mãos, `agrupar_palavras` aplica a mesma política de
+    forma vetorizada.
+    """
+    def __init__(self, politica=None):
+        """
+        Args:
+            politica (PoliticaSegmentacao, optional): Regras de quebra. Default: config.
+        """
+        self.politica = politica or PoliticaSegmentacao()
+        self.buffer_words = []
+        self.seg_start = 0.0
+        self.last_end = 0.0
+        self.buffer_len = 0
+        self.n_segmentos = 0
+    
+    def adicionar(self, text, start, end):
+        """
+        Adiciona uma palavra.
+
+        Args:
+            text (str): Texto da palavra/chunk.
+            start (float): Início (None = fim da palavra anterior).
+            end (float): Fim (None = início + 0.3s).
+
+        Returns:
+            list: Segmentos finalizados por esta palavra (0 ou 1).
+        """
+        text = text.strip()
+        if not text: return []
+        
+        if start is None: start = self.last_end
         if end is None: end = start + 0.3
         
         # Início do primeiro buffer
-        if not buffer_words and not segmentos:
-            seg_start = start
-            if buffer_words == []: seg_start = start # Reset para novo segmento
+        if not self.buffer_words and not self.n_segmentos:
+            self.seg_start = start
             
-        pause = start - last_end
-        duration = end - seg_start
+        pause = start - self.last_end
+        duration = end - self.seg_start
         
+        politica = self.politica
         should_break = False
-        if buffer_words:
-            if pause > MIN_PAUSE: should_break = True
-            elif duration > MAX_DUR: should_break = True
-            elif buffer_len + len(text) > MAX_CHARS: should_break = True
-            elif buffer_words[-1][-1] in ".?!": should_break = True
-            
+        if self.buffer_words:
+            if pause > politica.pausa_min: should_break = True
+            elif duration > politica.max_duracao: should_break = True
+            elif self.buffer_len + len(text) > politica.max_caracteres: should_break = True
+            elif self.buffer_words[-1][-1] in politica.pontuacao_final: should_break = True
+        
+        finalizados = []
         if should_break:
-            segmentos.append({
-                "start": seg_start,
-                "end": last_end,
-                "text": " ".join(buffer_words)
-            })
-            buffer_words = []
-            seg_start = start
-            buffer_len = 0
+            finalizados.append(self._fechar())
+            self.seg_start = start
             
-        buffer_words.append(text)
-        buffer_len += len(text) + 1
-        last_end = end
-        
-    if buffer_words:
-        segmentos.append({
-            "start": seg_start,
-            "end": last_end,
-            "text": " ".join(buffer_words)
-        })
+        self.buffer_words.append(text)
+        self.buffer_len += len(text) + 1
+        self.last_end = end
+        return finalizados
+    
+    def _fechar(self):
+        seg = {
+            "start": self.seg_start,
+            "end": self.last_end,
+            "text": " ".join(self.buffer_words)
+        }
+        self.buffer_words = []
+        self.buffer_len = 0
+        self.n_segmentos += 1
+        return seg
+    
+    def finalizar(self):
+        """Fecha o segmento pendente, se houver."""
+        return [self._fechar()] if self.buffer_words else []
+
+def _palavras_para_arrays(chunks):
+    """
+    Converte os chunks do Whisper em (textos, inícios, fins).
+
+    Chunks vazios são descartados e timestamps ausentes resolvidos como em
+    `AgrupadorSegmentos.adicionar`: início ausente = fim da palavra anterior;
+    fim ausente = início + 0.3s; sem timestamp = 1s após a palavra anterior.
+    Só as palavras com timestamp ausente passam por um laço em Python.
+
+    Returns:
+        tuple: (list de str, np.ndarray float64, np.ndarray float64)
+    """
+    textos = [chunk.get("text", "").strip() for chunk in chunks]
+    tempos = [chunk.get("timestamp") for chunk in chunks]
+    if not all(textos):
+        tempos = list(compress(tempos, textos))
+        textos = list(compress(textos, textos))
+    
+    sem_tempo = set()
+    if None in tempos:
+        sem_tempo = {i for i, t in enumerate(tempos) if t is None}
+        tempos = [(None, None) if t is None else t for t in tempos]
+    try:
+        # Pares (início, fim) achatados; None vira NaN
+        pares = np.array(list(chain.from_iterable(tempos)), dtype=np.float64).reshape(len(tempos), 2)
+    except (ValueError, TypeError):
+        sem_tempo |= {i for i, t in enumerate(tempos) if not isinstance(t, (list, tuple))}
+        pares = np.array(list(chain.from_iterable((None, None) if i in sem_tempo else t for i, t in enumerate(tempos))),
+                         dtype=np.float64).reshape(len(tempos), 2)
+    inicios, fins = pares[:, 0].copy(), pares[:, 1].copy()
+    
+    # None vira NaN; resolvidos em ordem, pois dependem do fim da palavra anterior
+    for i in np.flatnonzero(np.isnan(inicios) | np.isnan(fins)).tolist():
+        ultimo_fim = fins[i - 1] if i else 0.0
+        if i in sem_tempo:
+            inicios[i], fins[i] = ultimo_fim, ultimo_fim + 1.0  # fallback
+            continue
+        if np.isnan(inicios[i]): inicios[i] = ultimo_fim
+        if np.isnan(fins[i]): fins[i] = inicios[i] + 0.3
+    return textos, inicios, fins
+
+def agrupar_palavras(textos, inicios, fins, politica=None):
+    """
+    Agrupa palavras em segmentos de legenda com operações vetorizadas.
+
+    Produz os mesmos segmentos que `AgrupadorSegmentos` palavra a palavra.
+    As quebras que não dependem do início do segmento (pausa longa e
+    pontuação final) são calculadas de uma vez e dividem as palavras em
+    trechos; os trechos dentro dos limites de caracteres e de duração (a
+    maioria) viram segmentos diretamente. Os demais são divididos com buscas
+    binárias sobre a soma acumulada dos comprimentos e sobre o máximo
+    acumulado (`np.maximum.accumulate`) dos fins das palavras. O laço em
+    Python roda uma vez por segmento, não por palavra.
+
+    Args:
+        textos (list): Palavras (não vazias, sem espaços nas pontas).
+        inicios (np.ndarray): Início de cada palavra (segundos).
+        fins (np.ndarray): Fim de cada palavra (segundos).
+        politica (PoliticaSegmentacao, optional): Regras de quebra. Default: config.
+
+    Returns:
+        list: Segmentos {'start', 'end', 'text'}.
+    """
+    politica = politica or PoliticaSegmentacao()
+    n = len(textos)
+    if n == 0:
+        return []
+    inicios = np.asarray(inicios, dtype=np.float64)
+    fins = np.asarray(fins, dtype=np.float64)
+    
+    comprimentos = np.fromiter(map(len, textos), dtype=np.int64, count=n)
+    ultimos = np.frombuffer("".join([t[-1] for t in textos]).encode("utf-32-le"), dtype=np.uint32)
+    pontuacao = np.isin(ultimos, [ord(c) for c in politica.pontuacao_final])
+    
+    # Trechos entre quebras obrigatórias (pausa longa ou pontuação na palavra anterior)
+    obrigatorias = np.flatnonzero((inicios[1:] - fins[:-1] > politica.pausa_min) | pontuacao[:-1]) + 1
+    comecos = np.concatenate([[0], obrigatorias])
+    finais = np.concatenate([obrigatorias, [n]])
+    
+    # Caracteres do segmento [s, j] com espaços: acumulado[j + 1] - 1 - acumulado[s]
+    acumulado = np.concatenate([[0], np.cumsum(comprimentos + 1)])
+    # A duração só é verificada a partir da segunda palavra do segmento
+    fins_seguintes = fins.copy()
+    fins_seguintes[comecos] = -np.inf
+    unica = finais - comecos == 1
+    cabe_caracteres = unica | (acumulado[finais] - 1 - acumulado[comecos] <= politica.max_caracteres)
+    cabe_duracao = unica | (np.maximum.reduceat(fins_seguintes, comecos) - inicios[comecos] <= politica.max_duracao)
+    
+    # Trechos que cabem viram um segmento; os longos demais são divididos
+    # gulosamente, com buscas binárias em listas (sem escalares numpy)
+    cortes = comecos.tolist()
+    longos = np.flatnonzero(~(cabe_caracteres & cabe_duracao))
+    if len(longos):
+        caracteres_ate = (acumulado[1:] - 1).tolist()
+        acumulado_l = acumulado.tolist()
+        fim_maximo = np.maximum.accumulate(fins).tolist()
+        inicios_l, fins_l = inicios.tolist(), fins.tolist()
+        max_caracteres, max_duracao = politica.max_caracteres, politica.max_duracao
+        for s, fim_trecho, cabe_c, cabe_d in zip(comecos[longos].tolist(), finais[longos].tolist(),
+                                                 cabe_caracteres[longos].tolist(), cabe_duracao[longos].tolist()):
+            inicio_trecho = inicios_l[s]
+            while True:
+                if cabe_c:
+                    quebra = fim_trecho
+                else:
+                    quebra = bisect_right(caracteres_ate, max_caracteres + acumulado_l[s], s + 1, fim_trecho)
+                inicio = inicios_l[s]
+                if cabe_d and inicio >= inicio_trecho:
+                    j = quebra
+                elif fim_maximo[s] - inicio <= max_duracao:
+                    j = bisect_right(fim_maximo, inicio + max_duracao, s + 1, quebra)
+                    # A regra compara (fim - início) com a duração: corrige o arredondamento da soma
+                    while j > s + 1 and fim_maximo[j - 1] - inicio > max_duracao: j -= 1
+                    while j < quebra and fim_maximo[j] - inicio <= max_duracao: j += 1
+                else:
+                    # Timestamps fora de ordem antes de s: busca direta dentro do segmento
+                    j = next((i for i in range(s + 1, quebra) if fins_l[i] - inicio > max_duracao), quebra)
+                if j >= fim_trecho:
+                    break
+                cortes.append(j)
+                s = j
+        cortes.sort()
+    
+    fechamentos = cortes[1:] + [n]
+    return [{"start": inicio, "end": fim, "text": " ".join(textos[s:e])}
+            for s, e, inicio, fim in zip(cortes, fechamentos, inicios[cortes].tolist(),
+                                         fins[np.array(fechamentos) - 1].tolist())]
+
+def _processar_chunks_whisper(resultado, log_callback=None, politica=None):
+    """Reagrupa palavras/chunks em segmentos de legenda (ver `agrupar_palavras`)."""
+    raw_chunks = resultado.get("chunks", [])
+    if not raw_chunks:
+        text = resultado.get("text", "")
+        return [{"start": 0.0, "end": 5.0, "text": text}] if text else []
+
+    segmentos = agrupar_palavras(*_palavras_para_arrays(raw_chunks), politica=politica)
         
     msg = f"✓ Transcrição: {len(segmentos)} segmentos gerados."
     if log_callback: log_callback(msg)
@@ -0,0 +1,311 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+NAMESPACES = ["transcricao", "traducao", "tts", "voz", "ffmpeg"]
+
+
+def chave_cache(*partes):
+    """
+    Gera uma chave de cache determinística a partir das entradas de um estágio.
+
+    Args:
+        *partes: Valores serializáveis em JSON (textos, ids de modelo, hashes...).
+
+    Returns:
+        str: Hash SHA-256 hexadecimal.
+    """
+    conteudo = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo.
+
+    Args:
+        caminho (str): Path do arquivo.
+        tamanho_bloco (int): Tamanho dos blocos lidos (bytes).
+
+    Returns:
+        str: Hash hexadecimal, ou None se o arquivo não existir.
+    """
+    if not caminho or not os.path.exists(caminho):
+        return None
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """
+    Cache persistente em disco, endereçado por conteúdo.
+
+    Armazena resultados de transcrição (segmentos), tradução (textos), TTS
+    (formas de onda) e prompts de voz clonada (embeddings) sob chaves derivadas das entradas de cada estágio
+    (ver `chave_cache`). O tamanho total é limitado; ao exceder o limite, as
+    entradas usadas há mais tempo são removidas (LRU, pelo mtime do arquivo,
+    atualizado a cada leitura).
+
+    Layout: `<diretorio>/<namespace>/<chave[:2]>/<chave>.json|.npz`
+    """
+    def __init__(self, diretorio, limite_bytes=None):
+        """
+        Args:
+            diretorio (str): Diretório raiz do cache.
+            limite_bytes (int, optional): Tamanho máximo em bytes. None = sem limite.
+        """
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _caminho(self, namespace, chave, extensao):
+        return os.path.join(self.diretorio, namespace, chave[:2], f"{chave}{extensao}")
+
+    def _tocar(self, caminho):
+        try:
+            os.utime(caminho, None)
+        except OSError:
+            pass
+
+    def _gravar(self, caminho, escrever):
+        """Grava de forma atômica (arquivo temporário + rename) e aplica o limite."""
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        anterior = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        escrever(temp)
+        os.replace(temp, caminho)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += os.path.getsize(caminho) - anterior
+        self._evictar()
+
+    # ------------------------------------------------------------------
+    # JSON (segmentos de transcrição, traduções)
+    # ------------------------------------------------------------------
+    def obter_json(self, namespace, chave):
+        """Retorna o valor armazenado ou None se ausente/corrompido."""
+        caminho = self._caminho(namespace, chave, ".json")
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                valor = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._tocar(caminho)
+        return valor
+
+    def salvar_json(self, namespace, chave, valor):
+        caminho = self._caminho(namespace, chave, ".json")
+
+        def escrever(destino):
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(valor, f, ensure_ascii=False)
+
+        self._gravar(caminho, escrever)
+
+    # ------------------------------------------------------------------
+    # Áudio (formas de onda TTS)
+    # ------------------------------------------------------------------
+    def obter_audio(self, chave, namespace="tts"):
+        """
+        Returns:
+            tuple: (audio_numpy_array, sample_rate) ou None se ausente.
+        """
+        caminho = self._caminho(namespace, chave, ".npz")
+        try:
+            with np.load(caminho) as dados:
+                audio = dados["audio"]
+                sr = int(dados["sr"])
+        except (OSError, ValueError, KeyError):
+            return None
+        self._tocar(caminho)
+        return audio, sr
+
+    def salvar_audio(self, chave, audio, sr, namespace="tts"):
+        caminho = self._caminho(namespace, chave, ".npz")
+
+        def escrever(destino):
+            with open(destino, "wb") as f:
+                np.savez(f, audio=np.asarray(audio, dtype=np.float32), sr=np.int64(sr))
+
+        self._gravar(caminho, escrever)
+
+    # ------------------------------------------------------------------
+    # Arrays nomeados (ex: prompts de voz do Qwen3)
+    # ------------------------------------------------------------------
+    def obter_arrays(self, namespace, chave):
+        """
+        Returns:
+            dict: Arrays salvos por `salvar_arrays`, ou None se ausente.
+        """
+        caminho = self._caminho(namespace, chave, ".npz")
+        try:
+            with np.load(caminho) as dados:
+                arrays = {nome: dados[nome] for nome in dados.files}
+        except (OSError, ValueError):
+            return None
+        self._tocar(caminho)
+        return arrays
+
+    def salvar_arrays(self, namespace, chave, **arrays):
+        caminho = self._caminho(namespace, chave, ".npz")
+
+        def escrever(destino):
+            with open(destino, "wb") as f:
+                np.savez(f, **arrays)
+
+        self._gravar(caminho, escrever)
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+    def _listar(self, namespace=None):
+        """Lista (mtime, tamanho, caminho) dos arquivos do cache."""
+        raiz = os.path.join(self.diretorio, namespace) if namespace else self.diretorio
+        arquivos = []
+        if not os.path.isdir(raiz):
+            return arquivos
+        for pasta, _, nomes in os.walk(raiz):
+            for nome in nomes:
+                if nome.endswith(".tmp"):
+                    continue
+                caminho = os.path.join(pasta, nome)
+                try:
+                    st = os.stat(caminho)
+                except OSError:
+                    continue
+                arquivos.append((st.st_mtime, st.st_size, caminho))
+        return arquivos
+
+    def _evictar(self):
+        if self.limite_bytes is None:
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(t for _, t, _ in self._listar())
+            if self._total_bytes <= self.limite_bytes:
+                return
+            for _, tamanho, caminho in sorted(self._listar()):
+                if self._total_bytes <= self.limite_bytes:
+                    break
+                try:
+                    os.remove(caminho)
+                    self._total_bytes -= tamanho
+                except OSError:
+                    pass
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Número de entradas e bytes por namespace, total e limite.
+        """
+        por_namespace = {}
+        total = 0
+        for namespace in sorted(set(NAMESPACES) | set(self._namespaces_existentes())):
+            arquivos = self._listar(namespace)
+            tamanho = sum(t for _, t, _ in arquivos)
+            por_namespace[namespace] = {"entradas": len(arquivos), "bytes": tamanho}
+            total += tamanho
+        return {
+            "diretorio": self.diretorio,
+            "bytes": total,
+            "limite_bytes": self.limite_bytes,
+            "namespaces": por_namespace,
+        }
+
+    def _namespaces_existentes(self):
+        if not os.path.isdir(self.diretorio):
+            return []
+        return [d for d in os.listdir(self.diretorio) if os.path.isdir(os.path.join(self.diretorio, d))]
+
+    def limpar(self, namespace=None, mais_antigos_que=None):
+        """
+        Remove entradas do cache.
+
+        Args:
+            namespace (str, optional): Restringe a um namespace ('transcricao', 'traducao', 'tts', 'voz').
+            mais_antigos_que (float, optional): Remove apenas entradas sem uso há mais
+                de N segundos.
+
+        Returns:
+            tuple: (entradas_removidas, bytes_liberados)
+        """
+        limite_mtime = time.time() - mais_antigos_que if mais_antigos_que else None
+        removidos, liberados = 0, 0
+        with self._lock:
+            for mtime, tamanho, caminho in self._listar(namespace):
+                if limite_mtime is not None and mtime > limite_mtime:
+                    continue
+                try:
+                    os.remove(caminho)
+                    removidos += 1
+                    liberados += tamanho
+                except OSError:
+                    pass
+            self._total_bytes = None
+        return removidos, liberados
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def obter_cache():
+    """
+    Retorna o cache de resultados do processo, ou None se desabilitado
+    (`CACHE_ATIVO = False` em config).
+    """
+    global _cache
+    from src.config import CACHE_ATIVO, CACHE_DIR, CACHE_MAX_MB
+    if not CACHE_ATIVO:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            limite = CACHE_MAX_MB * 1024**2 if CACHE_MAX_MB else None
+            _cache = CacheResultados(CACHE_DIR, limite_bytes=limite)
+        return _cache
+
+
+def main(argv=None):
+    """CLI: `python -m src.services.cache {info,purge}`."""
+    parser = argparse.ArgumentParser(prog="python -m src.services.cache",
+                                     description="Inspeciona ou limpa o cache de resultados do pipeline.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("info", help="Mostra entradas e tamanho por estágio")
+
+    purge = sub.add_parser("purge", help="Remove entradas do cache")
+    purge.add_argument("--namespace", choices=NAMESPACES, help="Limpa apenas um estágio")
+    purge.add_argument("--dias", type=float, help="Remove apenas entradas sem uso há mais de N dias")
+
+    args = parser.parse_args(argv)
+
+    from src.config import CACHE_DIR, CACHE_MAX_MB
+    cache = CacheResultados(CACHE_DIR, limite_bytes=CACHE_MAX_MB * 1024**2 if CACHE_MAX_MB else None)
+
+    if args.comando == "info":
+        s = cache.estatisticas()
+        print(f"Cache: {s['diretorio']}")
+        limite = f"{s['limite_bytes'] / 1024**2:.0f} MB" if s["limite_bytes"] else "sem limite"
+        print(f"Total: {s['bytes'] / 1024**2:.1f} MB (limite: {limite})")
+        for namespace, info in s["namespaces"].items():
+            print(f"   {namespace:<12} {info['entradas']:>7} entradas  {info['bytes'] / 1024**2:>9.1f} MB")
+    elif args.comando == "purge":
+        segundos = args.dias * 86400 if args.dias else None
+        removidos, liberados = cache.limpar(args.namespace, mais_antigos_que=segundos)
+        print(f"🧹 {removidos} entradas removidas ({liberados / 1024**2:.1f} MB liberados)")
+    return 0
+
+
+if __name__ == "__main__":
+    if __package__ in (None, ""):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    sys.exit(main())
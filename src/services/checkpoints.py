@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.services.cache import chave_cache
+
+# Etapas com checkpoint, na ordem do pipeline
+ETAPAS = ["extracao", "referencia", "transcricao", "diarizacao", "traducao", "tts", "plano", "render"]
+
+
+def fingerprint_arquivo(caminho):
+    """
+    Impressão digital barata de um arquivo de entrada (caminho, tamanho, mtime).
+
+    Evita ler vídeos de vários GB só para validar um checkpoint; qualquer
+    substituição do arquivo altera tamanho ou mtime.
+    """
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return chave_cache(os.path.abspath(caminho), st.st_size, st.st_mtime_ns)
+
+
+class ManifestoJob:
+    """
+    Manifesto de checkpoints de uma execução do pipeline.
+
+    Cada etapa grava sua saída em `<diretorio>/checkpoints/` e registra no
+    `manifesto.json` o arquivo e a impressão digital das entradas usadas. Ao
+    retomar, uma etapa é reaproveitada apenas se a impressão digital atual for
+    igual à registrada e o arquivo ainda existir. As impressões digitais são
+    encadeadas (cada etapa inclui a da anterior), então invalidar uma etapa
+    invalida todas as seguintes.
+    """
+    def __init__(self, diretorio):
+        """
+        Args:
+            diretorio (str): Diretório de trabalho da execução.
+        """
+        self.diretorio = os.path.join(diretorio, "checkpoints")
+        self.caminho = os.path.join(diretorio, "manifesto.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.etapas = {}
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, encoding="utf-8") as f:
+                    self.etapas = json.load(f).get("etapas", {})
+            except (OSError, ValueError):
+                self.etapas = {}
+
+    def _gravar(self):
+        temp = f"{self.caminho}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"etapas": self.etapas}, f, ensure_ascii=False, indent=2)
+        os.replace(temp, self.caminho)
+
+    def registrar(self, etapa, fingerprint, arquivo):
+        """Registra um arquivo já gravado como checkpoint da etapa."""
+        with self._lock:
+            self.etapas[etapa] = {"fingerprint": fingerprint, "arquivo": arquivo, "criado_em": time.time()}
+            self._gravar()
+
+    def valido(self, etapa, fingerprint):
+        """Indica se a etapa tem checkpoint com a mesma impressão digital."""
+        entrada = self.etapas.get(etapa)
+        return (entrada is not None and entrada["fingerprint"] == fingerprint
+                and os.path.exists(entrada["arquivo"]))
+
+    def limpar(self):
+        """Remove todos os checkpoints (execução do zero)."""
+        with self._lock:
+            for entrada in self.etapas.values():
+                arquivo = entrada["arquivo"]
+                if os.path.dirname(arquivo) == self.diretorio and os.path.exists(arquivo):
+                    try: os.remove(arquivo)
+                    except OSError: pass
+            self.etapas = {}
+            self._gravar()
+
+    def _arquivo(self, etapa, extensao):
+        return os.path.join(self.diretorio, f"{etapa}{extensao}")
+
+    def salvar_json(self, etapa, fingerprint, valor):
+        caminho = self._arquivo(etapa, ".json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(valor, f, ensure_ascii=False, default=float)
+        self.registrar(etapa, fingerprint, caminho)
+
+    def carregar_json(self, etapa, fingerprint):
+        """Retorna o valor salvo, ou None se o checkpoint for inválido."""
+        if not self.valido(etapa, fingerprint):
+            return None
+        try:
+            with open(self.etapas[etapa]["arquivo"], encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def salvar_audios(self, etapa, fingerprint, audios):
+        """
+        Salva a lista de áudios (audio, sr) num único .npz: as amostras
+        concatenadas em float32 mais a tabela de deslocamentos e taxas.
+        Segmentos sem áudio têm comprimento 0 e taxa 0.
+        """
+        comprimentos = [0 if a is None else len(a) for a, _ in audios]
+        deslocamentos = np.concatenate([[0], np.cumsum(comprimentos)]).astype(np.int64)
+        dados = np.zeros(int(deslocamentos[-1]), dtype=np.float32)
+        for (audio, _), inicio, n in zip(audios, deslocamentos[:-1], comprimentos):
+            if n:
+                dados[inicio:inicio + n] = np.asarray(audio, dtype=np.float32).reshape(-1)
+        taxas = np.array([sr or 0 for _, sr in audios], dtype=np.int64)
+        sem_audio = np.array([a is None for a, _ in audios], dtype=bool)
+
+        caminho = self._arquivo(etapa, ".npz")
+        temp = f"{caminho}.tmp.npz"
+        np.savez(temp, dados=dados, deslocamentos=deslocamentos, taxas=taxas, sem_audio=sem_audio)
+        os.replace(temp, caminho)
+        self.registrar(etapa, fingerprint, caminho)
+
+    def carregar_audios(self, etapa, fingerprint):
+        """Retorna a lista de (audio, sr), ou None se o checkpoint for inválido."""
+        if not self.valido(etapa, fingerprint):
+            return None
+        try:
+            with np.load(self.etapas[etapa]["arquivo"]) as npz:
+                dados, desl, taxas, sem_audio = npz["dados"], npz["deslocamentos"], npz["taxas"], npz["sem_audio"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return [
+            (None, None) if vazio else (dados[desl[i]:desl[i + 1]], int(taxas[i]))
+            for i, vazio in enumerate(sem_audio)
+        ]
+
+    def salvar_plano(self, fingerprint, plano, legendas):
+        """Salva o plano de tempo (sem os áudios, recuperados pelo índice) e as legendas."""
+        itens = [{k: v for k, v in item.items() if k != "audio"} for item in plano]
+        self.salvar_json("plano", fingerprint, {"plano": itens, "legendas": legendas})
+
+    def carregar_plano(self, fingerprint, audios):
+        """
+        Retorna (plano, legendas) com os áudios religados a cada item pelo
+        índice do segmento, ou None se o checkpoint for inválido.
+        """
+        valor = self.carregar_json("plano", fingerprint)
+        if valor is None:
+            return None
+        plano = []
+        for item in valor["plano"]:
+            audio = audios[item["indice"]][0] if item["sr"] else None
+            plano.append({**item, "audio": audio})
+        return plano, valor["legendas"]
@@ -0,0 +1,188 @@
+import os
+import re
+import subprocess
+import threading
+
+from src.config import CODEC_VIDEO, ENCODER_VIDEO, VAAPI_DISPOSITIVO
+from src.services.cache import chave_cache, obter_cache
+from src.utils import obter_ffmpeg_exe
+
+# Encoders por codec de saída, em ordem de preferência no modo rápido
+# (hardware primeiro); o último de cada lista é o de CPU.
+ENCODERS = {
+    "h264": ["h264_nvenc", "h264_qsv", "h264_vaapi", "libx264"],
+    "hevc": ["hevc_nvenc", "hevc_qsv", "hevc_vaapi", "libx265"],
+    "av1": ["av1_nvenc", "av1_qsv", "av1_vaapi", "libsvtav1"],
+}
+
+_sonda = None
+_sonda_lock = threading.Lock()
+
+
+def _executar(cmd, timeout=30):
+    """Saída (stdout + stderr) de um comando curto do FFmpeg, ou None se falhar."""
+    try:
+        proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0:
+        return None
+    return (proc.stdout + proc.stderr).decode("utf-8", errors="replace")
+
+
+def _entrada_hw(encoder):
+    """Opções de entrada e filtro final que um encoder de hardware exige."""
+    if encoder.endswith("_vaapi"):
+        return ["-vaapi_device", VAAPI_DISPOSITIVO], "format=nv12,hwupload"
+    if encoder.endswith("_qsv"):
+        return [], "format=nv12"
+    return [], None
+
+
+def _encoder_funciona(ffmpeg, encoder):
+    """Codifica alguns quadros de teste: estar listado não garante o hardware presente."""
+    entrada, filtro = _entrada_hw(encoder)
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error"] + entrada + [
+        "-f", "lavfi", "-i", "color=black:s=256x256:r=25:d=0.2"]
+    if filtro:
+        cmd += ["-vf", filtro]
+    return _executar(cmd + ["-c:v", encoder, "-frames:v", "3", "-f", "null", "-"]) is not None
+
+
+def _sondar(ffmpeg):
+    saida = _executar([ffmpeg, "-hide_banner", "-encoders"]) or ""
+    listados = set(re.findall(r"^\s*V\S*\s+(\S+)", saida, re.MULTILINE))
+    saida = _executar([ffmpeg, "-hide_banner", "-hwaccels"]) or ""
+    hwaccels = [linha.strip() for linha in saida.splitlines()[1:] if linha.strip()]
+    versao = (_executar([ffmpeg, "-version"]) or "").split("\n", 1)[0]
+
+    encoders = []
+    for candidatos in ENCODERS.values():
+        for encoder in candidatos:
+            if encoder not in listados:
+                continue
+            if encoder.endswith("_vaapi") and not os.path.exists(VAAPI_DISPOSITIVO):
+                continue
+            hardware = encoder.split("_")[-1] in ("nvenc", "qsv", "vaapi")
+            if hardware and not _encoder_funciona(ffmpeg, encoder):
+                continue
+            encoders.append(encoder)
+    return {"versao": versao, "encoders": encoders, "hwaccels": hwaccels, "cpus": os.cpu_count() or 1}
+
+
+def sondar_ffmpeg():
+    """
+    Capacidades do FFmpeg desta máquina, sondadas uma vez.
+
+    Encoders listados em `-encoders` (os de hardware só contam se uma
+    codificação de teste funcionar), métodos de `-hwaccels` e número de
+    CPUs. O resultado fica em memória no processo e no cache de resultados
+    (namespace 'ffmpeg'), invalidado quando o executável ou a máquina mudam.
+
+    Returns:
+        dict: {'versao', 'encoders', 'hwaccels', 'cpus'}.
+    """
+    global _sonda
+    with _sonda_lock:
+        if _sonda is not None:
+            return _sonda
+        ffmpeg = obter_ffmpeg_exe()
+        try:
+            info = os.stat(ffmpeg)
+            assinatura = [info.st_size, info.st_mtime]
+        except OSError:
+            assinatura = []
+        chave = chave_cache("ffmpeg", ffmpeg, *assinatura, os.cpu_count(), os.path.exists(VAAPI_DISPOSITIVO),
+                            os.environ.get("CUDA_VISIBLE_DEVICES"))
+        cache = obter_cache()
+        sonda = cache.obter_json("ffmpeg", chave) if cache else None
+        if sonda is None:
+            sonda = _sondar(ffmpeg)
+            if cache: cache.salvar_json("ffmpeg", chave, sonda)
+        _sonda = sonda
+        return _sonda
+
+
+def escolher_perfil(modo="rapido", codec=None, sonda=None, aceita_vaapi=True, usar_hardware=True, threads=None):
+    """
+    Escolhe encoder e parâmetros a partir da sonda (ver `sondar_ffmpeg`).
+
+    'rapido' usa o primeiro encoder de hardware que funciona (NVENC, QSV,
+    VAAPI) e, sem nenhum, o de CPU num preset rápido; 'qualidade' usa sempre
+    o de CPU (libx264/libx265/SVT-AV1) com preset e threads pelo número de
+    núcleos. VIDEO_DUB_ENCODER força um encoder.
+
+    Args:
+        modo (str): 'rapido' ou 'qualidade'.
+        codec (str, optional): 'h264', 'hevc' ou 'av1'. Default: CODEC_VIDEO em config.
+        sonda (dict, optional): Resultado de `sondar_ffmpeg` (sondado se omitido).
+        aceita_vaapi (bool): False onde não há como subir os quadros para a
+            GPU (MoviePy envia quadros crus).
+        usar_hardware (bool): False força o encoder de CPU (ex: após uma
+            falha do de hardware).
+        threads (int, optional): Núcleos para este processo do encoder
+            (partes em paralelo); o preset continua pelo total da máquina.
+
+    Returns:
+        dict: {'encoder', 'preset', 'threads', 'extras' (demais args do
+              encoder), 'entrada' (args antes do '-i'), 'filtro' (filtro
+              final ou None), 'hardware' (bool)}. Ver `argumentos_encoder`.
+    """
+    sonda = sonda or sondar_ffmpeg()
+    codec = codec or CODEC_VIDEO
+    candidatos = ENCODERS.get(codec, ENCODERS["h264"])
+    cpus = sonda["cpus"]
+    nucleos = threads or cpus
+    disponiveis = [e for e in candidatos if usar_hardware and e in sonda["encoders"]
+                   and (aceita_vaapi or not e.endswith("_vaapi"))]
+
+    if ENCODER_VIDEO in candidatos and (usar_hardware or ENCODER_VIDEO == candidatos[-1]):
+        encoder = ENCODER_VIDEO
+    elif modo == "rapido" and disponiveis and disponiveis[0] != candidatos[-1]:
+        encoder = disponiveis[0]
+    else:
+        encoder = candidatos[-1]
+
+    entrada, filtro = _entrada_hw(encoder)
+    threads = None
+    if encoder.endswith("_nvenc"):
+        preset, params = "p1" if modo == "rapido" else "p5", ["-rc", "vbr", "-cq", "23", "-b:v", "0"]
+    elif encoder.endswith("_qsv"):
+        preset, params = "veryfast" if modo == "rapido" else "medium", ["-global_quality", "23"]
+    elif encoder.endswith("_vaapi"):
+        preset, params = None, ["-qp", "23"]
+    elif encoder == "libsvtav1":
+        # SVT-AV1: presets 0 (lento) a 13 (rápido); paraleliza sozinho pelos núcleos
+        preset = "10" if modo == "rapido" else ("6" if cpus >= 8 else "8")
+        params = ["-crf", "30", "-svtav1-params", f"lp={nucleos}"]
+    else:
+        # libx264 / libx265: preset pelo número de núcleos, threads = núcleos
+        if modo == "rapido":
+            preset = "veryfast" if cpus < 8 else "faster"
+        else:
+            preset = "medium" if cpus < 8 else "slow"
+        threads = nucleos
+        params = ["-crf", "18" if encoder == "libx264" else "22"]
+        if encoder == "libx265":
+            params += ["-x265-params", f"pools={nucleos}:log-level=error"]
+
+    return {"encoder": encoder, "preset": preset, "threads": threads, "extras": params, "entrada": entrada,
+            "filtro": filtro, "hardware": encoder != candidatos[-1]}
+
+
+def argumentos_encoder(perfil):
+    """Argumentos de saída do FFmpeg (`-c:v ...`) de um perfil de `escolher_perfil`."""
+    args = ["-c:v", perfil["encoder"]]
+    if perfil["preset"]: args += ["-preset", perfil["preset"]]
+    if perfil["threads"]: args += ["-threads", str(perfil["threads"])]
+    return args + perfil["extras"]
+
+
+def descrever_perfil(perfil, sonda=None):
+    """Resumo de uma linha da sonda e do perfil escolhido, para o log."""
+    sonda = sonda or sondar_ffmpeg()
+    hardware = [e for e in sonda["encoders"] if e.split("_")[-1] in ("nvenc", "qsv", "vaapi")]
+    detalhes = ", ".join(f"{k}={perfil[k]}" for k in ("preset", "threads") if perfil[k])
+    return (f"   🎛️ FFmpeg: {sonda['cpus']} CPUs, hardware: {', '.join(hardware) or 'nenhum'}"
+            f" (hwaccels: {', '.join(sonda['hwaccels']) or 'nenhum'}) -> {perfil['encoder']}"
+            f"{f' ({detalhes})' if detalhes else ''}")
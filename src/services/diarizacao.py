@@ -0,0 +1,316 @@
+import os
+import time
+
+import numpy as np
+
+from src.config import (obter_device, QWEN3_SPEAKERS, QWEN3_INSTRUCOES_FALANTES, DIARIZACAO_MODELO,
+                        DIARIZACAO_LOTE, DIARIZACAO_MAX_S, DIARIZACAO_MIN_S, DIARIZACAO_LIMIAR,
+                        DIARIZACAO_LIMIAR_MFCC, DIARIZACAO_MAX_FALANTES)
+from src.services.audio import _abrir_wav_memmap, _janela_mono_float32
+from src.services.models import obter_registro
+from src.services.telemetria import span
+
+
+def _trecho_central(amostras, sr, inicio, fim, max_s=DIARIZACAO_MAX_S):
+    """Amostras float32 mono do trecho central (até `max_s`) de um segmento."""
+    meio = (inicio + fim) / 2
+    meia = min(fim - inicio, max_s) / 2
+    return _janela_mono_float32(amostras, max(0, int((meio - meia) * sr)), int((meio + meia) * sr))
+
+
+def _banco_mel(sr, n_fft, n_mel):
+    """Banco de filtros triangulares na escala mel, shape (n_mel, n_fft // 2 + 1)."""
+    def hz_para_mel(f): return 2595 * np.log10(1 + f / 700)
+    def mel_para_hz(m): return 700 * (10 ** (m / 2595) - 1)
+    pontos = mel_para_hz(np.linspace(hz_para_mel(0), hz_para_mel(sr / 2), n_mel + 2))
+    freqs = np.fft.rfftfreq(n_fft, 1 / sr)
+    banco = np.zeros((n_mel, len(freqs)), dtype=np.float32)
+    for m in range(n_mel):
+        esquerda, centro, direita = pontos[m:m + 3]
+        subida = (freqs - esquerda) / (centro - esquerda)
+        descida = (direita - freqs) / (direita - centro)
+        banco[m] = np.maximum(0, np.minimum(subida, descida))
+    return banco
+
+
+def embeddings_mfcc(trechos, sr, n_mfcc=20, n_mel=40):
+    """
+    Embedding de falante sem modelo: média e desvio dos MFCCs dos quadros com voz.
+
+    Cada dimensão é padronizada sobre todos os trechos, então a distância de
+    cosseno compara o timbre de cada trecho com o timbre médio do vídeo.
+
+    Args:
+        trechos (list): Amostras float32 mono de cada trecho.
+        sr (int): Taxa de amostragem.
+        n_mfcc (int): Coeficientes usados (o de ordem 0, energia, é descartado).
+        n_mel (int): Filtros mel.
+
+    Returns:
+        np.ndarray: Embeddings (n_trechos, 2 * n_mfcc).
+    """
+    from scipy.fft import dct
+
+    tam = int(0.025 * sr)
+    passo = int(0.010 * sr)
+    n_fft = 1 << (tam - 1).bit_length()
+    banco = _banco_mel(sr, n_fft, n_mel)
+    janela = np.hamming(tam).astype(np.float32)
+
+    saida = np.zeros((len(trechos), 2 * n_mfcc), dtype=np.float32)
+    for i, x in enumerate(trechos):
+        if len(x) < tam:
+            x = np.pad(x, (0, tam - len(x)))
+        quadros = np.lib.stride_tricks.sliding_window_view(x, tam)[::passo] * janela
+        log_mel = np.log(np.abs(np.fft.rfft(quadros, n_fft)) ** 2 @ banco.T + 1e-10)
+        # Só os quadros com voz: o silêncio dentro do segmento não tem timbre
+        energia = log_mel.mean(axis=1)
+        log_mel = log_mel[energia >= np.percentile(energia, 30)]
+        mfcc = dct(log_mel, type=2, axis=1, norm="ortho")[:, 1:n_mfcc + 1]
+        saida[i] = np.concatenate([mfcc.mean(axis=0), mfcc.std(axis=0)])
+
+    if len(saida) > 1:
+        saida = (saida - saida.mean(axis=0)) / (saida.std(axis=0) + 1e-6)
+    return saida
+
+
+def _carregador_xvector(modelo):
+    """Carregador do modelo de x-vectors (extrator de features + WavLMForXVector) para o registro."""
+    def carregar():
+        from transformers import AutoFeatureExtractor, WavLMForXVector
+        return {
+            "extrator": AutoFeatureExtractor.from_pretrained(modelo),
+            "modelo": WavLMForXVector.from_pretrained(modelo).to(obter_device()).eval(),
+        }
+    return carregar
+
+
+def embeddings_xvector(trechos, sr, modelo=DIARIZACAO_MODELO, tamanho_lote=DIARIZACAO_LOTE, log_callback=None):
+    """
+    Embeddings x-vector (WavLM) dos trechos, calculados em lotes.
+
+    Os trechos são ordenados por duração antes de formar os lotes, para que
+    o padding de cada lote seja pequeno.
+
+    Args:
+        trechos (list): Amostras float32 mono de cada trecho.
+        sr (int): Taxa de amostragem (a do extrator de features, 16 kHz).
+        modelo (str): ID do modelo no Hugging Face.
+        tamanho_lote (int): Trechos por chamada do modelo.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Returns:
+        np.ndarray: Embeddings normalizados (n_trechos, dim).
+    """
+    import torch
+
+    device = obter_device()
+    ordem = sorted(range(len(trechos)), key=lambda i: len(trechos[i]), reverse=True)
+    resultado = [None] * len(trechos)
+    with obter_registro().usar(modelo, _carregador_xvector(modelo), device=device, dtype="float32",
+                               modo="diarizacao", log_callback=log_callback) as componentes:
+        for k in range(0, len(ordem), tamanho_lote):
+            lote = ordem[k:k + tamanho_lote]
+            with span("diarizacao.lote", itens=len(lote)):
+                entradas = componentes["extrator"]([trechos[i] for i in lote], sampling_rate=sr, padding=True,
+                                                   return_attention_mask=True, return_tensors="pt").to(device)
+                with torch.inference_mode():
+                    emb = componentes["modelo"](**entradas).embeddings
+                emb = torch.nn.functional.normalize(emb, dim=-1).float().cpu().numpy()
+            for i, e in zip(lote, emb):
+                resultado[i] = e
+    return np.stack(resultado)
+
+
+def agrupar_falantes(embeddings, limiar=DIARIZACAO_LIMIAR, max_falantes=DIARIZACAO_MAX_FALANTES):
+    """
+    Agrupamento aglomerativo (ligação média, distância de cosseno) dos embeddings.
+
+    Grupos são unidos enquanto a distância média entre eles for menor que
+    `limiar`; se sobrarem mais de `max_falantes` grupos, a árvore é cortada
+    em `max_falantes`.
+
+    Returns:
+        np.ndarray: Rótulo (0..k-1) de cada embedding.
+    """
+    from scipy.cluster.hierarchy import fcluster, linkage
+
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    if len(embeddings) < 2 or np.allclose(embeddings, embeddings[0]):
+        return np.zeros(len(embeddings), dtype=int)
+    # Vetores nulos não têm cosseno definido
+    embeddings = embeddings + 1e-9
+    arvore = linkage(embeddings, method="average", metric="cosine")
+    rotulos = fcluster(arvore, t=limiar, criterion="distance")
+    if rotulos.max() > max_falantes:
+        rotulos = fcluster(arvore, t=max_falantes, criterion="maxclust")
+    return rotulos - 1
+
+
+def diarizar_segmentos(caminho_audio, segmentos, modelo=DIARIZACAO_MODELO, log_callback=None):
+    """
+    Identifica o falante de cada segmento da transcrição.
+
+    Para cada segmento com pelo menos DIARIZACAO_MIN_S segundos, um embedding
+    de voz é calculado sobre o trecho central (até DIARIZACAO_MAX_S), em lotes
+    (ver `embeddings_xvector`); sem o modelo, usa `embeddings_mfcc` (com o
+    limiar DIARIZACAO_LIMIAR_MFCC). Os embeddings são agrupados por
+    `agrupar_falantes` e os segmentos curtos herdam o falante do segmento
+    analisado mais próximo no tempo. Os falantes são numerados por tempo de
+    fala: o falante 0 é o que mais fala.
+
+    Args:
+        caminho_audio (str): WAV extraído do vídeo (ver `extrair_audio`).
+        segmentos (list): Segmentos {'start', 'end', 'text'} da transcrição.
+        modelo (str, optional): Modelo de x-vectors; None usa MFCC.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Returns:
+        list: Cópias dos segmentos com a chave 'falante' (int).
+    """
+    if not segmentos:
+        return []
+    inicio = time.time()
+    amostras, sr, _ = _abrir_wav_memmap(caminho_audio)
+
+    analisados = [i for i, s in enumerate(segmentos) if s["end"] - s["start"] >= DIARIZACAO_MIN_S]
+    if not analisados:
+        analisados = list(range(len(segmentos)))
+    trechos = [_trecho_central(amostras, sr, segmentos[i]["start"], segmentos[i]["end"]) for i in analisados]
+
+    metodo, limiar = "MFCC", DIARIZACAO_LIMIAR_MFCC
+    embeddings = None
+    if modelo:
+        try:
+            embeddings = embeddings_xvector(trechos, sr, modelo, log_callback=log_callback)
+            metodo, limiar = modelo, DIARIZACAO_LIMIAR
+        except Exception as e:
+            warn = f"   ⚠️ Embeddings x-vector indisponíveis ({e}); usando MFCC."
+            if log_callback: log_callback(warn)
+            else: print(warn)
+    if embeddings is None:
+        embeddings = embeddings_mfcc(trechos, sr)
+    rotulos = agrupar_falantes(embeddings, limiar)
+
+    # Segmentos não analisados: falante do analisado mais próximo (pelo centro)
+    centros = np.array([(s["start"] + s["end"]) / 2 for s in segmentos])
+    centros_analisados = centros[analisados]
+    ordem = np.argsort(centros_analisados)
+    pos = np.clip(np.searchsorted(centros_analisados[ordem], centros), 1, max(1, len(ordem) - 1))
+    esquerda, direita = ordem[pos - 1], ordem[np.minimum(pos, len(ordem) - 1)]
+    mais_proximo = np.where(np.abs(centros - centros_analisados[esquerda]) <= np.abs(centros - centros_analisados[direita]),
+                            esquerda, direita)
+    por_segmento = rotulos[mais_proximo]
+    por_segmento[analisados] = rotulos
+
+    # Renumera por tempo de fala (decrescente)
+    duracoes = np.array([s["end"] - s["start"] for s in segmentos])
+    tempo = np.bincount(por_segmento, weights=duracoes)
+    nova_ordem = np.argsort(-tempo, kind="stable")
+    renumerar = np.empty_like(nova_ordem)
+    renumerar[nova_ordem] = np.arange(len(nova_ordem))
+    por_segmento = renumerar[por_segmento]
+
+    n_falantes = int(por_segmento.max()) + 1
+    msg = (f"   👥 Diarização: {n_falantes} falante(s) em {len(segmentos)} segmentos "
+           f"({len(analisados)} analisados, {metodo}, {time.time() - inicio:.1f}s)")
+    if log_callback: log_callback(msg)
+    else: print(msg)
+    return [{**s, "falante": int(f)} for s, f in zip(segmentos, por_segmento)]
+
+
+def extrair_referencias_falantes(caminho_audio, segmentos, caminho_base, duracao=10, isolamento_s=0.3,
+                                 log_callback=None):
+    """
+    Grava um áudio de referência (para clonagem de voz) por falante.
+
+    Os trechos mais limpos de cada falante são os segmentos longos sem fala de
+    outro falante a menos de `isolamento_s` segundos (sem risco de sobreposição
+    ou de corte na troca de turno). Os melhores são concatenados, na ordem do
+    vídeo, até somar `duracao` segundos.
+
+    Args:
+        caminho_audio (str): WAV extraído do vídeo.
+        segmentos (list): Segmentos com a chave 'falante' (ver `diarizar_segmentos`).
+        caminho_base (str): Path base das referências; o falante N é salvo em
+            '<base>_falanteN.wav'.
+        duracao (float): Duração alvo de cada referência (segundos).
+        isolamento_s (float): Distância mínima até a fala de outro falante.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Returns:
+        list: Path da referência de cada falante (None se não houver trecho utilizável).
+    """
+    import soundfile as sf
+
+    amostras, sr, _ = _abrir_wav_memmap(caminho_audio)
+    n_falantes = max((s["falante"] for s in segmentos), default=-1) + 1
+    raiz, ext = os.path.splitext(caminho_base)
+    referencias = []
+
+    for falante in range(n_falantes):
+        candidatos = []
+        for i, s in enumerate(segmentos):
+            if s["falante"] != falante:
+                continue
+            vizinhos = segmentos[max(0, i - 1):i] + segmentos[i + 1:i + 2]
+            isolado = all(v["falante"] == falante or v["end"] + isolamento_s <= s["start"] or
+                          s["end"] + isolamento_s <= v["start"] for v in vizinhos)
+            candidatos.append((isolado, s["end"] - s["start"], i))
+
+        escolhidos, total = [], 0.0
+        for isolado, dur, i in sorted(candidatos, reverse=True):
+            if total >= duracao:
+                break
+            escolhidos.append(i)
+            total += dur
+        if not escolhidos:
+            referencias.append(None)
+            continue
+
+        pausa = np.zeros(int(0.05 * sr), dtype=np.float32)
+        partes = []
+        for i in sorted(escolhidos):
+            s = segmentos[i]
+            partes += [_janela_mono_float32(amostras, int(s["start"] * sr), int(s["end"] * sr)), pausa]
+        caminho = f"{raiz}_falante{falante}{ext}"
+        trecho = np.concatenate(partes)[:int(duracao * sr)]
+        sf.write(caminho, trecho, sr, subtype="PCM_16")
+        referencias.append(caminho)
+
+    msg = f"   🎙️ Referências de voz: {sum(r is not None for r in referencias)}/{n_falantes} falantes"
+    if log_callback: log_callback(msg)
+    else: print(msg)
+    return referencias
+
+
+def mapear_vozes(n_falantes, motor, qwen3_mode="custom", qwen3_speaker="vivian", qwen3_instruct="",
+                 referencias=None):
+    """
+    Voz de cada falante, como atributos do `TTSEngine` a sobrepor (ver `TTSEngine.vozes`).
+
+    - Qwen3 CustomVoice: o falante 0 usa `qwen3_speaker`; os demais recebem
+      os outros speakers de QWEN3_SPEAKERS, em ordem (cíclica).
+    - Qwen3 VoiceDesign: o falante 0 usa `qwen3_instruct`; os demais, as
+      descrições de QWEN3_INSTRUCOES_FALANTES.
+    - Qwen3 Clone: cada falante clona a própria referência (ver
+      `extrair_referencias_falantes`); sem ela, usa a referência padrão.
+    - MMS: um único speaker por idioma; todos os falantes ficam com a mesma voz.
+
+    Returns:
+        dict: {falante: {atributo: valor}}; vazio se o motor não varia a voz.
+    """
+    if motor != "qwen3" or n_falantes < 1:
+        return {}
+    if qwen3_mode == "custom":
+        principal = (qwen3_speaker or "vivian").lower()
+        ordem = [principal] + [s for s in QWEN3_SPEAKERS if s != principal]
+        return {f: {"qwen3_speaker": ordem[f % len(ordem)]} for f in range(n_falantes)}
+    if qwen3_mode == "design":
+        instrucoes = [qwen3_instruct or QWEN3_INSTRUCOES_FALANTES[0]] + QWEN3_INSTRUCOES_FALANTES[1:]
+        return {f: {"qwen3_instruct": instrucoes[f % len(instrucoes)]} for f in range(n_falantes)}
+    if qwen3_mode == "clone":
+        referencias = referencias or []
+        return {f: {"ref_wav": referencias[f]} for f in range(n_falantes)
+                if f < len(referencias) and referencias[f]}
+    return {}
@@ -0,0 +1,125 @@
+import importlib.util
+import os
+from functools import lru_cache
+
+from src.config import obter_device, BACKEND_CPU, CPU_THREADS, JOBS_WORKERS_CPU, MODELOS_ONNX_DIR
+
+BACKENDS = ["torch", "int8", "onnx"]
+
+
+@lru_cache(maxsize=None)
+def _onnx_disponivel():
+    """True se `optimum` e `onnxruntime` estão instalados (sem importá-los)."""
+    disponivel = all(importlib.util.find_spec(m) is not None for m in ("optimum", "onnxruntime"))
+    if not disponivel:
+        print("   ⚠️ BACKEND_CPU='onnx' requer optimum e onnxruntime (uv sync --extra onnx); usando int8.")
+    return disponivel
+
+
+def backend_efetivo():
+    """
+    Backend de inferência do Whisper/NLLB: o configurado em CPU; 'torch' na GPU.
+
+    'onnx' sem `optimum`/`onnxruntime` instalados resolve para 'int8', o
+    backend de fato usado por `criar_pipeline_cpu` (e portanto o que entra nas
+    chaves de `identificador_modelo`).
+    """
+    if "cuda" in obter_device():
+        return "torch"
+    if BACKEND_CPU not in BACKENDS:
+        raise ValueError(f"BACKEND_CPU inválido: {BACKEND_CPU} (opções: {', '.join(BACKENDS)})")
+    if BACKEND_CPU == "onnx" and not _onnx_disponivel():
+        return "int8"
+    return BACKEND_CPU
+
+
+def identificador_modelo(model_id):
+    """
+    ID do modelo qualificado pelo backend (ex: 'openai/whisper-base@int8').
+
+    Usado nas chaves de cache e checkpoints: resultados de backends diferentes
+    não são intercambiáveis.
+    """
+    backend = backend_efetivo()
+    return model_id if backend == "torch" else f"{model_id}@{backend}"
+
+
+def threads_cpu():
+    """Threads intra-op: CPU_THREADS, ou as CPUs disponíveis divididas entre os workers de CPU."""
+    if CPU_THREADS > 0:
+        return CPU_THREADS
+    try:
+        disponiveis = len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows/macOS
+        disponiveis = os.cpu_count() or 1
+    return max(1, disponiveis // max(1, JOBS_WORKERS_CPU))
+
+
+def _carregar_onnx(tarefa, model_id, threads):
+    """Carrega (exportando na primeira vez) o modelo ONNX da tarefa com sessões do ONNX Runtime."""
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSpeechSeq2Seq
+
+    classe = ORTModelForSpeechSeq2Seq if tarefa == "automatic-speech-recognition" else ORTModelForSeq2SeqLM
+    opcoes = ort.SessionOptions()
+    opcoes.intra_op_num_threads = threads
+    opcoes.inter_op_num_threads = 1
+
+    destino = os.path.join(MODELOS_ONNX_DIR, model_id.replace("/", "--"))
+    if os.path.exists(os.path.join(destino, "config.json")):
+        return classe.from_pretrained(destino, session_options=opcoes, provider="CPUExecutionProvider")
+    modelo = classe.from_pretrained(model_id, export=True, session_options=opcoes, provider="CPUExecutionProvider")
+    modelo.save_pretrained(destino)
+    return modelo
+
+
+def criar_pipeline_cpu(tarefa, model_id, log_callback=None, **kwargs):
+    """
+    Cria uma pipeline Hugging Face em CPU no backend configurado (BACKEND_CPU).
+
+    - 'torch': pipeline float32 original.
+    - 'int8': mesma pipeline com as camadas `nn.Linear` quantizadas
+      dinamicamente para int8 (`torch.ao.quantization.quantize_dynamic`).
+    - 'onnx': modelo exportado para ONNX Runtime via `optimum`. Sem `optimum`
+      instalado, `backend_efetivo` já resolve para 'int8'. O Whisper exportado não devolve as atenções
+      cruzadas, então a transcrição usa timestamps por trecho (o fallback de
+      `transcrever_audio_whisper`) em vez de por palavra.
+
+    Em todos os casos o número de threads intra-op é ajustado (ver `threads_cpu`).
+
+    Args:
+        tarefa (str): Tarefa da pipeline ('automatic-speech-recognition' ou 'translation').
+        model_id (str): ID do modelo no Hugging Face.
+        log_callback (callable, optional): Função para logar mensagens.
+        **kwargs: Argumentos extras da pipeline (ex: chunk_length_s).
+
+    Returns:
+        transformers.Pipeline: A pipeline pronta para uso.
+    """
+    import torch
+    from transformers import pipeline
+
+    backend = backend_efetivo()
+    threads = threads_cpu()
+    torch.set_num_threads(threads)
+
+    msg = f"   🧮 CPU: backend {backend}, {threads} threads"
+    if log_callback: log_callback(msg)
+    else: print(msg)
+
+    if backend == "onnx":
+        # Instalação quebrada falha aqui: cair para int8 gravaria resultados sob a chave '@onnx'
+        modelo = _carregar_onnx(tarefa, model_id, threads)
+        if tarefa == "automatic-speech-recognition":
+            from transformers import AutoProcessor
+            processador = AutoProcessor.from_pretrained(model_id)
+            return pipeline(task=tarefa, model=modelo, tokenizer=processador.tokenizer,
+                            feature_extractor=processador.feature_extractor, device=-1, **kwargs)
+        from transformers import AutoTokenizer
+        return pipeline(task=tarefa, model=modelo, tokenizer=AutoTokenizer.from_pretrained(model_id),
+                        device=-1, **kwargs)
+
+    pipe = pipeline(task=tarefa, model=model_id, device=-1, torch_dtype=torch.float32, **kwargs)
+    if backend == "int8":
+        pipe.model = torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
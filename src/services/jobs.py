@@ -0,0 +1,330 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+# Estados de um job
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+
+RECURSOS = ["gpu", "cpu"]
+
+
+class FilaJobs:
+    """
+    Fila persistente de jobs de dublagem (SQLite local).
+
+    Cada job tem um ID, um diretório de trabalho próprio (entrada, áudio
+    extraído, legendas e vídeo final) e os parâmetros do pipeline. Os workers
+    retiram jobs de forma atômica, então vários processos/threads podem
+    compartilhar o mesmo banco.
+    """
+    def __init__(self, caminho_db, diretorio_jobs):
+        """
+        Args:
+            caminho_db (str): Arquivo SQLite.
+            diretorio_jobs (str): Diretório base dos diretórios de trabalho.
+        """
+        self.caminho_db = caminho_db
+        self.diretorio_jobs = diretorio_jobs
+        os.makedirs(diretorio_jobs, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(caminho_db)), exist_ok=True)
+        with self._conectar() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    recurso TEXT NOT NULL,
+                    parametros TEXT NOT NULL,
+                    diretorio TEXT NOT NULL,
+                    resultado TEXT,
+                    erro TEXT,
+                    progresso TEXT,
+                    criado_em REAL NOT NULL,
+                    iniciado_em REAL,
+                    finalizado_em REAL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_fila ON jobs (status, recurso, criado_em)")
+
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho_db, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        return _Conexao(con)
+
+    @staticmethod
+    def _como_dict(linha):
+        if linha is None:
+            return None
+        job = dict(linha)
+        job["parametros"] = json.loads(job["parametros"])
+        job["resultado"] = json.loads(job["resultado"]) if job["resultado"] else None
+        return job
+
+    def criar(self, parametros, recurso="gpu", arquivo_entrada=None):
+        """
+        Cria um job pendente e o seu diretório de trabalho.
+
+        Args:
+            parametros (dict): Argumentos de `executar_pipeline` (serializáveis em JSON).
+            recurso (str): Pool de workers que deve executá-lo ('gpu' ou 'cpu').
+            arquivo_entrada (str, optional): Vídeo a mover para o diretório do
+                job; o novo caminho fica em parametros['entrada'].
+
+        Returns:
+            dict: O job criado.
+        """
+        if recurso not in RECURSOS:
+            raise ValueError(f"Recurso inválido: {recurso}")
+        job_id = uuid.uuid4().hex[:12]
+        diretorio = os.path.join(self.diretorio_jobs, job_id)
+        os.makedirs(diretorio, exist_ok=True)
+        if arquivo_entrada:
+            entrada = os.path.join(diretorio, "entrada" + os.path.splitext(arquivo_entrada)[1])
+            shutil.move(arquivo_entrada, entrada)
+            parametros = {**parametros, "entrada": entrada}
+        with self._conectar() as con:
+            con.execute(
+                "INSERT INTO jobs (id, status, recurso, parametros, diretorio, criado_em) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, PENDENTE, recurso, json.dumps(parametros), diretorio, time.time()),
+            )
+        return self.obter(job_id)
+
+    def obter(self, job_id):
+        """Retorna o job (dict) ou None se não existir."""
+        with self._conectar() as con:
+            return self._como_dict(con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def listar(self, status=None, limite=100):
+        """Lista os jobs mais recentes, opcionalmente filtrando por status."""
+        with self._conectar() as con:
+            if status:
+                linhas = con.execute("SELECT * FROM jobs WHERE status = ? ORDER BY criado_em DESC LIMIT ?",
+                                     (status, limite)).fetchall()
+            else:
+                linhas = con.execute("SELECT * FROM jobs ORDER BY criado_em DESC LIMIT ?", (limite,)).fetchall()
+        return [self._como_dict(l) for l in linhas]
+
+    def posicao(self, job_id):
+        """Quantos jobs pendentes do mesmo recurso estão à frente deste (None se não pendente)."""
+        job = self.obter(job_id)
+        if not job or job["status"] != PENDENTE:
+            return None
+        with self._conectar() as con:
+            return con.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND recurso = ? AND criado_em < ?",
+                (PENDENTE, job["recurso"], job["criado_em"]),
+            ).fetchone()[0]
+
+    def contar_por_status(self):
+        """Número de jobs em cada status."""
+        with self._conectar() as con:
+            linhas = con.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {l["status"]: l["n"] for l in linhas}
+
+    def retirar(self, recurso):
+        """
+        Marca o job pendente mais antigo do recurso como em execução.
+
+        Returns:
+            dict: O job retirado, ou None se a fila estiver vazia.
+        """
+        with self._conectar() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                linha = con.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND recurso = ? ORDER BY criado_em LIMIT 1",
+                    (PENDENTE, recurso),
+                ).fetchone()
+                if linha is None:
+                    con.execute("COMMIT")
+                    return None
+                con.execute("UPDATE jobs SET status = ?, iniciado_em = ? WHERE id = ?",
+                            (EXECUTANDO, time.time(), linha["id"]))
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        return self.obter(linha["id"])
+
+    def atualizar_progresso(self, job_id, mensagem):
+        with self._conectar() as con:
+            con.execute("UPDATE jobs SET progresso = ? WHERE id = ?", (mensagem, job_id))
+
+    def concluir(self, job_id, resultado):
+        with self._conectar() as con:
+            con.execute("UPDATE jobs SET status = ?, resultado = ?, finalizado_em = ? WHERE id = ?",
+                        (CONCLUIDO, json.dumps(resultado), time.time(), job_id))
+
+    def falhar(self, job_id, erro):
+        with self._conectar() as con:
+            con.execute("UPDATE jobs SET status = ?, erro = ?, finalizado_em = ? WHERE id = ?",
+                        (FALHOU, str(erro), time.time(), job_id))
+
+    def reenfileirar(self, job_id, recurso=None):
+        """
+        Devolve um job que falhou à fila, marcado para retomar dos checkpoints
+        (parametros['retomar'] = True). O diretório de trabalho é mantido.
+
+        Args:
+            job_id (str): ID do job.
+            recurso (str, optional): Pool que deve executá-lo. Default: o original.
+
+        Returns:
+            dict: O job reenfileirado, ou None se não existir ou não tiver falhado.
+        """
+        with self._conectar() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                linha = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if linha is None or linha["status"] != FALHOU:
+                    con.execute("COMMIT")
+                    return None
+                parametros = {**json.loads(linha["parametros"]), "retomar": True}
+                con.execute(
+                    "UPDATE jobs SET status = ?, recurso = ?, parametros = ?, erro = NULL, progresso = NULL, "
+                    "iniciado_em = NULL, finalizado_em = NULL WHERE id = ?",
+                    (PENDENTE, recurso or linha["recurso"], json.dumps(parametros), job_id),
+                )
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        return self.obter(job_id)
+
+    def reenfileirar_interrompidos(self):
+        """
+        Devolve à fila os jobs que estavam em execução quando o servidor parou,
+        marcados para retomar dos checkpoints (parametros['retomar'] = True).
+
+        Returns:
+            int: Número de jobs reenfileirados.
+        """
+        with self._conectar() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                linhas = con.execute("SELECT id, parametros FROM jobs WHERE status = ?", (EXECUTANDO,)).fetchall()
+                for linha in linhas:
+                    parametros = {**json.loads(linha["parametros"]), "retomar": True}
+                    con.execute("UPDATE jobs SET status = ?, parametros = ?, iniciado_em = NULL WHERE id = ?",
+                                (PENDENTE, json.dumps(parametros), linha["id"]))
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        return len(linhas)
+
+    def transferir_pendentes(self, recurso):
+        """
+        Passa para o recurso os jobs pendentes de outros recursos (ex: criados
+        num servidor com GPU e retomados num sem GPU).
+
+        Returns:
+            int: Número de jobs transferidos.
+        """
+        with self._conectar() as con:
+            cur = con.execute("UPDATE jobs SET recurso = ? WHERE status = ? AND recurso != ?",
+                              (recurso, PENDENTE, recurso))
+            return cur.rowcount
+
+
+class _Conexao:
+    """Context manager que fecha a conexão SQLite ao sair (o `with` nativo só faz commit)."""
+    def __init__(self, con):
+        self.con = con
+
+    def __enter__(self):
+        return self.con
+
+    def __exit__(self, *exc):
+        self.con.close()
+        return False
+
+
+class PoolWorkers:
+    """
+    Pool de threads que executa os jobs da fila com paralelismo controlado.
+
+    Há um número fixo de workers por recurso (ex: 1 na GPU, 2 na CPU); cada
+    worker retira um job por vez da fila do seu recurso.
+    """
+    def __init__(self, fila, executar_job, workers_por_recurso, log_callback=None):
+        """
+        Args:
+            fila (FilaJobs): Fila persistente.
+            executar_job (callable): Recebe o job (dict) e retorna o resultado
+                (dict serializável). Exceções marcam o job como falho.
+            workers_por_recurso (dict): Ex: {'gpu': 1, 'cpu': 2}.
+            log_callback (callable, optional): Função para logar mensagens.
+        """
+        self.fila = fila
+        self.executar_job = executar_job
+        self.workers_por_recurso = workers_por_recurso
+        self.log_callback = log_callback
+        self._parar = threading.Event()
+        self._novos = {recurso: threading.Condition() for recurso in RECURSOS}
+        self._threads = []
+
+    def _log(self, msg):
+        if self.log_callback: self.log_callback(msg)
+        else: print(msg)
+
+    def iniciar(self):
+        """
+        Reenfileira jobs interrompidos e inicia os workers. Com um único recurso
+        ativo (com workers), os jobs pendentes dos demais passam para ele.
+        """
+        n = self.fila.reenfileirar_interrompidos()
+        if n: self._log(f"   ♻️ {n} job(s) interrompido(s) de volta à fila.")
+        ativos = [recurso for recurso, quantidade in self.workers_por_recurso.items() if quantidade > 0]
+        if len(ativos) == 1:
+            n = self.fila.transferir_pendentes(ativos[0])
+            if n: self._log(f"   ♻️ {n} job(s) pendente(s) transferido(s) para {ativos[0]}.")
+        for recurso, quantidade in self.workers_por_recurso.items():
+            for i in range(quantidade):
+                t = threading.Thread(target=self._loop, args=(recurso,), name=f"worker-{recurso}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        self._log(f"   👷 Workers: {', '.join(f'{r}={n}' for r, n in self.workers_por_recurso.items())}")
+
+    def notificar(self, recurso):
+        """Acorda um worker do recurso (chamar após `FilaJobs.criar`)."""
+        condicao = self._novos[recurso]
+        with condicao:
+            condicao.notify()
+
+    def parar(self, timeout=None):
+        """Sinaliza os workers para terminar após o job atual."""
+        self._parar.set()
+        for condicao in self._novos.values():
+            with condicao:
+                condicao.notify_all()
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+    def _loop(self, recurso):
+        condicao = self._novos[recurso]
+        while not self._parar.is_set():
+            job = self.fila.retirar(recurso)
+            if job is None:
+                # Espera por notificação; o timeout cobre jobs criados por outro processo
+                with condicao:
+                    condicao.wait(timeout=2.0)
+                continue
+
+            self._log(f"   ▶️ Job {job['id']} iniciado ({recurso}).")
+            try:
+                resultado = self.executar_job(job)
+                self.fila.concluir(job["id"], resultado)
+                self._log(f"   ✅ Job {job['id']} concluído.")
+            except Exception as e:
+                traceback.print_exc()
+                self.fila.falhar(job["id"], e)
+                self._log(f"   ❌ Job {job['id']} falhou: {e}")
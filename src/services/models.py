@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.utils import liberar_memoria_gpu
+from src.services.telemetria import span
+
+
+class _EntradaModelo:
+    """Modelo residente no registro, com contagem de referências."""
+    def __init__(self, chave, modelo, bytes_residentes, tempo_carga):
+        self.chave = chave
+        self.modelo = modelo
+        self.bytes_residentes = bytes_residentes
+        self.tempo_carga = tempo_carga
+        self.referencias = 0
+        self.ultimo_uso = time.time()
+
+
+def estimar_bytes_modelo(modelo):
+    """
+    Estima a memória ocupada pelos pesos de um modelo.
+
+    Percorre pipelines Hugging Face (`.model`), módulos torch (`.parameters()` e
+    `.buffers()`) e contêineres simples (dict/list/tuple).
+
+    Args:
+        modelo: Objeto carregado (pipeline, nn.Module, dict de componentes...).
+
+    Returns:
+        int: Total estimado em bytes (0 se não for possível estimar).
+    """
+    vistos = set()
+
+    def _bytes(obj):
+        if obj is None or id(obj) in vistos:
+            return 0
+        vistos.add(id(obj))
+
+        if isinstance(obj, dict):
+            return sum(_bytes(v) for v in obj.values())
+        if isinstance(obj, (list, tuple)):
+            return sum(_bytes(v) for v in obj)
+
+        total = 0
+        if hasattr(obj, "parameters") and callable(obj.parameters):
+            try:
+                for p in obj.parameters():
+                    total += p.numel() * p.element_size()
+                for b in obj.buffers():
+                    total += b.numel() * b.element_size()
+                return total
+            except Exception:
+                total = 0
+
+        # Pipelines HF e wrappers (ex: Qwen3TTSModel) guardam o modelo em `.model`
+        interno = getattr(obj, "model", None)
+        if interno is not None and interno is not obj:
+            total += _bytes(interno)
+        return total
+
+    return _bytes(modelo)
+
+
+class ModelRegistry:
+    """
+    Registro de modelos compartilhado pelo processo.
+
+    Mantém modelos (Whisper, NLLB, MMS, Qwen3...) carregados entre execuções do
+    pipeline. Cada modelo é identificado por (model_id, device, dtype, modo) e
+    carregado sob demanda na primeira requisição. Jobs concorrentes compartilham
+    a mesma instância via contagem de referências; modelos sem referências
+    ativas são descarregados por LRU quando o orçamento de memória é excedido.
+    """
+    def __init__(self, limite_bytes=None):
+        """
+        Args:
+            limite_bytes (int, optional): Orçamento de memória para modelos
+                residentes. None desabilita a evicção.
+        """
+        self.limite_bytes = limite_bytes
+        self._entradas = OrderedDict()
+        self._lock = threading.RLock()
+        self._carregando = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "tempo_carga_s": 0.0,
+        }
+
+    @staticmethod
+    def chave(model_id, device=None, dtype=None, modo=None):
+        """Monta a chave canônica (model_id, device, dtype, modo)."""
+        return (str(model_id), str(device), str(dtype), str(modo))
+
+    def adquirir(self, model_id, carregador, device=None, dtype=None, modo=None, log_callback=None):
+        """
+        Obtém um modelo do registro, carregando-o se necessário.
+
+        Incrementa a contagem de referências; o chamador deve chamar `liberar`
+        (ou usar `usar`) ao terminar.
+
+        Args:
+            model_id (str): ID do modelo (ex: 'openai/whisper-base').
+            carregador (callable): Função sem argumentos que carrega o modelo.
+            device (str, optional): Dispositivo (ex: 'cuda:0', 'cpu').
+            dtype (str, optional): Tipo de dado dos pesos.
+            modo (str, optional): Variante/modo de uso (ex: 'asr', 'clone').
+            log_callback (callable, optional): Função para logar mensagens.
+
+        Returns:
+            object: O modelo carregado.
+        """
+        chave = self.chave(model_id, device, dtype, modo)
+
+        while True:
+            with self._lock:
+                entrada = self._entradas.get(chave)
+                if entrada is not None:
+                    entrada.referencias += 1
+                    entrada.ultimo_uso = time.time()
+                    self._entradas.move_to_end(chave)
+                    self._stats["hits"] += 1
+                    if log_callback: log_callback(f"   ♻️ Modelo em memória: {model_id}")
+                    return entrada.modelo
+
+                evento = self._carregando.get(chave)
+                if evento is None:
+                    # Esta thread fica responsável pela carga
+                    evento = threading.Event()
+                    self._carregando[chave] = evento
+                    self._stats["misses"] += 1
+                    break
+
+            # Outra thread já está carregando o mesmo modelo: aguardar
+            evento.wait()
+
+        try:
+            inicio = time.time()
+            with span("modelo.carga", model_id=str(model_id), modo=str(modo)):
+                modelo = carregador()
+            tempo_carga = time.time() - inicio
+            bytes_residentes = estimar_bytes_modelo(modelo)
+
+            with self._lock:
+                entrada = _EntradaModelo(chave, modelo, bytes_residentes, tempo_carga)
+                entrada.referencias = 1
+                self._entradas[chave] = entrada
+                self._stats["tempo_carga_s"] += tempo_carga
+                self._evictar(log_callback)
+
+            if log_callback:
+                log_callback(f"   📦 Modelo carregado: {model_id} ({tempo_carga:.1f}s, {bytes_residentes / 1024**2:.0f} MB)")
+            return modelo
+        finally:
+            with self._lock:
+                self._carregando.pop(chave, None)
+            evento.set()
+
+    def liberar(self, modelo):
+        """
+        Decrementa a contagem de referências de um modelo adquirido.
+
+        Args:
+            modelo: Objeto retornado por `adquirir`.
+        """
+        with self._lock:
+            for entrada in self._entradas.values():
+                if entrada.modelo is modelo:
+                    entrada.referencias = max(0, entrada.referencias - 1)
+                    entrada.ultimo_uso = time.time()
+                    break
+            self._evictar()
+
+    @contextmanager
+    def usar(self, model_id, carregador, device=None, dtype=None, modo=None, log_callback=None):
+        """Context manager equivalente a `adquirir` + `liberar`."""
+        modelo = self.adquirir(model_id, carregador, device=device, dtype=dtype,
+                               modo=modo, log_callback=log_callback)
+        try:
+            yield modelo
+        finally:
+            self.liberar(modelo)
+
+    def _bytes_residentes(self):
+        return sum(e.bytes_residentes for e in self._entradas.values())
+
+    def _evictar(self, log_callback=None):
+        """Descarrega modelos ociosos (LRU) até caber no orçamento."""
+        if self.limite_bytes is None:
+            return
+        evictados = 0
+        for chave in list(self._entradas.keys()):
+            if self._bytes_residentes() <= self.limite_bytes:
+                break
+            entrada = self._entradas[chave]
+            if entrada.referencias > 0:
+                continue
+            del self._entradas[chave]
+            evictados += 1
+            self._stats["evictions"] += 1
+            if log_callback: log_callback(f"   🗑️ Modelo descarregado (LRU): {chave[0]}")
+        if evictados:
+            liberar_memoria_gpu()
+
+    def descarregar_todos(self):
+        """Remove todos os modelos sem referências ativas."""
+        with self._lock:
+            for chave in list(self._entradas.keys()):
+                if self._entradas[chave].referencias == 0:
+                    del self._entradas[chave]
+        liberar_memoria_gpu()
+
+    def estatisticas(self):
+        """
+        Retorna estatísticas de uso do registro.
+
+        Returns:
+            dict: hits, misses, evictions, tempo total de carga, bytes residentes
+                  e detalhes por modelo.
+        """
+        with self._lock:
+            modelos = [
+                {
+                    "model_id": e.chave[0],
+                    "device": e.chave[1],
+                    "dtype": e.chave[2],
+                    "modo": e.chave[3],
+                    "referencias": e.referencias,
+                    "bytes_residentes": e.bytes_residentes,
+                    "tempo_carga_s": round(e.tempo_carga, 2),
+                }
+                for e in self._entradas.values()
+            ]
+            return {
+                **self._stats,
+                "tempo_carga_s": round(self._stats["tempo_carga_s"], 2),
+                "bytes_residentes": self._bytes_residentes(),
+                "limite_bytes": self.limite_bytes,
+                "modelos": modelos,
+            }
+
+    def resumo(self):
+        """Linha de texto com o resumo das estatísticas (para logs/CLI)."""
+        s = self.estatisticas()
+        return (f"Modelos: {len(s['modelos'])} residentes "
+                f"({s['bytes_residentes'] / 1024**2:.0f} MB) | "
+                f"hits: {s['hits']} | misses: {s['misses']} | "
+                f"evictions: {s['evictions']} | carga: {s['tempo_carga_s']:.1f}s")
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+def obter_registro():
+    """Retorna o registro de modelos do processo (singleton)."""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            from src.config import MODEL_REGISTRY_BUDGET_MB
+            limite = MODEL_REGISTRY_BUDGET_MB * 1024**2 if MODEL_REGISTRY_BUDGET_MB else None
+            _registro = ModelRegistry(limite_bytes=limite)
+        return _registro
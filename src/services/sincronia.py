@@ -0,0 +1,102 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def esticar_audio(audio, fator, sr, janela_s=0.02, tolerancia_s=0.008):
+    """
+    Muda a velocidade da fala sem mudar o tom (WSOLA).
+
+    Quadros com janela de Hann são lidos a cada `janela/2 * fator` amostras e
+    sobrepostos a cada `janela/2`; cada quadro é deslocado (até
+    ±`tolerancia_s`) para a posição de maior correlação com a continuação
+    natural do quadro anterior, evitando cancelamentos de fase.
+
+    Args:
+        audio (np.ndarray): Sinal mono.
+        fator (float): Velocidade (>1 acelera/encurta, <1 desacelera/alonga).
+        sr (int): Taxa de amostragem.
+        janela_s (float): Duração de cada quadro (segundos).
+        tolerancia_s (float): Deslocamento máximo de cada quadro (segundos).
+
+    Returns:
+        np.ndarray: Sinal float32 com `round(len(audio) / fator)` amostras.
+    """
+    x = np.asarray(audio, dtype=np.float32).reshape(-1)
+    n_saida = int(round(len(x) / fator))
+    if abs(fator - 1.0) < 1e-3 or len(x) == 0:
+        return x.copy()
+
+    passo_saida = max(1, int(round(janela_s * sr)) // 2)
+    n = 2 * passo_saida
+    passo_entrada = passo_saida * fator
+    delta = max(1, int(round(tolerancia_s * sr)))
+    janela = np.hanning(n + 1)[:n].astype(np.float32)  # Hann periódica: soma 1 com 50% de sobreposição
+
+    n_quadros = n_saida // passo_saida + 2
+    # Margem inicial: o primeiro quadro entra pela metade (rampa) e a busca pode recuar `delta`
+    inicio = passo_saida + delta
+    fim_necessario = int(round((n_quadros + 1) * passo_entrada)) + inicio + n + 2 * delta
+    x = np.concatenate([np.zeros(inicio, np.float32), x,
+                        np.zeros(max(0, fim_necessario - inicio - len(x)), np.float32)])
+
+    y = np.zeros(n_quadros * passo_saida + n, dtype=np.float32)
+    desvio = 0
+    for k in range(n_quadros):
+        pos = int(round(k * passo_entrada)) + delta + desvio
+        y[k * passo_saida:k * passo_saida + n] += x[pos:pos + n] * janela
+        # Continuação natural do quadro copiado vs. candidatos em torno do próximo ponto
+        alvo = x[pos + passo_saida:pos + passo_saida + n]
+        proximo = int(round((k + 1) * passo_entrada))
+        candidatos = sliding_window_view(x[proximo:proximo + 2 * delta + n], n)
+        desvio = int(np.argmax(candidatos @ alvo)) - delta
+    return y[passo_saida:passo_saida + n_saida]
+
+
+def planejar_ajuste(janelas, duracoes_audio, duracao_video, esticar_max=0.25, antecipar_max=0.3):
+    """
+    Encaixa cada fala dublada no tempo do vídeo original sem mudar a sua duração.
+
+    Para cada segmento, em ordem: se a fala cabe até o início do próximo
+    segmento (usando o silêncio seguinte), começa no próprio início; se não,
+    pode começar até `antecipar_max` segundos antes, no silêncio anterior
+    ainda livre; se ainda não couber, é acelerada (WSOLA) até
+    `1 + esticar_max`. Só quando nem assim cabe o trecho do vídeo é
+    desacelerado (último recurso), e só esse trecho altera a duração final.
+
+    Args:
+        janelas (list): Pares (início, fim) dos segmentos no vídeo, em ordem.
+        duracoes_audio (list): Duração de cada fala dublada (segundos; 0 = sem áudio).
+        duracao_video (float): Duração do vídeo original.
+        esticar_max (float): Aceleração máxima da fala (0.25 = até 1.25x).
+        antecipar_max (float): Quanto a fala pode começar antes do segmento.
+
+    Returns:
+        list: Um dict por segmento encaixado ('indice', 'inicio', 'limite',
+              'fator', 'duracao_audio'): a fala (já com `fator`) começa em
+              `inicio`; se `duracao_audio` passar de `limite - inicio`, o
+              vídeo entre `inicio` e `limite` precisa ser desacelerado.
+    """
+    ajustes = []
+    inicios = [ini for ini, _ in janelas]
+    cursor = 0.0
+    j = 0
+    for i, (inicio_seg, dur) in enumerate(zip(inicios, duracoes_audio)):
+        if inicio_seg >= duracao_video: break
+        inicio = max(inicio_seg, cursor)
+        # Próximo segmento que começa depois deste (transcrições podem se sobrepor)
+        j = max(j, i + 1)
+        while j < len(inicios) and inicios[j] <= inicio: j += 1
+        limite = min(inicios[j], duracao_video) if j < len(inicios) else duracao_video
+        if limite - inicio <= 0.1: continue
+
+        fator = 1.0
+        if dur > limite - inicio:
+            # Silêncio anterior ainda livre, só o necessário
+            inicio = max(cursor, inicio - antecipar_max, limite - dur)
+            if dur > limite - inicio:
+                fator = min(dur / (limite - inicio), 1.0 + esticar_max)
+        duracao_audio = dur / fator
+        ajustes.append({"indice": i, "inicio": inicio, "limite": limite, "fator": fator,
+                        "duracao_audio": duracao_audio})
+        cursor = min(inicio + duracao_audio, limite)
+    return ajustes
@@ -0,0 +1,334 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config import TELEMETRIA_AMOSTRAGEM_S
+
+# Rastreador e span ativos no contexto atual (thread/tarefa)
+_rastreador_atual = contextvars.ContextVar("rastreador_atual", default=None)
+_span_atual = contextvars.ContextVar("span_atual", default=None)
+
+
+def _rss_atual_bytes():
+    """RSS atual do processo (Linux: /proc/self/statm)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def _gpu_bytes():
+    """
+    (alocado, pico desde o início do processo) da GPU, ou (None, None) sem
+    CUDA. Não importa o torch nem zera os contadores do PyTorch.
+    """
+    torch = sys.modules.get("torch")
+    try:
+        if torch is not None and torch.cuda.is_available():
+            return torch.cuda.memory_allocated(), torch.cuda.max_memory_allocated()
+    except Exception:
+        pass
+    return None, None
+
+
+def _maior(*valores):
+    valores = [v for v in valores if v is not None]
+    return max(valores) if valores else None
+
+
+class Span:
+    """
+    Intervalo medido de um estágio ou sub-etapa do pipeline.
+
+    Registra tempo de parede, tempo de CPU da thread que executou o span
+    (trabalho de outras threads conta nos spans delas), RSS (no fim, variação
+    e pico durante o span), memória da GPU (no fim e pico durante o span) e a
+    quantidade de itens processados.
+
+    Os picos valem só para o intervalo do span: o RSS é amostrado pelo
+    rastreador a cada TELEMETRIA_AMOSTRAGEM_S enquanto o span está aberto; na
+    GPU, se o pico do PyTorch subiu desde a abertura ele foi atingido durante
+    o span, senão vale o maior valor alocado amostrado. Como as medidas de
+    memória são do processo, spans simultâneos em outras threads também
+    contribuem para elas.
+    """
+    def __init__(self, nome, pai=None, **atributos):
+        self.nome = nome
+        self.pai = pai
+        self.itens = atributos.pop("itens", None)
+        self.atributos = atributos
+        self.inicio = time.time()
+        self._inicio_parede = time.perf_counter()
+        self._inicio_cpu = time.thread_time()
+        self._rss_inicio = _rss_atual_bytes()
+        self._gpu_inicio, self._gpu_pico_processo_inicio = _gpu_bytes()
+        self.duracao_s = None
+        self.cpu_s = None
+        self.rss_bytes = None
+        self.rss_delta_bytes = None
+        self.rss_pico_bytes = self._rss_inicio
+        self.gpu_bytes = None
+        self.gpu_pico_bytes = self._gpu_inicio
+        self.thread = threading.current_thread().name
+
+    def definir(self, **atributos):
+        """Adiciona atributos (ou `itens`) ao span em andamento."""
+        if "itens" in atributos:
+            self.itens = atributos.pop("itens")
+        self.atributos.update(atributos)
+
+    def amostrar(self, rss_bytes, gpu_bytes):
+        """Atualiza os picos com uma amostra tirada enquanto o span está aberto."""
+        self.rss_pico_bytes = _maior(self.rss_pico_bytes, rss_bytes)
+        self.gpu_pico_bytes = _maior(self.gpu_pico_bytes, gpu_bytes)
+
+    def fechar(self):
+        # Precisa rodar na thread que abriu o span (thread_time é por thread)
+        self.duracao_s = time.perf_counter() - self._inicio_parede
+        self.cpu_s = time.thread_time() - self._inicio_cpu
+        self.rss_bytes = _rss_atual_bytes()
+        if self.rss_bytes is not None and self._rss_inicio is not None:
+            self.rss_delta_bytes = self.rss_bytes - self._rss_inicio
+        self.gpu_bytes, gpu_pico_processo = _gpu_bytes()
+        self.amostrar(self.rss_bytes, self.gpu_bytes)
+        if gpu_pico_processo is not None and gpu_pico_processo > (self._gpu_pico_processo_inicio or 0):
+            self.gpu_pico_bytes = _maior(self.gpu_pico_bytes, gpu_pico_processo)
+
+    def como_dict(self):
+        return {
+            "nome": self.nome,
+            "pai": self.pai.nome if self.pai else None,
+            "thread": self.thread,
+            "inicio": self.inicio,
+            "duracao_s": round(self.duracao_s, 4) if self.duracao_s is not None else None,
+            "cpu_s": round(self.cpu_s, 4) if self.cpu_s is not None else None,
+            "rss_bytes": self.rss_bytes,
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "rss_pico_bytes": self.rss_pico_bytes,
+            "gpu_bytes": self.gpu_bytes,
+            "gpu_pico_bytes": self.gpu_pico_bytes,
+            "itens": self.itens,
+            "atributos": self.atributos,
+        }
+
+
+@contextmanager
+def span(nome, **atributos):
+    """
+    Mede um bloco de código como um span do rastreador ativo.
+
+    Sem rastreador ativo (ex: serviço chamado fora do pipeline) o bloco
+    roda normalmente e nada é registrado.
+
+    Args:
+        nome (str): Nome do estágio (ex: 'whisper.inferencia').
+        **atributos: Atributos livres; `itens` conta os itens processados.
+
+    Yields:
+        Span: O span em andamento (use `definir` para completar atributos).
+    """
+    rastreador = _rastreador_atual.get()
+    s = Span(nome, pai=_span_atual.get(), **atributos)
+    if rastreador is None:
+        yield s
+        return
+
+    token = _span_atual.set(s)
+    rastreador._abrir(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.atributos["erro"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span_atual.reset(token)
+        rastreador._fechar(s)
+        s.fechar()
+        rastreador._registrar(s)
+
+
+class Rastreador:
+    """
+    Coleta os spans de uma execução do pipeline.
+
+    Usado como context manager: enquanto ativo, `span(...)` chamado no mesmo
+    contexto (inclusive em threads iniciadas com `contextvars.copy_context`)
+    é registrado aqui. Ao sair, os spans alimentam as métricas do processo
+    (ver `obter_metricas`).
+
+    Enquanto ativo, uma thread amostra o RSS e a memória alocada na GPU a
+    cada `intervalo_amostragem` segundos e atualiza o pico dos spans abertos.
+    """
+    def __init__(self, nome="pipeline", intervalo_amostragem=TELEMETRIA_AMOSTRAGEM_S, **atributos):
+        self.nome = nome
+        self.atributos = atributos
+        self.spans = []
+        self.intervalo_amostragem = intervalo_amostragem
+        self._abertos = set()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._amostrador = None
+        self._token = None
+        self._raiz = None
+
+    def __enter__(self):
+        self._token = _rastreador_atual.set(self)
+        self._raiz = span(self.nome, **self.atributos)
+        self._raiz.__enter__()
+        if self.intervalo_amostragem and self.intervalo_amostragem > 0:
+            self._parar.clear()
+            self._amostrador = threading.Thread(target=self._amostrar, name="telemetria-amostrador", daemon=True)
+            self._amostrador.start()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if self._amostrador is not None:
+                self._parar.set()
+                self._amostrador.join()
+                self._amostrador = None
+            self._raiz.__exit__(*exc)
+        finally:
+            _rastreador_atual.reset(self._token)
+            obter_metricas().registrar(self.spans)
+        return False
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo_amostragem):
+            rss = _rss_atual_bytes()
+            gpu, _ = _gpu_bytes()
+            with self._lock:
+                for s in self._abertos:
+                    s.amostrar(rss, gpu)
+
+    def _abrir(self, s):
+        with self._lock:
+            self._abertos.add(s)
+
+    def _fechar(self, s):
+        with self._lock:
+            self._abertos.discard(s)
+
+    def _registrar(self, s):
+        with self._lock:
+            self.spans.append(s)
+
+    def como_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.inicio)
+        return {"nome": self.nome, "atributos": self.atributos, "spans": [s.como_dict() for s in spans]}
+
+    def salvar_json(self, caminho):
+        """Grava o trace da execução em JSON."""
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.como_dict(), f, ensure_ascii=False, indent=2)
+
+    def agregado(self):
+        """
+        Agrega os spans por nome, na ordem da primeira ocorrência.
+
+        Returns:
+            list: dicts com nome, n, duracao_s, cpu_s, itens, rss_pico_bytes e gpu_pico_bytes.
+        """
+        linhas = {}
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.inicio)
+        for s in spans:
+            a = linhas.setdefault(s.nome, {"nome": s.nome, "n": 0, "duracao_s": 0.0, "cpu_s": 0.0,
+                                           "itens": 0, "rss_pico_bytes": 0, "gpu_pico_bytes": 0})
+            a["n"] += 1
+            a["duracao_s"] += s.duracao_s or 0.0
+            a["cpu_s"] += s.cpu_s or 0.0
+            a["itens"] += s.itens or 0
+            a["rss_pico_bytes"] = max(a["rss_pico_bytes"], s.rss_pico_bytes or 0)
+            a["gpu_pico_bytes"] = max(a["gpu_pico_bytes"], s.gpu_pico_bytes or 0)
+        return list(linhas.values())
+
+    def resumo(self):
+        """Tabela de texto com o tempo de cada estágio (para logs/CLI)."""
+        linhas = [f"   {'Estágio':<24} {'N':>5} {'Parede':>9} {'CPU':>9} {'Itens':>7} {'RSS pico':>10} {'GPU pico':>10}"]
+        for a in self.agregado():
+            gpu = f"{a['gpu_pico_bytes'] / 1024**2:>8.0f}MB" if a["gpu_pico_bytes"] else f"{'-':>10}"
+            linhas.append(
+                f"   {a['nome']:<24} {a['n']:>5} {a['duracao_s']:>8.1f}s {a['cpu_s']:>8.1f}s "
+                f"{a['itens'] or '-':>7} {a['rss_pico_bytes'] / 1024**2:>8.0f}MB {gpu}"
+            )
+        return "\n".join(linhas)
+
+
+class MetricasSpans:
+    """Acumula os spans de todas as execuções do processo (para /metrics)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_nome = {}
+
+    def registrar(self, spans):
+        with self._lock:
+            for s in spans:
+                m = self._por_nome.setdefault(s.nome, {"execucoes": 0, "segundos": 0.0, "cpu_segundos": 0.0,
+                                                       "itens": 0, "erros": 0, "rss_pico_bytes": 0,
+                                                       "gpu_pico_bytes": 0})
+                m["execucoes"] += 1
+                m["segundos"] += s.duracao_s or 0.0
+                m["cpu_segundos"] += s.cpu_s or 0.0
+                m["itens"] += s.itens or 0
+                m["erros"] += 1 if "erro" in s.atributos else 0
+                m["rss_pico_bytes"] = max(m["rss_pico_bytes"], s.rss_pico_bytes or 0)
+                m["gpu_pico_bytes"] = max(m["gpu_pico_bytes"], s.gpu_pico_bytes or 0)
+
+    def prometheus(self):
+        """Métricas no formato de texto do Prometheus."""
+        definicoes = [
+            ("execucoes", "video_dub_span_execucoes_total", "counter", "Execuções do estágio"),
+            ("segundos", "video_dub_span_segundos_total", "counter", "Tempo de parede acumulado do estágio"),
+            ("cpu_segundos", "video_dub_span_cpu_segundos_total", "counter", "Tempo de CPU da thread que executou o estágio"),
+            ("itens", "video_dub_span_itens_total", "counter", "Itens processados pelo estágio"),
+            ("erros", "video_dub_span_erros_total", "counter", "Execuções do estágio que terminaram em exceção"),
+            ("rss_pico_bytes", "video_dub_span_rss_pico_bytes", "gauge", "Maior pico de RSS do processo amostrado durante o estágio"),
+            ("gpu_pico_bytes", "video_dub_span_gpu_pico_bytes", "gauge", "Maior pico de memória da GPU durante o estágio"),
+        ]
+        with self._lock:
+            por_nome = {nome: dict(m) for nome, m in self._por_nome.items()}
+        linhas = []
+        for campo, metrica, tipo, ajuda in definicoes:
+            linhas += formatar_metrica(metrica, tipo, ajuda,
+                                       [({"span": nome}, m[campo]) for nome, m in sorted(por_nome.items())])
+        return "\n".join(linhas) + "\n"
+
+
+def formatar_metrica(nome, tipo, ajuda, amostras):
+    """
+    Formata uma métrica no formato de texto do Prometheus.
+
+    Args:
+        nome (str): Nome da métrica.
+        tipo (str): 'counter' ou 'gauge'.
+        ajuda (str): Texto do HELP.
+        amostras (list): Pares (labels: dict, valor).
+
+    Returns:
+        list: Linhas de texto.
+    """
+    linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+    for labels, valor in amostras:
+        rotulos = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                           for k, v in labels.items())
+        linhas.append(f"{nome}{{{rotulos}}} {valor}" if rotulos else f"{nome} {valor}")
+    return linhas
+
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+def obter_metricas():
+    """Retorna as métricas acumuladas do processo (singleton)."""
+    global _metricas
+    with _metricas_lock:
+        if _metricas is None:
+            _metricas = MetricasSpans()
+        return _metricas
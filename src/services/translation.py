@@ -1,75 +1,214 @@
+import time
+from src.config import obter_device, TRADUCAO_MAX_TOKENS_LOTE, TRADUCAO_MAX_SEGMENTOS_LOTE
+from src.services.models import obter_registro
+from src.services.cache import obter_cache, chave_cache
+from src.services.telemetria import span
+from src.services.inferencia_cpu import backend_efetivo, criar_pipeline_cpu, identificador_modelo
 
-import torch
-from transformers import pipeline
-from src.config import DEVICE
+MODELO_TRADUCAO = "facebook/nllb-200-distilled-600M"
 
-def traduzir_segmentos(segmentos, idioma_origem, idioma_destino, log_callback=None):
+def _agrupar_lotes(comprimentos, max_tokens=TRADUCAO_MAX_TOKENS_LOTE, max_itens=TRADUCAO_MAX_SEGMENTOS_LOTE):
+    """
+    Agrupa índices em lotes por comprimento de tokens (batching dinâmico).
+
+    Os itens são ordenados do maior para o menor, de modo que cada lote reúne
+    textos de tamanho parecido e desperdiça pouco padding. O custo de um lote é
+    `n_itens * maior_comprimento` (o tensor com padding), limitado por `max_tokens`.
+
+    Args:
+        comprimentos (list): Número de tokens de cada item.
+        max_tokens (int): Orçamento de tokens (com padding) por lote.
+        max_itens (int): Número máximo de itens por lote.
+
+    Returns:
+        list: Lista de lotes, cada um uma lista de índices da entrada.
+    """
+    ordem = sorted(range(len(comprimentos)), key=lambda i: comprimentos[i], reverse=True)
+    
+    lotes = []
+    lote = []
+    maior = 0
+    for i in ordem:
+        tamanho = max(1, comprimentos[i])
+        novo_maior = max(maior, tamanho)
+        if lote and (len(lote) >= max_itens or (len(lote) + 1) * novo_maior > max_tokens):
+            lotes.append(lote)
+            lote = []
+            novo_maior = tamanho
+        lote.append(i)
+        maior = novo_maior
+    if lote:
+        lotes.append(lote)
+    return lotes
+
+def traduzir_segmentos(segmentos, idioma_origem, idioma_destino, log_callback=None, usar_cache=True):
     """
     Traduz uma lista de segmentos de texto preservando os timestamps originais.
 
     Utiliza o modelo NLLB (No Language Left Behind) da Meta (Facebook) para
-    tradução neural de alta qualidade.
+    tradução neural de alta qualidade. Os segmentos são traduzidos em lotes
+    agrupados por comprimento (ver `_agrupar_lotes`) e devolvidos na ordem
+    original. Se um lote inteiro falhar, seus segmentos são traduzidos um a um.
+    Traduções já presentes no cache em disco não são recalculadas.
 
     Args:
         segmentos (list): Lista de dicts {'start', 'end', 'text'}.
         idioma_origem (str): Código NLLB do idioma fonte (ex: 'eng_Latn').
         idioma_destino (str): Código NLLB do idioma alvo (ex: 'por_Latn').
         log_callback (callable, optional): Função para logar mensagens.
+        usar_cache (bool): Consulta/grava traduções no cache persistente.
 
     Returns:
         list: Nova lista de segmentos com a chave 'text' traduzida.
     """
-    msg = f"\n🌐 Traduzindo de {idioma_origem} para {idioma_destino}..."
+    return traduzir_multi(segmentos, idioma_origem, [idioma_destino], log_callback, usar_cache)[idioma_destino]
+
+def traduzir_multi(segmentos, idioma_origem, idiomas_destino, log_callback=None, usar_cache=True):
+    """
+    Traduz os mesmos segmentos para vários idiomas de uma vez.
+
+    Como `traduzir_segmentos`, mas com uma única aquisição do modelo, uma
+    única tokenização dos textos e os mesmos lotes por comprimento para todos
+    os destinos (o NLLB fixa o idioma de destino por chamada, então cada
+    destino percorre os lotes em sequência com o modelo já carregado).
+
+    Args:
+        segmentos (list): Lista de dicts {'start', 'end', 'text'}.
+        idioma_origem (str): Código NLLB do idioma fonte (ex: 'eng_Latn').
+        idiomas_destino (list): Códigos NLLB dos idiomas alvo.
+        log_callback (callable, optional): Função para logar mensagens.
+        usar_cache (bool): Consulta/grava traduções no cache persistente.
+
+    Returns:
+        dict: Idioma de destino -> lista de segmentos traduzidos.
+    """
+    destinos = list(dict.fromkeys(idiomas_destino))
+    msg = f"\n🌐 Traduzindo de {idioma_origem} para {', '.join(destinos)}..."
     if log_callback: log_callback(msg)
     else: print(msg)
     
+    # Segmentos vazios são descartados (sem fala para dublar)
+    validos = [seg for seg in segmentos if seg["text"].strip()]
+    textos = [seg["text"].strip() for seg in validos]
+    total = len(textos)
+    traducoes = {destino: [None] * total for destino in destinos}
+    
+    cache = obter_cache() if usar_cache else None
+    chaves = {}
+    if cache:
+        modelo = identificador_modelo(MODELO_TRADUCAO)
+        for destino in destinos:
+            chaves[destino] = [chave_cache(texto, idioma_origem, destino, modelo) for texto in textos]
+            for i, chave in enumerate(chaves[destino]):
+                valor = cache.obter_json("traducao", chave)
+                if valor is not None:
+                    traducoes[destino][i] = valor
+    pendentes = {destino: [i for i in range(total) if traducoes[destino][i] is None] for destino in destinos}
+    
+    n_pendentes = sum(len(p) for p in pendentes.values())
+    msg_total = f"   Traduzindo {n_pendentes} segmentos ({total * len(destinos) - n_pendentes} em cache)..."
+    if log_callback: log_callback(msg_total)
+    else: print(msg_total)
+    
     try:
-        pipe = pipeline(
-            task="translation",
-            model="facebook/nllb-200-distilled-600M",
-            src_lang=idioma_origem,
-            tgt_lang=idioma_destino,
-            device=0 if DEVICE == "cuda:0" else -1,
-            torch_dtype=torch.float16 if "cuda" in DEVICE else torch.float32
-        )
-        
+        if n_pendentes:
+            _traduzir_pendentes(textos, pendentes, traducoes, idioma_origem, log_callback)
+            if cache:
+                for destino in destinos:
+                    for i in pendentes[destino]:
+                        if traducoes[destino][i] is not None:
+                            cache.salvar_json("traducao", chaves[destino][i], traducoes[destino][i])
+    except Exception as e:
+        err_fatal = f"✗ Erro ao carregar modelo de tradução: {e}"
+        if log_callback: log_callback(err_fatal)
+        else: print(err_fatal)
+        return {destino: segmentos for destino in destinos} # Devolve original se falhar tudo
+    
+    resultado = {}
+    for destino in destinos:
         segmentos_traduzidos = []
-        total = len(segmentos)
-        msg_total = f"   Traduzindo {total} segmentos..."
-        if log_callback: log_callback(msg_total)
-        else: print(msg_total)
-        
-        for i, seg in enumerate(segmentos):
-            texto = seg["text"].strip()
-            if not texto: continue
-            
-            # Log periódico
-            if (i+1) % 5 == 0 or i == total-1:
-                prog = f"   ... Traduzindo segmento {i+1}/{total}"
-                if log_callback: log_callback(prog)
-                else: print(prog)
-            
-            try:
-                # Max length seguro para legendas
-                res = pipe(texto, max_length=512)
-                texto_trad = res[0]["translation_text"]
-                
-                segmentos_traduzidos.append({
-                    "start": seg["start"],
-                    "end": seg["end"],
-                    "text": texto_trad
-                })
-            except Exception as e:
-                err = f"   ⚠️  Erro no segmento {i+1}: {e}"
-                if log_callback: log_callback(err)
-                else: print(err)
+        for seg, texto_trad in zip(validos, traducoes[destino]):
+            if texto_trad is None:
                 # Fallback: original
                 segmentos_traduzidos.append(seg)
+            else:
+                # Demais chaves (ex: 'falante' da diarização) são preservadas
+                segmentos_traduzidos.append({**seg, "text": texto_trad})
+        resultado[destino] = segmentos_traduzidos
+    return resultado
+
+def _traduzir_pendentes(textos, pendentes, traducoes, idioma_origem, log_callback=None):
+    """
+    Traduz `textos[i]` para cada destino e cada i em `pendentes[destino]`,
+    preenchendo `traducoes[destino][i]`.
+
+    Segmentos cuja tradução falhar individualmente ficam como None.
+    """
+    DEVICE = obter_device()
+    if "cuda" in DEVICE:
+        import torch
+        dtype = torch.float16
+        
+        def carregar():
+            from transformers import pipeline
+            return pipeline(
+                task="translation",
+                model=MODELO_TRADUCAO,
+                device=0 if DEVICE == "cuda:0" else -1,
+                torch_dtype=dtype
+            )
+    else:
+        # Sem GPU: backend de CPU configurado (float32, int8 ou ONNX)
+        dtype = backend_efetivo()
+        carregar = lambda: criar_pipeline_cpu("translation", MODELO_TRADUCAO, log_callback=log_callback)
+    
+    # O par de idiomas é passado por chamada, então o mesmo modelo
+    # carregado serve para qualquer combinação origem/destino.
+    with obter_registro().usar(MODELO_TRADUCAO, carregar, device=DEVICE, dtype=dtype,
+                               modo="translation", log_callback=log_callback) as pipe:
+        # Tokeniza cada texto uma vez, qualquer que seja o número de destinos
+        indices = sorted(set().union(*pendentes.values()))
+        tokens = pipe.tokenizer([textos[i] for i in indices])["input_ids"]
+        comprimentos = {i: len(ids) for i, ids in zip(indices, tokens)}
+        total = sum(len(p) for p in pendentes.values())
+        
+        inicio = time.time()
+        concluidos = 0
+        lotes_total = 0
+        for idioma_destino, pendentes_destino in pendentes.items():
+            lotes = [[pendentes_destino[j] for j in lote]
+                     for lote in _agrupar_lotes([comprimentos[i] for i in pendentes_destino])]
+            lotes_total += len(lotes)
+            rotulo = f" [{idioma_destino}]" if len(pendentes) > 1 else ""
+            for n, lote in enumerate(lotes, 1):
+                textos_lote = [textos[i] for i in lote]
+                try:
+                    # Max length seguro para legendas
+                    with span("traducao.lote", itens=len(lote)):
+                        res = pipe(textos_lote, src_lang=idioma_origem, tgt_lang=idioma_destino,
+                                   max_length=512, batch_size=len(textos_lote))
+                    for i, r in zip(lote, res):
+                        traducoes[idioma_destino][i] = r["translation_text"]
+                except Exception as e:
+                    err = f"   ⚠️  Erro no lote {n}/{len(lotes)} ({len(lote)} segmentos): {e}. Traduzindo individualmente..."
+                    if log_callback: log_callback(err)
+                    else: print(err)
+                    for i in lote:
+                        try:
+                            res = pipe(textos[i], src_lang=idioma_origem, tgt_lang=idioma_destino, max_length=512)
+                            traducoes[idioma_destino][i] = res[0]["translation_text"]
+                        except Exception as e_seg:
+                            err_seg = f"   ⚠️  Erro no segmento {i+1}: {e_seg}"
+                            if log_callback: log_callback(err_seg)
+                            else: print(err_seg)
                 
-        return segmentos_traduzidos
+                concluidos += len(lote)
+                decorrido = max(time.time() - inicio, 1e-6)
+                prog = f"   ... Lote{rotulo} {n}/{len(lotes)}: {concluidos}/{total} segmentos ({concluidos / decorrido:.1f} seg/s)"
+                if log_callback: log_callback(prog)
+                else: print(prog)
         
-    except Exception as e:
-        err_fatal = f"✗ Erro ao carregar modelo de tradução: {e}"
-        if log_callback: log_callback(err_fatal)
-        else: print(err_fatal)
-        return segmentos # Devolve original se falhar tudo
+        decorrido = max(time.time() - inicio, 1e-6)
+        msg_fim = f"   ✓ {total} segmentos em {decorrido:.1f}s ({total / decorrido:.1f} seg/s, {lotes_total} lotes)"
+        if log_callback: log_callback(msg_fim)
+        else: print(msg_fim)
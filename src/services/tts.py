@@ -1,9 +1,15 @@
 
 import os
-import torch
+import json
+import dataclasses
 import numpy as np
-from transformers import VitsModel, AutoTokenizer
-from src.config import DEVICE
+import time
+from contextlib import contextmanager
+from src.config import obter_device, MMS_LOTE_MAX, MMS_BYTES_POR_TOKEN, QWEN3_LOTE_MAX, QWEN3_CARACTERES_LOTE
+from src.utils import memoria_disponivel_bytes, eh_erro_oom, liberar_memoria_gpu
+from src.services.models import obter_registro
+from src.services.cache import obter_cache, chave_cache, hash_arquivo
+from src.services.telemetria import span
 
 class TTSEngine:
     """
@@ -14,7 +20,8 @@ class TTSEngine:
     - 'qwen3': Qwen3-TTS CustomVoice - Alta qualidade, latência ultra-baixa, controle expressivo.
     """
     def __init__(self, motor="mms", idioma="por", ref_wav=None, log_callback=None,
-                 qwen3_mode="custom", qwen3_speaker="vivian", qwen3_instruct=""):
+                 qwen3_mode="custom", qwen3_speaker="vivian", qwen3_instruct="", usar_cache=True,
+                 vozes=None):
         """
         Inicializa o motor TTS.
 
@@ -26,6 +33,10 @@ class TTSEngine:
             qwen3_mode (str): Modalidade Qwen3: 'custom', 'design', ou 'clone'.
             qwen3_speaker (str): Speaker para modo CustomVoice (ex: 'Vivian', 'Ryan').
             qwen3_instruct (str): Instrução de controle de voz (CustomVoice/VoiceDesign).
+            usar_cache (bool): Reutiliza áudios já sintetizados do cache persistente.
+            vozes (dict, optional): Voz de cada falante, {falante: {atributo: valor}}
+                sobrepondo 'qwen3_speaker', 'qwen3_instruct' ou 'ref_wav' (ver
+                `src.services.diarizacao.mapear_vozes` e `sintetizar_batch`).
         """
         self.motor = motor
         self.idioma = idioma
@@ -39,21 +50,44 @@ class TTSEngine:
         self.qwen3_instruct = qwen3_instruct
         self.sample_rate = 24000 # default fallback
         self.speaker = None  # Para Qwen3-TTS
+        self._modelos_adquiridos = []
+        self._modelo_carregado = False
+        self._hash_ref = None
+        self._modelo_qwen3 = None
+        self._prompt_voz = None  # Prompt de clonagem (Qwen3-Clone), calculado uma vez
+        self.vozes = vozes or {}
         
-        self._carregar_modelo()
+        # O modelo é carregado sob demanda: se todos os segmentos estiverem
+        # no cache, nenhum peso precisa ser carregado.
+        self.cache = obter_cache() if usar_cache else None
+        if not self.cache:
+            self._garantir_modelo()
         
     def _log(self, msg):
         if self.log_callback: self.log_callback(msg)
         else: print(msg)
 
+    def _garantir_modelo(self):
+        if not self._modelo_carregado:
+            self._carregar_modelo()
+            self._modelo_carregado = True
+
     def _carregar_modelo(self):
         try:
             if self.motor == "mms":
                 modelo_nome = f"facebook/mms-tts-{self.idioma}"
                 self._log(f"   Carregando MMS-TTS: {modelo_nome}")
                 
-                self.config["tokenizer"] = AutoTokenizer.from_pretrained(modelo_nome)
-                self.config["model"] = VitsModel.from_pretrained(modelo_nome).to(DEVICE)
+                def carregar():
+                    from transformers import VitsModel, AutoTokenizer
+                    return {
+                        "tokenizer": AutoTokenizer.from_pretrained(modelo_nome),
+                        "model": VitsModel.from_pretrained(modelo_nome).to(obter_device()),
+                    }
+                
+                componentes = self._adquirir(modelo_nome, carregar, dtype="float32")
+                self.config["tokenizer"] = componentes["tokenizer"]
+                self.config["model"] = componentes["model"]
                 
                 self.sample_rate = self.config["model"].config.sampling_rate
                 
@@ -63,6 +97,7 @@ class TTSEngine:
                 from src.config import QWEN3_DEFAULT_SPEAKER
                 
                 try:
+                    import torch
                     from qwen_tts import Qwen3TTSModel
                     
                     # Selecionar modelo baseado na modalidade
@@ -77,28 +112,33 @@ class TTSEngine:
                     
                     # Configuração para modo offline
                     load_kwargs = {
-                        "device_map": DEVICE,
+                        "device_map": obter_device(),
                         "dtype": torch.bfloat16,
                         "local_files_only": True,  # Modo offline
                         "trust_remote_code": True   # Necessário para modelos custom
                     }
                     
-                    # Tentar com FlashAttention 2 primeiro
-                    try:
-                        self._log("   Tentando com FlashAttention 2...")
-                        self.config["model"] = Qwen3TTSModel.from_pretrained(
-                            model_name,
-                            attn_implementation="flash_attention_2",
-                            **load_kwargs
-                        )
-                        self._log("   ✓ FlashAttention 2 ativado")
-                    except Exception as fa_error:
-                        self._log(f"   ⚠️ FlashAttention 2 não disponível: {fa_error}")
-                        self._log("   Usando implementação padrão...")
-                        self.config["model"] = Qwen3TTSModel.from_pretrained(
-                            model_name,
-                            **load_kwargs
-                        )
+                    def carregar():
+                        # Tentar com FlashAttention 2 primeiro
+                        try:
+                            self._log("   Tentando com FlashAttention 2...")
+                            modelo = Qwen3TTSModel.from_pretrained(
+                                model_name,
+                                attn_implementation="flash_attention_2",
+                                **load_kwargs
+                            )
+                            self._log("   ✓ FlashAttention 2 ativado")
+                            return modelo
+                        except Exception as fa_error:
+                            self._log(f"   ⚠️ FlashAttention 2 não disponível: {fa_error}")
+                            self._log("   Usando implementação padrão...")
+                            return Qwen3TTSModel.from_pretrained(
+                                model_name,
+                                **load_kwargs
+                            )
+                    
+                    self.config["model"] = self._adquirir(model_name, carregar, dtype="bfloat16")
+                    self._modelo_qwen3 = model_name
                     
                     # Todos os modelos Qwen3-TTS-12Hz geram áudio a 12kHz
                     self.sample_rate = 12000
@@ -124,6 +164,80 @@ class TTSEngine:
             self._log(f"✗ Erro ao inicializar TTS {self.motor}: {e}")
             raise e
     
+    def _adquirir(self, model_id, carregador, dtype):
+        """Obtém o modelo do registro do processo e guarda a referência."""
+        modelo = obter_registro().adquirir(
+            model_id, carregador, device=obter_device(), dtype=dtype,
+            modo=f"tts-{self.motor}", log_callback=self.log_callback
+        )
+        self._modelos_adquiridos.append(modelo)
+        return modelo
+
+    def liberar(self):
+        """Devolve ao registro os modelos usados por este motor."""
+        registro = obter_registro()
+        for modelo in self._modelos_adquiridos:
+            registro.liberar(modelo)
+        self._modelos_adquiridos = []
+        self.config = {}
+        self._prompt_voz = None
+        self._modelo_carregado = False
+
+    def _chave_cache(self, texto):
+        """Chave do áudio de um texto: (texto, motor, idioma, voz/modo, instrução, referência)."""
+        if self.motor == "qwen3":
+            if self.qwen3_mode == "clone" and self._hash_ref is None:
+                self._hash_ref = hash_arquivo(self.ref_wav)
+            return chave_cache(
+                texto, self.motor, self.idioma, self.qwen3_mode,
+                self.qwen3_speaker if self.qwen3_mode == "custom" else None,
+                self.qwen3_instruct,
+                self._hash_ref if self.qwen3_mode == "clone" else None,
+            )
+        return chave_cache(texto, self.motor, self.idioma)
+
+    def _obter_prompt_voz(self):
+        """
+        Prompt de clonagem (embedding x-vector do falante) do áudio de referência.
+
+        Calculado uma única vez por motor (e não a cada segmento) e guardado no
+        cache em disco (namespace 'voz') pelo hash da referência, então novas
+        execuções e outros jobs com o mesmo falante não recalculam.
+
+        Returns:
+            list: Itens de prompt aceitos por `generate_voice_clone(voice_clone_prompt=...)`.
+        """
+        if self._prompt_voz is not None:
+            return self._prompt_voz
+        
+        if self._hash_ref is None:
+            self._hash_ref = hash_arquivo(self.ref_wav)
+        chave = chave_cache(self._hash_ref, self._modelo_qwen3, "x_vector")
+        
+        prompt = None
+        if self.cache:
+            arrays = self.cache.obter_arrays("voz", chave)
+            if arrays is not None:
+                prompt = _prompt_de_arrays(arrays)
+                if prompt is not None:
+                    self._log("   ♻️ Prompt de voz em cache.")
+        
+        if prompt is None:
+            with span("tts.prompt_voz"):
+                prompt = self.config["model"].create_voice_clone_prompt(
+                    ref_audio=self.ref_wav,
+                    ref_text="",  # Opcional: transcrição do áudio de referência
+                    x_vector_only_mode=True  # Usar apenas embedding de speaker
+                )
+            if self.cache:
+                try:
+                    self.cache.salvar_arrays("voz", chave, **_prompt_para_arrays(prompt))
+                except Exception as e:
+                    self._log(f"   ⚠️ Prompt de voz não foi salvo no cache: {e}")
+        
+        self._prompt_voz = prompt
+        return prompt
+
     def _mapear_idioma_qwen3(self):
         """Mapeia código de idioma para formato Qwen3-TTS."""
         mapeamento = {
@@ -150,103 +264,333 @@ class TTSEngine:
         }
         return mapeamento.get(self.idioma, "Auto")
 
-    def sintetizar_batch(self, textos):
+    def sintetizar_batch(self, textos, falantes=None):
         """
         Sintetiza uma lista de textos em áudio.
 
-        Para MMS, tenta processar em lote (embora a implementação atual seja iterativa
-        para evitar OOM, a interface permite otimização futura).
-        
+        Áudios já presentes no cache persistente são reutilizados; apenas os
+        segmentos ausentes são sintetizados (e o modelo só é carregado se houver
+        algum). Com `falantes`, os textos de cada falante são sintetizados
+        juntos, com a voz definida em `self.vozes`.
+
         Args:
             textos (list): Lista de strings para sintetizar.
+            falantes (list, optional): Falante de cada texto (ver `src.services.diarizacao`).
 
         Returns:
             list: Lista de tuplas (audio_numpy_array, sample_rate).
                   Retorna (None, None) em caso de falha no segmento.
         """
+        if falantes is None or not self.vozes:
+            return self._sintetizar_batch_voz(textos)
+        
+        resultados = [(None, None)] * len(textos)
+        for falante in dict.fromkeys(falantes):
+            indices = [i for i, f in enumerate(falantes) if f == falante]
+            with self._usando_voz(self.vozes.get(falante, {})):
+                audios = self._sintetizar_batch_voz([textos[i] for i in indices])
+            for i, audio in zip(indices, audios):
+                resultados[i] = audio
+        return resultados
+
+    @contextmanager
+    def _usando_voz(self, voz):
+        """Sobrepõe temporariamente os atributos de voz (speaker, instrução, referência)."""
+        anteriores = {atributo: getattr(self, atributo) for atributo in voz}
+        
+        def aplicar(valores):
+            for atributo, valor in valores.items():
+                setattr(self, atributo, valor)
+            if "ref_wav" in valores:
+                # Outra referência: outro hash e outro prompt de clonagem
+                self._hash_ref = None
+                self._prompt_voz = None
+            if self._modelo_carregado and self.qwen3_mode == "custom":
+                self.speaker = self.qwen3_speaker
+        
+        aplicar(voz)
+        try:
+            yield
+        finally:
+            aplicar(anteriores)
+
+    def _sintetizar_batch_voz(self, textos):
+        """`sintetizar_batch` com a voz atual do motor (cache + síntese dos pendentes)."""
+        if self.motor not in ("mms", "qwen3"):
+            # Motores sem síntese implementada (ex: 'coqui') devolvem lista vazia
+            return self._sintetizar(textos)
+        
+        resultados = [(None, None)] * len(textos)
+        pendentes = list(range(len(textos)))
+        
+        if self.cache:
+            chaves = [self._chave_cache(t) for t in textos]
+            pendentes = []
+            for i, chave in enumerate(chaves):
+                valor = self.cache.obter_audio(chave)
+                if valor is not None:
+                    resultados[i] = valor
+                else:
+                    pendentes.append(i)
+            if len(pendentes) < len(textos):
+                self._log(f"   ♻️ {len(textos) - len(pendentes)}/{len(textos)} segmentos em cache.")
+        
+        if not pendentes:
+            return resultados
+        
+        self._garantir_modelo()
+        novos = self._sintetizar([textos[i] for i in pendentes])
+        for i, (audio, sr) in zip(pendentes, novos):
+            resultados[i] = (audio, sr)
+            if self.cache and audio is not None:
+                self.cache.salvar_audio(chaves[i], audio, sr)
+        return resultados
+
+    def _tamanho_lote_inicial(self, max_tokens):
+        """
+        Estima quantos textos de até `max_tokens` tokens cabem na memória livre.
+
+        A ativação do decoder VITS cresce com o número de amostras geradas, que
+        é proporcional ao comprimento do texto (ver `MMS_BYTES_POR_TOKEN`).
+        """
+        livre = memoria_disponivel_bytes(obter_device())
+        if livre is None:
+            return MMS_LOTE_MAX
+        por_item = max(1, max_tokens) * MMS_BYTES_POR_TOKEN
+        # Usar metade da memória livre como margem de segurança
+        return int(max(1, min(MMS_LOTE_MAX, (livre // 2) // por_item)))
+
+    def _sintetizar_mms_lotes(self, textos):
+        """
+        Síntese MMS-TTS (VITS) em lotes com padding e máscaras de comprimento.
+
+        Os textos são ordenados por número de tokens e agrupados em lotes de
+        comprimento parecido. Cada lote executa um único forward do VitsModel
+        (o `attention_mask` do tokenizer isola o padding) e cada forma de onda
+        é cortada pela duração prevista pelo modelo (`sequence_lengths`).
+        O tamanho do lote parte da memória disponível e é reduzido pela metade
+        a cada OOM.
+
+        Returns:
+            list: Lista de tuplas (audio_numpy_array, sample_rate), na ordem de `textos`.
+        """
+        model = self.config["model"]
+        tokenizer = self.config["tokenizer"]
+        resultados = [(None, None)] * len(textos)
+        
+        limpos = ["".join([c for c in texto if c.isalnum() or c in " ,.?!"]) for texto in textos]
+        validos = [i for i, clean in enumerate(limpos) if clean.strip()]
+        if not validos:
+            return resultados
+        
+        comprimentos = {i: len(tokenizer(limpos[i])["input_ids"]) for i in validos}
+        ordem = sorted(validos, key=lambda i: comprimentos[i], reverse=True)
+        
+        lote_max = self._tamanho_lote_inicial(comprimentos[ordem[0]])
+        self._log(f"   Lote MMS inicial: {lote_max} segmentos")
+        
+        import torch
+        pos = 0
+        with torch.no_grad():
+            while pos < len(ordem):
+                lote = ordem[pos:pos + lote_max]
+                try:
+                    with span("tts.lote", itens=len(lote), motor="mms"):
+                        inputs = tokenizer([limpos[i] for i in lote], return_tensors="pt", padding=True).to(obter_device())
+                        output = model(**inputs)
+                except Exception as e:
+                    if not eh_erro_oom(e) or lote_max == 1:
+                        raise
+                    lote_max = max(1, len(lote) // 2)
+                    liberar_memoria_gpu()
+                    self._log(f"   ⚠️ OOM na síntese MMS, reduzindo lote para {lote_max}")
+                    continue
+                
+                ondas = output.waveform.cpu().numpy()
+                duracoes = getattr(output, "sequence_lengths", None)
+                duracoes = duracoes.cpu().numpy() if duracoes is not None else [ondas.shape[-1]] * len(lote)
+                for j, i in enumerate(lote):
+                    resultados[i] = (ondas[j, :int(duracoes[j])], self.sample_rate)
+                
+                pos += len(lote)
+                self._log(f"   ... Sintetizando {pos}/{len(ordem)} (lote de {len(lote)})")
+        
+        return resultados
+
+    def _gerar_qwen3(self, textos, prompt_voz=None):
+        """
+        Uma chamada do Qwen3-TTS para uma lista de textos (entradas em lista).
+
+        Returns:
+            tuple: (wavs, sample_rate), com um áudio por texto.
+        """
+        model = self.config["model"]
+        n = len(textos)
+        idiomas = [self.qwen3_language] * n
+        
+        if self.qwen3_mode == "custom":
+            # CustomVoice: usa speaker pré-definido + instrução opcional
+            return model.generate_custom_voice(
+                text=textos,
+                language=idiomas,
+                speaker=[self.speaker] * n,
+                instruct=[self.qwen3_instruct or ""] * n
+            )
+        if self.qwen3_mode == "design":
+            # VoiceDesign: cria voz baseada em descrição em linguagem natural
+            instruct = self.qwen3_instruct or "Voz clara e natural, tom neutro e profissional"
+            return model.generate_voice_design(text=textos, language=idiomas, instruct=[instruct] * n)
+        if self.qwen3_mode == "clone":
+            # Clone: o mesmo prompt do falante para todos os itens do lote
+            return model.generate_voice_clone(text=textos, language=idiomas,
+                                              voice_clone_prompt=list(prompt_voz) * n)
+        raise ValueError(f"Modo Qwen3 desconhecido: {self.qwen3_mode}")
+
+    def _lote_max_qwen3(self):
+        """Tamanho máximo do lote para a variante do modelo carregado (0.6B/1.7B)."""
+        variante = "0.6B" if self._modelo_qwen3 and "0.6B" in self._modelo_qwen3 else "1.7B"
+        return QWEN3_LOTE_MAX.get(variante, 8)
+
+    def _sintetizar_qwen3_lotes(self, textos):
+        """
+        Síntese Qwen3-TTS em lotes de textos de comprimento parecido.
+
+        Os textos são ordenados por número de caracteres e cada lote (até
+        `_lote_max_qwen3` itens e QWEN3_CARACTERES_LOTE caracteres com padding)
+        é gerado numa única chamada. Um OOM reduz o lote pela metade; outro erro
+        faz o lote ser refeito item a item, para que só os segmentos com
+        problema fiquem sem áudio. A vazão de cada lote é registrada no log.
+
+        Returns:
+            list: Lista de tuplas (audio_numpy_array, sample_rate), na ordem de `textos`.
+        """
+        resultados = [(None, None)] * len(textos)
+        limpos = [texto.strip() for texto in textos]
+        validos = [i for i, clean in enumerate(limpos) if clean]
+        if not validos:
+            return resultados
+        
+        prompt_voz = None
+        if self.qwen3_mode == "clone":
+            # Clone: clona voz a partir de áudio de referência
+            if not self.ref_wav or not os.path.exists(self.ref_wav):
+                self._log(f"   ⚠️ Áudio de referência não encontrado: {self.ref_wav}")
+                return resultados
+            try:
+                prompt_voz = self._obter_prompt_voz()
+            except Exception as e:
+                self._log(f"   ⚠️ Erro ao calcular o prompt de voz: {e}")
+                return resultados
+        
+        ordem = sorted(validos, key=lambda i: len(limpos[i]), reverse=True)
+        lote_max = self._lote_max_qwen3()
+        pos = 0
+        while pos < len(ordem):
+            # Maior texto primeiro: o lote cresce enquanto couber no orçamento
+            maior = len(limpos[ordem[pos]])
+            n = max(1, min(lote_max, QWEN3_CARACTERES_LOTE // max(1, maior)))
+            lote = ordem[pos:pos + n]
+            caracteres = sum(len(limpos[i]) for i in lote)
+            
+            inicio = time.time()
+            try:
+                with span("tts.lote", itens=len(lote), motor="qwen3") as sp:
+                    wavs, sr = self._gerar_qwen3([limpos[i] for i in lote], prompt_voz)
+                    if len(wavs) != len(lote):
+                        raise RuntimeError(f"Qwen3 devolveu {len(wavs)} áudios para {len(lote)} textos")
+                    sp.definir(caracteres=caracteres)
+            except Exception as e:
+                if eh_erro_oom(e) and len(lote) > 1:
+                    lote_max = max(1, len(lote) // 2)
+                    liberar_memoria_gpu()
+                    self._log(f"   ⚠️ OOM na síntese Qwen3, reduzindo lote para {lote_max}")
+                    continue
+                if len(lote) > 1:
+                    self._log(f"   ⚠️ Erro Qwen3 no lote ({e}); sintetizando item a item")
+                wavs, sr = [], None
+                for i in lote:
+                    try:
+                        w, sr_i = self._gerar_qwen3([limpos[i]], prompt_voz)
+                        wavs.append(w[0] if w is not None and len(w) > 0 else None)
+                        sr = sr_i
+                    except Exception as e_item:
+                        self._log(f"   ⚠️ Erro Qwen3 no segmento {i}: {e_item}")
+                        wavs.append(None)
+            
+            dt = max(time.time() - inicio, 1e-9)
+            audio_s = 0.0
+            for i, wav in zip(lote, wavs):
+                if wav is not None and len(wav) > 0:
+                    resultados[i] = (wav, sr)
+                    audio_s += len(wav) / sr
+            
+            pos += len(lote)
+            self._log(f"   ... Qwen3 {pos}/{len(ordem)} (lote de {len(lote)}): "
+                      f"{caracteres / dt:.0f} caracteres/s, {audio_s / dt:.2f} s de áudio/s")
+        
+        return resultados
+
+    def _sintetizar(self, textos):
+        """
+        Sintetiza os textos com o modelo carregado (sem cache).
+
+        MMS e Qwen3 processam os textos em lotes reais (ver `_sintetizar_mms_lotes`
+        e `_sintetizar_qwen3_lotes`).
+        """
         self._log(f"   🔊 Sintetizando {len(textos)} segmentos ({self.motor})...")
         resultados = []
         
         if self.motor == "mms":
-            model = self.config["model"]
-            tokenizer = self.config["tokenizer"]
-            
-            with torch.no_grad():
-                for i, texto in enumerate(textos):
-                    # Logs de progresso
-                    if (i+1) % 5 == 0: self._log(f"   ... Sintetizando {i+1}/{len(textos)}")
-
-                    clean = "".join([c for c in texto if c.isalnum() or c in " ,.?!"])
-                    if not clean.strip():
-                        resultados.append((None, None))
-                        continue
-                        
-                    inputs = tokenizer(clean, return_tensors="pt").to(DEVICE)
-                    output = model(**inputs).waveform
-                    audio = output.cpu().numpy().squeeze()
-                    resultados.append((audio, self.sample_rate))
-                    
+            resultados = self._sintetizar_mms_lotes(textos)
 
         elif self.motor == "qwen3":
-            model = self.config["model"]
-            
-            for i, texto in enumerate(textos):
-                if (i+1) % 5 == 0: self._log(f"   ... Sintetizando {i+1}/{len(textos)}")
-                
-                try:
-                    # Limpeza básica
-                    clean = texto.strip()
-                    if not clean:
-                        resultados.append((None, None))
-                        continue
-                    
-                    # Síntese baseada na modalidade
-                    if self.qwen3_mode == "custom":
-                        # CustomVoice: usa speaker pré-definido + instrução opcional
-                        wavs, sr = model.generate_custom_voice(
-                            text=clean,
-                            language=self.qwen3_language,
-                            speaker=self.speaker,
-                            instruct=self.qwen3_instruct if self.qwen3_instruct else ""
-                        )
-                        
-                    elif self.qwen3_mode == "design":
-                        # VoiceDesign: cria voz baseada em descrição em linguagem natural
-                        instruct = self.qwen3_instruct or "Voz clara e natural, tom neutro e profissional"
-                        wavs, sr = model.generate_voice_design(
-                            text=clean,
-                            language=self.qwen3_language,
-                            instruct=instruct
-                        )
-                        
-                    elif self.qwen3_mode == "clone":
-                        # Clone: clona voz a partir de áudio de referência
-                        if not self.ref_wav or not os.path.exists(self.ref_wav):
-                            self._log(f"   ⚠️ Áudio de referência não encontrado: {self.ref_wav}")
-                            resultados.append((None, None))
-                            continue
-                        
-                        wavs, sr = model.generate_voice_clone(
-                            text=clean,
-                            language=self.qwen3_language,
-                            ref_audio=self.ref_wav,
-                            ref_text="",  # Opcional: transcrição do áudio de referência
-                            x_vector_only_mode=True  # Usar apenas embedding de speaker
-                        )
-                    else:
-                        self._log(f"   ❌ Modo Qwen3 desconhecido: {self.qwen3_mode}")
-                        resultados.append((None, None))
-                        continue
-                    
-                    # Extrair primeiro áudio do batch
-                    if wavs and len(wavs) > 0:
-                        audio_data = wavs[0]
-                        resultados.append((audio_data, sr))
-                    else:
-                        resultados.append((None, None))
-                        
-                except Exception as e:
-                    self._log(f"   ⚠️ Erro Qwen3 no segmento {i}: {e}")
-                    resultados.append((None, None))
-                    
+            resultados = self._sintetizar_qwen3_lotes(textos)
+        
         return resultados
+
+
+def _prompt_para_arrays(prompt):
+    """
+    Serializa os itens do prompt de clonagem em arrays para `salvar_arrays`.
+
+    Tensores viram arrays float32 (o dtype original fica nos metadados);
+    demais campos (flags, textos, None) vão nos metadados JSON.
+    """
+    arrays = {}
+    meta = []
+    for i, item in enumerate(prompt):
+        campos = {}
+        for campo in dataclasses.fields(item):
+            valor = getattr(item, campo.name)
+            if hasattr(valor, "detach"):
+                arrays[f"{i}_{campo.name}"] = valor.detach().float().cpu().numpy()
+                campos[campo.name] = {"tensor": str(valor.dtype).replace("torch.", "")}
+            else:
+                campos[campo.name] = {"valor": valor}
+        meta.append(campos)
+    arrays["meta"] = np.array(json.dumps(meta))
+    return arrays
+
+
+def _prompt_de_arrays(arrays):
+    """Reconstrói os itens do prompt de clonagem; None se o formato não for reconhecido."""
+    try:
+        import torch
+        try:
+            from qwen_tts import VoiceClonePromptItem
+        except ImportError:
+            from qwen_tts.inference.qwen3_tts_model import VoiceClonePromptItem
+        
+        prompt = []
+        for i, campos in enumerate(json.loads(str(arrays["meta"]))):
+            valores = {}
+            for nome, info in campos.items():
+                if "tensor" in info:
+                    valores[nome] = torch.from_numpy(arrays[f"{i}_{nome}"]).to(
+                        dtype=getattr(torch, info["tensor"]), device=obter_device())
+                else:
+                    valores[nome] = info["valor"]
+            prompt.append(VoiceClonePromptItem(**valores))
+        return prompt
+    except Exception:
+        return None
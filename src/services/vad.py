@@ -0,0 +1,123 @@
+import numpy as np
+
+
+def _mono_float32(bloco):
+    """Converte um bloco (frames,) ou (frames, canais) em float32 mono [-1, 1]."""
+    dados = np.asarray(bloco, dtype=np.float32)
+    if np.issubdtype(bloco.dtype, np.integer):
+        dados /= float(np.iinfo(bloco.dtype).max + 1)
+    if dados.ndim > 1:
+        dados = dados.mean(axis=1) if dados.shape[1] > 1 else dados[:, 0]
+    return dados
+
+
+def energia_quadros(amostras, sr, quadro_s=0.03, bloco_s=60.0):
+    """
+    Energia (RMS em dBFS) de cada quadro do áudio.
+
+    As amostras são lidas em blocos, então um memmap de horas de áudio não é
+    carregado inteiro na memória.
+
+    Args:
+        amostras (np.ndarray): Amostras (frames,) ou (frames, canais); aceita memmap.
+        sr (int): Taxa de amostragem.
+        quadro_s (float): Duração de cada quadro (segundos).
+        bloco_s (float): Duração de cada bloco lido (segundos).
+
+    Returns:
+        np.ndarray: dBFS por quadro (float32). O último quadro incompleto é descartado.
+    """
+    tam_quadro = max(1, int(round(quadro_s * sr)))
+    quadros_por_bloco = max(1, int(bloco_s * sr) // tam_quadro)
+    n_quadros = len(amostras) // tam_quadro
+    energia = np.empty(n_quadros, dtype=np.float32)
+
+    for q0 in range(0, n_quadros, quadros_por_bloco):
+        q1 = min(q0 + quadros_por_bloco, n_quadros)
+        bloco = _mono_float32(amostras[q0 * tam_quadro:q1 * tam_quadro])
+        potencia = np.mean(bloco.reshape(q1 - q0, tam_quadro) ** 2, axis=1)
+        energia[q0:q1] = 10 * np.log10(potencia + 1e-10)
+    return energia
+
+
+def _trechos(mascara):
+    """Pares [início, fim) dos trechos contíguos verdadeiros de uma máscara booleana."""
+    bordas = np.diff(np.concatenate([[0], mascara.astype(np.int8), [0]]))
+    return np.stack([np.flatnonzero(bordas == 1), np.flatnonzero(bordas == -1)], axis=1)
+
+
+def detectar_fala(amostras, sr, quadro_s=0.03, margem_db=12.0, piso_db=-50.0, min_fala_s=0.25,
+                  min_silencio_s=0.4, folga_s=0.2, max_regiao_s=30.0):
+    """
+    Detecta as regiões com fala por energia (VAD leve, sem modelo).
+
+    O limiar é adaptativo: `margem_db` acima do ruído de fundo (percentil 10
+    da energia dos quadros), limitado a `margem_db` abaixo dos trechos mais
+    altos (percentil 95) e nunca abaixo de `piso_db`. Pausas curtas entre
+    falas são unidas, trechos curtos demais descartados e cada região recebe
+    uma folga nas bordas para não cortar ataques e finais de palavras.
+    Regiões longas são divididas no quadro mais silencioso da sua segunda
+    metade, para caberem numa janela do Whisper.
+
+    Música ou ruído alto contínuo não são distinguidos de fala pela energia;
+    eles só deixam de ser descartados (o Whisper os recebe como antes).
+
+    Args:
+        amostras (np.ndarray): Amostras (frames,) ou (frames, canais); aceita memmap.
+        sr (int): Taxa de amostragem.
+        quadro_s (float): Duração do quadro de análise (segundos).
+        margem_db (float): Distância do limiar ao ruído de fundo / ao pico (dB).
+        piso_db (float): Limiar mínimo absoluto (dBFS).
+        min_fala_s (float): Duração mínima de uma região de fala.
+        min_silencio_s (float): Pausas menores que isto não separam regiões.
+        folga_s (float): Margem adicionada antes e depois de cada região.
+        max_regiao_s (float): Duração máxima de uma região.
+
+    Returns:
+        list: Regiões (início_s, fim_s) em ordem, sem sobreposição.
+    """
+    energia = energia_quadros(amostras, sr, quadro_s)
+    if len(energia) == 0:
+        return []
+
+    ruido, pico = np.percentile(energia, [10, 95])
+    limiar = max(piso_db, min(ruido + margem_db, pico - margem_db))
+    regioes = _trechos(energia > limiar)
+    if len(regioes) == 0:
+        return []
+
+    def quadros(s): return int(round(s / quadro_s))
+
+    # Une pausas curtas
+    unidas = [list(regioes[0])]
+    for ini, fim in regioes[1:]:
+        if ini - unidas[-1][1] < quadros(min_silencio_s):
+            unidas[-1][1] = fim
+        else:
+            unidas.append([ini, fim])
+
+    # Descarta trechos curtos e aplica a folga (unindo o que passar a se sobrepor)
+    n = len(energia)
+    folga = quadros(folga_s)
+    finais = []
+    for ini, fim in unidas:
+        if fim - ini < quadros(min_fala_s): continue
+        ini, fim = max(0, ini - folga), min(n, fim + folga)
+        if finais and ini <= finais[-1][1]:
+            finais[-1][1] = fim
+        else:
+            finais.append([ini, fim])
+
+    # Divide regiões longas no ponto mais silencioso
+    maximo = max(2, quadros(max_regiao_s))
+    divididas = []
+    for ini, fim in finais:
+        while fim - ini > maximo:
+            a = ini + maximo // 2
+            corte = a + int(np.argmin(energia[a:ini + maximo]))
+            divididas.append((ini, corte))
+            ini = corte
+        divididas.append((ini, fim))
+
+    duracao = len(amostras) / sr
+    return [(round(ini * quadro_s, 3), round(min(fim * quadro_s, duracao), 3)) for ini, fim in divididas]
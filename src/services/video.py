@@ -1,13 +1,20 @@
 
 import os
+import re
 import shutil
+import tempfile
 import time
+import subprocess
+import threading
 import numpy as np
-import soundfile as sf
-from moviepy import VideoFileClip, AudioFileClip, concatenate_videoclips
-from moviepy.video.fx.MultiplySpeed import MultiplySpeed
 from proglog import ProgressBarLogger
-from src.config import OUTPUT_DIR
+from concurrent.futures import ThreadPoolExecutor
+from src.config import (AJUSTE_TEMPO, AJUSTE_ESTICAR_MAX, AJUSTE_ANTECIPAR_MAX,
+                        RENDER_PARTES, RENDER_THREADS_PARTE, RENDER_PARTE_MIN_S)
+from src.services.codificacao import argumentos_encoder, descrever_perfil, escolher_perfil, sondar_ffmpeg
+from src.services.sincronia import esticar_audio, planejar_ajuste
+from src.services.telemetria import span
+from src.utils import obter_ffmpeg_exe
 
 class MyLogger(ProgressBarLogger):
     def __init__(self, custom_callback=None):
@@ -36,6 +43,137 @@ class MyLogger(ProgressBarLogger):
             if 'MoviePy' in msg and 'Done' not in msg:
                 self.custom_callback(f"   [FFmpeg] {msg}")
 
+def _reamostrar(audio, sr_origem, sr_destino):
+    """Reamostra um sinal mono (polifásico, via scipy) se as taxas diferirem."""
+    if sr_origem == sr_destino or len(audio) == 0:
+        return audio
+    from math import gcd
+    from scipy.signal import resample_poly
+    g = gcd(sr_origem, sr_destino)
+    return resample_poly(audio, sr_destino // g, sr_origem // g).astype(np.float32)
+
+def _executar_ffmpeg(cmd, duracao_total, log_callback=None, entrada=None):
+    """
+    Executa o FFmpeg reportando o progresso (`-progress pipe:1`) a cada 5%.
+
+    Args:
+        cmd (list): Linha de comando.
+        duracao_total (float): Duração esperada da saída (para o percentual).
+        log_callback (callable, optional): Função para logar mensagens.
+        entrada (bytes, optional): Dados enviados ao stdin (ex: trilha PCM em `pipe:0`).
+
+    Raises:
+        RuntimeError: Se o FFmpeg terminar com erro (mensagem do stderr).
+    """
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if entrada is not None else subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    erros = []
+    
+    def escrever_stdin():
+        try:
+            proc.stdin.write(entrada)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try: proc.stdin.close()
+            except OSError: pass
+    
+    def ler_stderr():
+        erros.append(proc.stderr.read().decode("utf-8", errors="replace"))
+    
+    threads = [threading.Thread(target=ler_stderr, daemon=True)]
+    if entrada is not None:
+        threads.append(threading.Thread(target=escrever_stdin, daemon=True))
+    for t in threads: t.start()
+    
+    ultimo = -1
+    for linha in proc.stdout:
+        chave, _, valor = linha.decode("utf-8", errors="replace").strip().partition("=")
+        if chave == "out_time_us" and duracao_total > 0 and valor.isdigit():
+            percentual = min(100, int(int(valor) / 1e6 / duracao_total * 100))
+            if percentual != ultimo and percentual % 5 == 0:
+                ultimo = percentual
+                if log_callback: log_callback(f"   ▸ Vídeo: {percentual}%")
+    codigo = proc.wait()
+    for t in threads: t.join()
+    if codigo != 0:
+        erro = "".join(erros).strip()
+        raise RuntimeError(erro or f"ffmpeg retornou {codigo}")
+
+def quadros_chave(caminho_video):
+    """
+    Quadros-chave do vídeo, lidos dos pacotes (`-c copy -f framecrc`, sem decodificar).
+
+    Returns:
+        tuple: (escala_tempo, [(pts, dts), ...]) com os instantes em segundos.
+               O dts é o ponto de corte exato de uma cópia que termina antes do
+               quadro-chave (com quadros B, ele vem antes do pts).
+    """
+    cmd = [obter_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-i", caminho_video,
+           "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"]
+    saida = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True).stdout.decode("utf-8", errors="replace")
+    escala = re.search(r"^#tb 0: (\d+)/(\d+)", saida, re.MULTILINE)
+    if not escala:
+        return None, []
+    num, den = int(escala.group(1)), int(escala.group(2))
+    chaves = []
+    for linha in saida.splitlines():
+        campos = linha.split(",")
+        # Pacotes não-chave trazem "F=0x..." (flags diferentes de KEY)
+        if linha.startswith("#") or len(campos) < 6 or "F=" in linha:
+            continue
+        chaves.append((int(campos[2]) * num / den, int(campos[1]) * num / den))
+    return den // num if den % num == 0 else None, sorted(chaves)
+
+def multiplexar_pistas(caminho_video, pistas, caminho_saida, log_callback=None):
+    """
+    Junta várias dublagens do mesmo vídeo num único MP4 com uma pista de
+    áudio e uma de legenda por idioma, sem recodificar.
+
+    Só faz sentido quando todas as dublagens mantêm a linha do tempo do
+    vídeo (ver `VideoEditor.mantem_video`): o vídeo vem de `caminho_video` e
+    cada pista traz apenas o áudio do seu MP4 dublado.
+
+    Args:
+        caminho_video (str): MP4 de onde vem a pista de vídeo.
+        pistas (list): Dicts {'video' (MP4 dublado), 'legenda' (SRT ou None),
+            'idioma' (código ISO 639-2, ex: 'por'), 'titulo'}, na ordem das
+            pistas; a primeira é a padrão.
+        caminho_saida (str): MP4 final.
+        log_callback (callable, optional): Função para logar mensagens.
+
+    Returns:
+        bool: True se sucesso.
+    """
+    legendas = [p for p in pistas if p.get("legenda")]
+    cmd = [obter_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", "-i", caminho_video]
+    for pista in pistas:
+        cmd += ["-i", pista["video"]]
+    for pista in legendas:
+        cmd += ["-i", pista["legenda"]]
+    cmd += ["-map", "0:v:0"]
+    cmd += [arg for n in range(len(pistas)) for arg in ("-map", f"{n + 1}:a:0")]
+    cmd += [arg for n in range(len(legendas)) for arg in ("-map", f"{len(pistas) + n + 1}:s:0")]
+    cmd += ["-c:v", "copy", "-c:a", "copy", "-c:s", "mov_text"]
+    for tipo, lista in (("a", pistas), ("s", legendas)):
+        for n, pista in enumerate(lista):
+            cmd += [f"-metadata:s:{tipo}:{n}", f"language={pista['idioma']}",
+                    f"-metadata:s:{tipo}:{n}", f"handler_name={pista['titulo']}",
+                    f"-disposition:{tipo}:{n}", "default" if n == 0 else "0"]
+    cmd += ["-movflags", "+faststart", caminho_saida]
+
+    msg = f"   🎚️ Multiplexando {len(pistas)} pistas de áudio e {len(legendas)} de legenda..."
+    if log_callback: log_callback(msg)
+    else: print(msg)
+    with span("video.multiplexar", itens=len(pistas)):
+        proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True)
+    if proc.returncode != 0:
+        erro = f"   ❌ Falha ao multiplexar: {proc.stderr.decode('utf-8', errors='replace').strip()}"
+        if log_callback: log_callback(erro)
+        else: print(erro)
+        return False
+    return True
+
 class VideoEditor:
     """
     Gerenciador de edição e manipulação de vídeo.
@@ -50,6 +188,7 @@ class VideoEditor:
         Args:
             caminho_video (str): Path do arquivo de vídeo.
         """
+        from moviepy import VideoFileClip
         self.caminho_video = caminho_video
         try:
             self.video_original = VideoFileClip(caminho_video)
@@ -63,141 +202,685 @@ class VideoEditor:
         if hasattr(self, 'video_original') and self.video_original:
             self.video_original.close()
             
-    def processar_segmentos(self, segmentos, audios_sintetizados, log_callback=None):
+    def planejar_segmentos(self, segmentos, audios_sintetizados, log_callback=None, ajuste=None):
         """
-        Gera uma lista de videoclips sincronizados com o novo áudio.
+        Calcula o plano de tempo: para cada segmento, o trecho do vídeo original,
+        o fator de velocidade e a duração final na saída.
 
-        Ajusta a velocidade do vídeo (time stretching) para casar com a duração
-        do áudio dublado, dentro de limites aceitáveis (0.1x a 10x).
+        Com ajuste 'audio', a fala é encaixada no tempo original (ver
+        `_planejar_ajuste_audio`) e o plano cobre o vídeo inteiro. Com ajuste
+        'video', a velocidade de cada trecho do vídeo é ajustada para casar
+        com a duração do áudio dublado (0.1x a 10x), e só os trechos com fala
+        entram na saída.
 
         Args:
             segmentos (list): Lista de legendas traduzidas (metadata).
-            audios_sintetizados (list): Lista de áudios (numpy arrays).
+            audios_sintetizados (list): Lista de áudios (audio_numpy_array, sample_rate).
             log_callback (callable, optional): Função para logar mensagens.
+            ajuste (str, optional): 'audio' ou 'video'. Default: AJUSTE_TEMPO em config.
 
         Returns:
-            tuple: (lista_clips_video, lista_arquivos_temp, novas_legendas)
+            tuple: (plano, novas_legendas). Cada item do plano é um dict com
+                   'indice', 'start', 'end', 'ratio', 'duracao', 'audio' e 'sr'
+                   (e 'fator', a velocidade da fala, no ajuste 'audio').
         """
         msg = f"   🎬 Sincronizando {len(segmentos)} segmentos..."
         if log_callback: log_callback(msg)
         else: print(msg)
         
-        clips_finais = []
-        arquivos_temp = []
+        if (ajuste or AJUSTE_TEMPO) == "audio":
+            return self._planejar_ajuste_audio(segmentos, audios_sintetizados, log_callback)
+        
+        plano = []
         novas_legendas = []
         tempo_acumulado = 0.0
         
         for i, seg in enumerate(segmentos):
             if i >= len(audios_sintetizados): break
+            if seg["start"] >= self.duration: break
             audio_data, sr = audios_sintetizados[i]
             
-            start_t = seg["start"]
-            end_t = min(seg["end"], self.duration)
-            original_dur = end_t - start_t
-            
-            if start_t >= self.duration: break
-            if original_dur <= 0.1: continue
+            item = self.planejar_item(i, seg, audio_data, sr)
+            if item is None: continue
+            plano.append(item)
             
-            # Recorte inicial
-            clip = self.video_original.subclipped(start_t, end_t)
-            final_dur = original_dur
+            novas_legendas.append({
+                "start": tempo_acumulado,
+                "end": tempo_acumulado + item["duracao"],
+                "text": seg["text"]
+            })
+            tempo_acumulado += item["duracao"]
             
-            # Se tem áudio sintentizado
-            if audio_data is not None and len(audio_data) > 0:
-                # Padding de segurança (200ms)
-                padding = int(sr * 0.2)
-                audio_padded = np.pad(audio_data, (0, padding), mode='constant')
-                
-                temp_wav = os.path.join(OUTPUT_DIR, f"temp_seg_{i}.wav")
-                sf.write(temp_wav, audio_padded, int(sr))
-                arquivos_temp.append(temp_wav)
-                
-                audio_clip = AudioFileClip(temp_wav)
-                
-                # Calcular speedup/slowdown
-                # Usar duração real do áudio (sem padding excessivo) para calcular ratio
-                # O clip de áudio final terá duration = final_dur
-                audio_dur = len(audio_data) / sr
-                
-                ratio = original_dur / audio_dur
-                ratio = max(0.1, min(ratio, 10.0)) # Clamp
-                
-                if abs(ratio - 1.0) > 0.05:
-                    # Ajustar velocidade do vídeo
-                    clip = clip.with_effects([MultiplySpeed(ratio)])
-                    final_dur = original_dur / ratio # Novo tempo = Dist / Vel
-                else:
-                    final_dur = audio_dur
-                    
-                # Fixar áudio
-                audio_clip = audio_clip.with_duration(final_dur)
-                clip = clip.with_audio(audio_clip)
-                clip = clip.with_duration(final_dur)
-                
-            else:
-                clip = clip.without_audio()
-                
-            # Padronizar
-            clip = clip.with_fps(self.fps)
-            clips_finais.append(clip)
+        return plano, novas_legendas
+
+    def _planejar_ajuste_audio(self, segmentos, audios_sintetizados, log_callback=None):
+        """
+        Plano que mantém o tempo do vídeo original (ver `planejar_ajuste`).
+
+        Os itens cobrem o vídeo inteiro, sem lacunas: cada fala começa no seu
+        item, que vai até o início da fala seguinte (o silêncio entre falas é
+        mantido); um item inicial sem áudio cobre o trecho antes da primeira
+        fala. A velocidade da fala ('fator') é aplicada em `montar_trilha`.
+        Sem trechos desacelerados, a duração da saída é a do original.
+        """
+        n = min(len(segmentos), len(audios_sintetizados))
+        duracoes = [len(a) / sr if a is not None and len(a) > 0 else 0.0 for a, sr in audios_sintetizados[:n]]
+        ajustes = planejar_ajuste([(s["start"], s["end"]) for s in segmentos[:n]], duracoes, self.duration,
+                                  esticar_max=AJUSTE_ESTICAR_MAX, antecipar_max=AJUSTE_ANTECIPAR_MAX)
+        if not ajustes:
+            return [], []
+        
+        plano = []
+        novas_legendas = []
+        if ajustes[0]["inicio"] > 0:
+            plano.append({"indice": None, "start": 0.0, "end": ajustes[0]["inicio"], "ratio": 1.0,
+                          "duracao": ajustes[0]["inicio"], "audio": None, "sr": None, "fator": 1.0})
+        tempo_acumulado = ajustes[0]["inicio"]
+        fins = [aj["inicio"] for aj in ajustes[1:]] + [self.duration]
+        esticados = redimensionados = 0
+        
+        for aj, fim in zip(ajustes, fins):
+            seg = segmentos[aj["indice"]]
+            audio_data, sr = audios_sintetizados[aj["indice"]]
+            tem_audio = duracoes[aj["indice"]] > 0
+            duracao = fim - aj["inicio"]
+            ratio = 1.0
+            if aj["duracao_audio"] > duracao:
+                # Último recurso: nem acelerando a fala ela cabe, desacelerar o vídeo
+                ratio = max(0.1, duracao / aj["duracao_audio"])
+                duracao = aj["duracao_audio"]
+                redimensionados += 1
+            if aj["fator"] != 1.0: esticados += 1
             
+            plano.append({
+                "indice": aj["indice"],
+                "start": aj["inicio"],
+                "end": fim,
+                "ratio": ratio,
+                "duracao": duracao,
+                "audio": audio_data if tem_audio else None,
+                "sr": sr if tem_audio else None,
+                "fator": aj["fator"],
+            })
+            fala = aj["duracao_audio"] if tem_audio else seg["end"] - aj["inicio"]
             novas_legendas.append({
                 "start": tempo_acumulado,
-                "end": tempo_acumulado + final_dur,
+                "end": tempo_acumulado + min(fala, duracao),
                 "text": seg["text"]
             })
-            tempo_acumulado += final_dur
+            tempo_acumulado += duracao
+        
+        msg = (f"   ⏱️ Ajuste pelo áudio: {esticados} falas aceleradas, {redimensionados} trechos "
+               f"de vídeo desacelerados ({tempo_acumulado:.1f}s / original {self.duration:.1f}s)")
+        if log_callback: log_callback(msg)
+        else: print(msg)
+        return plano, novas_legendas
+
+    def planejar_item(self, indice, seg, audio_data, sr):
+        """
+        Calcula o item do plano de tempo de um único segmento.
+
+        Returns:
+            dict: Item do plano (ver `planejar_segmentos`), ou None se o
+                  segmento estiver fora do vídeo ou for curto demais.
+        """
+        start_t = seg["start"]
+        end_t = min(seg["end"], self.duration)
+        original_dur = end_t - start_t
+        
+        if start_t >= self.duration: return None
+        if original_dur <= 0.1: return None
+        
+        ratio = 1.0
+        final_dur = original_dur
+        tem_audio = audio_data is not None and len(audio_data) > 0
+        
+        # Se tem áudio sintentizado
+        if tem_audio:
+            # Calcular speedup/slowdown
+            # Usar duração real do áudio (sem padding excessivo) para calcular ratio
+            audio_dur = len(audio_data) / sr
+            
+            ratio = original_dur / audio_dur
+            ratio = max(0.1, min(ratio, 10.0)) # Clamp
+            
+            if abs(ratio - 1.0) > 0.05:
+                final_dur = original_dur / ratio # Novo tempo = Dist / Vel
+            else:
+                ratio = 1.0
+                final_dur = audio_dur
+        
+        return {
+            "indice": indice,
+            "start": start_t,
+            "end": end_t,
+            "ratio": ratio,
+            "duracao": final_dur,
+            "audio": audio_data if tem_audio else None,
+            "sr": sr if tem_audio else None,
+        }
+
+    def processar_segmentos(self, segmentos, audios_sintetizados, log_callback=None):
+        """
+        Gera uma lista de videoclips sincronizados com o novo áudio (motor MoviePy).
+
+        Os clips saem sem áudio: a dublagem inteira é montada em memória como
+        uma única trilha (ver `montar_trilha`), aplicada no `renderizar_video`.
+
+        Args:
+            segmentos (list): Lista de legendas traduzidas (metadata).
+            audios_sintetizados (list): Lista de áudios (numpy arrays).
+            log_callback (callable, optional): Função para logar mensagens.
+
+        Returns:
+            tuple: (lista_clips_video, (trilha, sample_rate), novas_legendas)
+        """
+        plano, novas_legendas = self.planejar_segmentos(segmentos, audios_sintetizados, log_callback)
+        return self.clips_do_plano(plano), self.montar_trilha(plano), novas_legendas
+
+    def clips_do_plano(self, plano):
+        """Cria os videoclips MoviePy (sem áudio) de um plano de tempo."""
+        from moviepy.video.fx.MultiplySpeed import MultiplySpeed
+        clips_finais = []
+        with span("video.clips", itens=len(plano)):
+            for item in plano:
+                # Recorte inicial
+                clip = self.video_original.subclipped(item["start"], item["end"]).without_audio()
+            
+                if item["ratio"] != 1.0:
+                    # Ajustar velocidade do vídeo
+                    clip = clip.with_effects([MultiplySpeed(item["ratio"])])
+                clip = clip.with_duration(item["duracao"])
+                
+                # Padronizar
+                clip = clip.with_fps(self.fps)
+                clips_finais.append(clip)
+            
+        return clips_finais
+
+    @staticmethod
+    def montar_trilha(plano, sr=None):
+        """
+        Monta a trilha de áudio dublada completa a partir do plano de tempo.
+
+        Os áudios com 'fator' têm a velocidade ajustada (`esticar_audio`); todos
+        são reamostrados para uma única taxa e copiados para um
+        buffer float32 pré-alocado, nos seus deslocamentos finais, cortados ou
+        completados com silêncio até a duração do seu segmento. Nenhum arquivo
+        temporário por segmento é criado.
+
+        Args:
+            plano (list): Saída de `planejar_segmentos`.
+            sr (int, optional): Taxa de amostragem da trilha. Default: a maior
+                taxa entre os áudios do plano.
+
+        Returns:
+            tuple: (trilha_float32, sample_rate)
+        """
+        if sr is None:
+            taxas = [item["sr"] for item in plano if item["sr"]]
+            sr = int(max(taxas)) if taxas else 24000
+        
+        # Deslocamentos em amostras a partir do tempo acumulado (sem deriva de arredondamento)
+        fins = np.round(np.cumsum([item["duracao"] for item in plano]) * sr).astype(np.int64)
+        inicios = np.concatenate([[0], fins[:-1]]) if len(fins) else fins
+        total = int(fins[-1]) if len(fins) else 0
+        trilha = np.zeros(total, dtype=np.float32)
+        
+        with span("video.trilha", itens=len(plano)):
+            for item, inicio, fim in zip(plano, inicios, fins):
+                if item["audio"] is None:
+                    continue
+                audio = np.asarray(item["audio"], dtype=np.float32).reshape(-1)
+                if item.get("fator", 1.0) != 1.0:
+                    audio = esticar_audio(audio, item["fator"], int(item["sr"]))
+                audio = _reamostrar(audio, int(item["sr"]), sr)
+                n = min(len(audio), int(fim - inicio))
+                trilha[inicio:inicio + n] = audio[:n]
+        
+        return trilha, sr
+
+    @staticmethod
+    def _quadros_plano(plano, fps):
+        """Quadros de cada item: tempos acumulados arredondados, sem deriva ao longo do plano."""
+        acumulado = np.concatenate([[0.0], np.cumsum([item["duracao"] for item in plano])])
+        return np.diff(np.round(acumulado * fps).astype(np.int64))
+
+    def _filtro_video(self, plano, fps_saida, quadros=None):
+        """
+        Monta o filter_complex: trim/setpts por segmento + concat.
+
+        Cada segmento sai com um número exato de quadros (`quadros`, default:
+        `_quadros_plano`), repetindo o último quadro se o trecho for curto.
+        """
+        if quadros is None:
+            quadros = self._quadros_plano(plano, fps_saida)
+        linhas = []
+        rotulos = []
+        for n, (item, total) in enumerate(zip(plano, quadros)):
+            dur_video = (item["end"] - item["start"]) / item["ratio"]
+            # Áudio um pouco mais longo que o trecho: congelar o último quadro
+            congelar = int(np.ceil(max(0.0, item["duracao"] - dur_video) * fps_saida)) + 2
+            filtros = [
+                f"trim=start={item['start']:.6f}:end={item['end']:.6f}",
+                f"setpts=(PTS-STARTPTS)/{item['ratio']:.6f}",
+                f"fps={fps_saida}",
+                f"tpad=stop_mode=clone:stop={congelar}",
+                f"trim=end_frame={int(total)}",
+                "setpts=PTS-STARTPTS",
+            ]
+            linhas.append(f"[0:v]{','.join(filtros)}[v{n}]")
+            rotulos.append(f"[v{n}]")
+        linhas.append(f"{''.join(rotulos)}concat=n={len(plano)}:v=1:a=0[vout]")
+        return ";\n".join(linhas)
+
+    def _perfis(self, modo, log_callback=None, codec=None, aceita_vaapi=True):
+        """
+        Perfis de codificação a tentar, em ordem (ver `escolher_perfil`): o
+        escolhido pela sonda e, se for de hardware, o de CPU como reserva.
+        """
+        perfil = escolher_perfil(modo, codec=codec, aceita_vaapi=aceita_vaapi)
+        msg = descrever_perfil(perfil) + f", {self.fps:g} fps"
+        if log_callback: log_callback(msg)
+        else: print(msg)
+        if not perfil["hardware"]:
+            return [perfil]
+        return [perfil, escolher_perfil(modo, codec=codec, usar_hardware=False)]
+
+    def renderizar_ffmpeg(self, plano, caminho_saida, modo="rapido", log_callback=None, partes=None):
+        """
+        Renderiza o plano de tempo em um único processo FFmpeg.
+
+        Alternativa ao `renderizar_video` (MoviePy): o plano vira um único
+        `filter_complex` (trim/setpts por segmento + concat) e o áudio dublado
+        entra como uma trilha já mixada, sem loop de quadros em Python. O
+        encoder vem da sonda do FFmpeg (ver `_perfis`) e o fps é o do original.
+        Com encoder de CPU e vídeo longo, o plano é codificado em partes
+        paralelas (ver `_renderizar_partes`).
+
+        Args:
+            plano (list): Saída de `planejar_segmentos`.
+            caminho_saida (str): Path final do arquivo .mp4.
+            modo (str): 'rapido' (hardware, se houver) ou 'qualidade' (CPU).
+            log_callback (callable, optional): Função para logar mensagens.
+            partes (int, optional): Partes codificadas em paralelo. Default:
+                RENDER_PARTES em config (0 = pelo número de núcleos).
+
+        Returns:
+            bool: True se sucesso.
+        """
+        if not plano: return False
+        
+        msg = f"   Montando filtergraph FFmpeg ({len(plano)} segmentos)..."
+        if log_callback: log_callback(msg)
+        else: print(msg)
+        
+        caminho_filtro = f"{os.path.splitext(caminho_saida)[0]}_filtro.txt"
+        
+        # Trilha dublada enviada direto ao encoder pelo stdin (PCM float32)
+        trilha, sr = self.montar_trilha(plano)
+        duracao_total = len(trilha) / sr
+        
+        perfis = self._perfis(modo, log_callback)
+        start_t = time.time()
+        
+        partes = self._numero_partes(plano, perfis[0], duracao_total, partes)
+        if partes > 1:
+            self._renderizar_partes(plano, partes, trilha, sr, caminho_saida, modo, log_callback)
+            render_time = f"   ⏱️ Tempo render: {time.time() - start_t:.1f}s"
+            if log_callback: log_callback(render_time)
+            else: print(render_time)
+            return True
+        
+        success = False
+        try:
+            for i, perfil in enumerate(perfis):
+                filtro = self._filtro_video(plano, fps_saida=self.fps)
+                saida_video = "[vout]"
+                if perfil["filtro"]:
+                    filtro += f";\n[vout]{perfil['filtro']}[vcod]"
+                    saida_video = "[vcod]"
+                with open(caminho_filtro, "w", encoding="utf-8") as f:
+                    f.write(filtro)
+                cmd = [
+                    obter_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", "-nostats",
+                    *perfil["entrada"],
+                    "-i", self.caminho_video,
+                    "-f", "f32le", "-ar", str(sr), "-ac", "1", "-i", "pipe:0",
+                    "-filter_complex_script", caminho_filtro,
+                    "-map", saida_video, "-map", "1:a",
+                    "-c:a", "aac", "-b:a", "192k", "-ar", "44100",
+                    "-r", str(self.fps),
+                    "-progress", "pipe:1",
+                ] + argumentos_encoder(perfil) + [caminho_saida]
+                
+                msg = f"   🎬 Renderizando (FFmpeg + {perfil['encoder']})..."
+                if log_callback: log_callback(msg)
+                else: print(msg)
+                try:
+                    with span("video.encode", codec=perfil["encoder"], motor="ffmpeg"):
+                        _executar_ffmpeg(cmd, duracao_total, log_callback, entrada=trilha.tobytes())
+                    success = True
+                    break
+                except Exception as e:
+                    if i == len(perfis) - 1:
+                        raise
+                    msg_fail = f"   ⚠️ Falha em {perfil['encoder']}: {e}. Tentando CPU..."
+                    if log_callback: log_callback(msg_fail)
+                    else: print(msg_fail)
+        finally:
+            try:
+                if os.path.exists(caminho_filtro): os.remove(caminho_filtro)
+            except OSError:
+                pass
+        
+        render_time = f"   ⏱️ Tempo render: {time.time() - start_t:.1f}s"
+        if log_callback: log_callback(render_time)
+        else: print(render_time)
+        return success
+
+    @staticmethod
+    def _numero_partes(plano, perfil, duracao_total, partes=None):
+        """
+        Partes paralelas para um render: só encoders de CPU (sessões de
+        hardware são limitadas), no máximo uma por item do plano e com pelo
+        menos RENDER_PARTE_MIN_S segundos cada no modo automático.
+        """
+        partes = partes if partes is not None else RENDER_PARTES
+        if perfil["hardware"]:
+            return 1
+        if not partes:
+            partes = min(sondar_ffmpeg()["cpus"] // RENDER_THREADS_PARTE, int(duracao_total // RENDER_PARTE_MIN_S))
+        return max(1, min(partes, len(plano)))
+
+    @staticmethod
+    def _dividir_plano(plano, partes):
+        """
+        Índices [início, fim) de itens do plano de cada parte, com durações
+        de saída parecidas. As bordas ficam entre itens: cada parte começa
+        num quadro-chave próprio e nenhum trecho é cortado ao meio.
+        """
+        acumulado = np.cumsum([item["duracao"] for item in plano])
+        alvos = acumulado[-1] * np.arange(1, partes) / partes
+        cortes = np.searchsorted(acumulado, alvos) + 1
+        bordas = sorted({0, len(plano), *np.clip(cortes, 1, len(plano) - 1).tolist()})
+        return list(zip(bordas, bordas[1:]))
+
+    def _renderizar_partes(self, plano, partes, trilha, sr, caminho_saida, modo, log_callback=None):
+        """
+        Codifica o plano em partes simultâneas e as emenda sem recodificar.
+
+        Cada parte é um processo FFmpeg próprio (as threads do pool só
+        esperam por ele), com os núcleos divididos entre as partes. O número
+        de quadros de cada parte é fixado pelos tempos acumulados arredondados
+        para quadros, então a soma das partes tem exatamente os quadros do
+        render único e a trilha continua sincronizada. As partes são unidas
+        pelo concat demuxer (`-c:v copy`) junto com a trilha dublada.
+        """
+        intervalos = self._dividir_plano(plano, partes)
+        cpus = sondar_ffmpeg()["cpus"]
+        perfil = escolher_perfil(modo, usar_hardware=False, threads=max(1, cpus // len(intervalos)))
+        quadros = self._quadros_plano(plano, self.fps)
+        base = [obter_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", "-nostats"]
+        
+        msg = (f"   🧩 Renderizando em {len(intervalos)} partes paralelas "
+               f"({perfil['encoder']}, {perfil['threads'] or cpus} threads cada)...")
+        if log_callback: log_callback(msg)
+        else: print(msg)
+        
+        pasta = tempfile.mkdtemp(prefix="partes_", dir=os.path.dirname(os.path.abspath(caminho_saida)))
+        try:
+            def codificar(n, inicio, fim):
+                itens = plano[inicio:fim]
+                # Busca rápida até o trecho da parte; os tempos do plano ficam relativos a ela
+                deslocamento = min(item["start"] for item in itens)
+                itens = [{**item, "start": item["start"] - deslocamento, "end": item["end"] - deslocamento}
+                         for item in itens]
+                caminho_filtro = os.path.join(pasta, f"filtro_{n:04d}.txt")
+                with open(caminho_filtro, "w", encoding="utf-8") as f:
+                    f.write(self._filtro_video(itens, fps_saida=self.fps, quadros=quadros[inicio:fim]) +
+                            ";\n[vout]format=yuv420p[vcod]")
+                caminho = os.path.join(pasta, f"parte_{n:04d}.mp4")
+                cmd = base + ["-ss", f"{deslocamento:.6f}", "-i", self.caminho_video,
+                              "-filter_complex_script", caminho_filtro, "-map", "[vcod]",
+                              "-frames:v", str(int(quadros[inicio:fim].sum())), "-r", str(self.fps)]
+                with span("video.encode", codec=perfil["encoder"], motor="ffmpeg", parte=n):
+                    proc = subprocess.run(cmd + argumentos_encoder(perfil) + [caminho],
+                                          stdin=subprocess.DEVNULL, capture_output=True)
+                if proc.returncode != 0:
+                    raise RuntimeError(proc.stderr.decode("utf-8", errors="replace").strip()
+                                       or f"ffmpeg retornou {proc.returncode}")
+                if log_callback: log_callback(f"   ▸ Parte {n + 1}/{len(intervalos)} pronta")
+                return caminho
+            
+            with span("video.partes", partes=len(intervalos)):
+                with ThreadPoolExecutor(max_workers=len(intervalos)) as pool:
+                    arquivos = list(pool.map(codificar, range(len(intervalos)), *zip(*intervalos)))
+            
+            lista = os.path.join(pasta, "partes.txt")
+            with open(lista, "w", encoding="utf-8") as f:
+                f.writelines(f"file '{caminho}'\n" for caminho in arquivos)
+            with span("video.encode", codec="copy", motor="ffmpeg"):
+                _executar_ffmpeg(base + ["-f", "concat", "-safe", "0", "-i", lista,
+                                         "-f", "f32le", "-ar", str(sr), "-ac", "1", "-i", "pipe:0",
+                                         "-map", "0:v:0", "-map", "1:a", "-c:v", "copy",
+                                         "-c:a", "aac", "-b:a", "192k", "-ar", "44100",
+                                         "-movflags", "+faststart", "-progress", "pipe:1", caminho_saida],
+                                 len(trilha) / sr, log_callback, entrada=trilha.tobytes())
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    def preserva_tempo(self, plano):
+        """True se o plano cobre o vídeo original inteiro, em ordem e sem lacunas."""
+        if not plano or abs(plano[0]["start"]) > 1e-3 or abs(plano[-1]["end"] - self.duration) > 1e-3:
+            return False
+        return all(abs(a["end"] - b["start"]) < 1e-6 for a, b in zip(plano, plano[1:]))
+
+    @staticmethod
+    def _item_alterado(item):
+        """True se o trecho do item muda de velocidade (ou ganha quadros congelados)."""
+        return item["ratio"] != 1.0 or abs(item["duracao"] - (item["end"] - item["start"])) >= 1e-6
+
+    def mantem_video(self, plano):
+        """True se o plano reproduz o vídeo original sem alteração, só com outra trilha de áudio."""
+        return self.preserva_tempo(plano) and not any(self._item_alterado(item) for item in plano)
+
+    @staticmethod
+    def _faixas_regravar(plano, chaves, duracao):
+        """
+        Faixas [início, fim) do vídeo original que precisam ser recodificadas:
+        cada trecho com velocidade alterada, estendido até os quadros-chave
+        vizinhos (GOPs inteiros, pelo pts), com faixas sobrepostas unidas.
+        """
+        faixas = []
+        for item in plano:
+            if not VideoEditor._item_alterado(item):
+                continue
+            inicio = max([k for k in chaves if k <= item["start"] + 1e-6], default=0.0)
+            fim = min([k for k in chaves if k >= item["end"] - 1e-6], default=duracao)
+            if faixas and inicio <= faixas[-1][1]:
+                faixas[-1][1] = max(faixas[-1][1], fim)
+            else:
+                faixas.append([inicio, fim])
+        return faixas
+
+    @staticmethod
+    def _recortar_plano(plano, inicio, fim):
+        """Itens do plano dentro de [início, fim), com tempos relativos a `início`."""
+        recorte = []
+        for item in plano:
+            a, b = max(item["start"], inicio), min(item["end"], fim)
+            if b - a <= 1e-6:
+                continue
+            # Faixas são estendidas só sobre itens sem mudança de velocidade: cortá-los não muda nada
+            duracao = item["duracao"] if (a, b) == (item["start"], item["end"]) else b - a
+            recorte.append({**item, "start": a - inicio, "end": b - inicio, "duracao": duracao})
+        return recorte
+
+    def renderizar_preservando(self, plano, caminho_saida, modo="rapido", log_callback=None):
+        """
+        Renderiza um plano que preserva o tempo do vídeo original (ver
+        `preserva_tempo`) sem recodificar o vídeo inteiro.
+
+        Sem trechos com velocidade alterada, o vídeo original é copiado
+        (`-c:v copy`) e só a trilha dublada é codificada: segundos em vez de
+        minutos. Com trechos alterados, só os GOPs que os contêm são
+        recodificados (ver `_faixas_regravar`); o resto é copiado e tudo é
+        emendado pelo concat demuxer. Vídeos que não são H.264 ou sem
+        quadros-chave legíveis caem no `renderizar_ffmpeg`.
+
+        Args:
+            plano (list): Saída de `planejar_segmentos` (ajuste 'audio').
+            caminho_saida (str): Path final do arquivo .mp4.
+            modo (str): 'rapido' ou 'qualidade', para os trechos recodificados (ver `_perfis`).
+            log_callback (callable, optional): Função para logar mensagens.
+
+        Returns:
+            bool: True se sucesso.
+        """
+        if not plano: return False
+        trilha, sr = self.montar_trilha(plano)
+        duracao_total = len(trilha) / sr
+        ffmpeg = obter_ffmpeg_exe()
+        
+        cmd_audio = ["-f", "f32le", "-ar", str(sr), "-ac", "1", "-i", "pipe:0"]
+        cmd_saida = ["-map", "0:v:0", "-map", "1:a", "-c:v", "copy",
+                     "-c:a", "aac", "-b:a", "192k", "-ar", "44100",
+                     "-movflags", "+faststart", "-progress", "pipe:1", caminho_saida]
+        start_t = time.time()
+        
+        faixas = []
+        alterados = [item for item in plano if self._item_alterado(item)]
+        if alterados:
+            codec = self.video_original.reader.infos.get("video_codec_name")
+            escala, chaves = quadros_chave(self.caminho_video) if codec == "h264" else (None, [])
+            if not chaves or not escala:
+                msg = f"   ⚠️ Emenda de GOPs indisponível (codec {codec}): recodificando o vídeo inteiro."
+                if log_callback: log_callback(msg)
+                else: print(msg)
+                return self.renderizar_ffmpeg(plano, caminho_saida, modo=modo, log_callback=log_callback)
+            faixas = self._faixas_regravar(plano, [pts for pts, _ in chaves], self.duration)
+        
+        if not faixas:
+            msg = "   ⚡ Tempo preservado: copiando o vídeo original e trocando só o áudio..."
+            if log_callback: log_callback(msg)
+            else: print(msg)
+            with span("video.encode", codec="copy", motor="ffmpeg"):
+                _executar_ffmpeg([ffmpeg, "-y", "-hide_banner", "-loglevel", "error", "-nostats",
+                                  "-i", self.caminho_video] + cmd_audio + cmd_saida,
+                                 duracao_total, log_callback, entrada=trilha.tobytes())
+        else:
+            recodificado = sum(fim - inicio for inicio, fim in faixas)
+            msg = (f"   ⚡ Tempo preservado: recodificando {len(faixas)} faixas de GOPs "
+                   f"({recodificado:.1f}s de {self.duration:.1f}s), copiando o resto...")
+            if log_callback: log_callback(msg)
+            else: print(msg)
+            self._emendar(plano, faixas, dict(chaves), escala, trilha, cmd_audio, cmd_saida, duracao_total,
+                          modo, log_callback)
+        
+        render_time = f"   ⏱️ Tempo render: {time.time() - start_t:.1f}s"
+        if log_callback: log_callback(render_time)
+        else: print(render_time)
+        return True
+
+    def _emendar(self, plano, faixas, dts_chaves, escala, trilha, cmd_audio, cmd_saida, duracao_total, modo,
+                 log_callback=None):
+        """
+        Recodifica as faixas e emenda tudo com a trilha dublada (concat demuxer).
+
+        Os trechos intactos não viram arquivos: entram na lista do concat como
+        o próprio vídeo original com `inpoint`/`outpoint`. O corte final de
+        cada um é no dts do quadro-chave seguinte, para que nenhum quadro dele
+        (decodificado antes dos quadros B anteriores) vaze para a emenda.
+        """
+        ffmpeg = obter_ffmpeg_exe()
+        base = [ffmpeg, "-y", "-hide_banner", "-loglevel", "error", "-nostats"]
+        # As faixas são emendadas ao H.264 original: o codec de saída é sempre H.264
+        perfis = self._perfis(modo, log_callback, codec="h264")
+        original = os.path.abspath(self.caminho_video).replace("'", "'\\''")
+        
+        pasta = tempfile.mkdtemp(prefix="emenda_", dir=os.path.dirname(os.path.abspath(cmd_saida[-1])))
+        try:
+            entradas = []
+            cursor = 0.0
+            with span("video.emenda", faixas=len(faixas)):
+                for n, (inicio, fim) in enumerate(faixas):
+                    if inicio - cursor > 1e-6:
+                        entradas.append(f"file '{original}'\ninpoint {cursor:.6f}\n"
+                                        f"outpoint {dts_chaves[inicio]:.6f}\nduration {inicio - cursor:.6f}\n")
+                    caminho = os.path.join(pasta, f"faixa_{n:04d}.mp4")
+                    caminho_filtro = os.path.join(pasta, f"filtro_{n:04d}.txt")
+                    filtro = self._filtro_video(self._recortar_plano(plano, inicio, fim), fps_saida=self.fps)
+                    for i, perfil in enumerate(perfis):
+                        with open(caminho_filtro, "w", encoding="utf-8") as f:
+                            f.write(filtro + f";\n[vout]{perfil['filtro'] or 'format=yuv420p'}[vcod]")
+                        # Mesma escala de tempo do original: o concat copia os pacotes sem reescalar
+                        cmd = base + perfil["entrada"] + ["-ss", f"{inicio:.6f}", "-i", self.caminho_video,
+                                                          "-filter_complex_script", caminho_filtro, "-map", "[vcod]",
+                                                          "-video_track_timescale", str(escala)]
+                        try:
+                            with span("video.encode", codec=perfil["encoder"], motor="ffmpeg", parcial=True):
+                                subprocess.run(cmd + argumentos_encoder(perfil) + [caminho], stdin=subprocess.DEVNULL,
+                                               capture_output=True, check=True)
+                            break
+                        except subprocess.CalledProcessError as e:
+                            if i == len(perfis) - 1:
+                                raise RuntimeError(e.stderr.decode("utf-8", errors="replace").strip()) from e
+                    entradas.append(f"file '{caminho}'\n")
+                    cursor = fim
+                if self.duration - cursor > 1e-6:
+                    entradas.append(f"file '{original}'\ninpoint {cursor:.6f}\n")
             
-        return clips_finais, arquivos_temp, novas_legendas
+            lista = os.path.join(pasta, "partes.txt")
+            with open(lista, "w", encoding="utf-8") as f:
+                f.writelines(entradas)
+            with span("video.encode", codec="copy", motor="ffmpeg"):
+                _executar_ffmpeg(base + ["-f", "concat", "-safe", "0", "-i", lista] + cmd_audio + cmd_saida,
+                                 duracao_total, log_callback, entrada=trilha.tobytes())
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
 
-    def renderizar_video(self, clips, caminho_saida, modo="rapido", log_callback=None):
+    def renderizar_video(self, clips, caminho_saida, modo="rapido", log_callback=None, trilha=None):
         """
         Compila a lista de clips finais em um único arquivo de vídeo.
 
         Args:
             clips (list): Lista de objetos VideoFileClip processados.
             caminho_saida (str): Path final do arquivo .mp4.
-            modo (str): 'rapido' (NVENC) ou 'qualidade' (libx264).
+            trilha (tuple, optional): (audio_float32, sample_rate) aplicado como
+                áudio do vídeo final (ver `montar_trilha`).
+            modo (str): 'rapido' (hardware, se houver) ou 'qualidade' (CPU).
             log_callback (callable, optional): Função para logar mensagens.
 
         Returns:
             bool: True se sucesso.
         """
         if not clips: return False
+        from moviepy import AudioArrayClip, concatenate_videoclips
         
         msg = "   Concatenando clips..."
         if log_callback: log_callback(msg)
         else: print(msg)
 
         # Validar FPS
-        clips = [c.with_fps(24) if not c.fps else c for c in clips]
-        final_video = concatenate_videoclips(clips, method="compose")
+        clips = [c.with_fps(self.fps) if not c.fps else c for c in clips]
+        with span("video.concat", itens=len(clips)):
+            final_video = concatenate_videoclips(clips, method="compose")
+        if trilha is not None:
+            audio, sr = trilha
+            final_video = final_video.with_audio(AudioArrayClip(audio.reshape(-1, 1), fps=sr))
         
-        # Parâmetros de Encoding
-        params_gpu = {
-            "codec": "h264_nvenc",
+        # Parâmetros de Encoding (perfil da sonda; MoviePy envia quadros crus, sem VAAPI)
+        perfis = self._perfis(modo, log_callback, aceita_vaapi=False)
+        params_base = {
             "audio_codec": "aac",
             "audio_bitrate": "192k",
-            "temp_audiofile": "temp-audio.m4a",
+            # Ao lado da saída: jobs simultâneos não disputam um arquivo no diretório atual
+            "temp_audiofile": os.path.splitext(caminho_saida)[0] + ".temp-audio.m4a",
             "remove_temp": True,
-            "fps": 24,
-            "preset": "p1",
-            "ffmpeg_params": ["-rc", "vbr", "-cq", "23", "-b:v", "0"]
+            "fps": self.fps,
         }
         
-        params_cpu = {
-            "codec": "libx264",
-            "audio_codec": "aac",
-            "audio_bitrate": "192k",
-            "temp_audiofile": "temp-audio.m4a",
-            "remove_temp": True,
-            "fps": 24,
-            "preset": "medium",
-            "threads": 4,
-            "ffmpeg_params": ["-crf", "18"]
-        }
-        
-        success = False
         start_t = time.time()
         
         # Prepare Logger
@@ -205,25 +888,22 @@ class VideoEditor:
         if log_callback:
             logger = MyLogger(log_callback)
 
-        if modo == "rapido":
-            msg_gpu = "   🚀 Renderizando (GPU NVENC)..."
-            if log_callback: log_callback(msg_gpu)
-            else: print(msg_gpu)
-
+        for i, perfil in enumerate(perfis):
+            msg = f"   🎬 Renderizando ({perfil['encoder']})..."
+            if log_callback: log_callback(msg)
+            else: print(msg)
+            params = {**params_base, "codec": perfil["encoder"], "preset": perfil["preset"] or "medium",
+                      "threads": perfil["threads"], "ffmpeg_params": perfil["extras"]}
             try:
-                final_video.write_videofile(caminho_saida, **params_gpu, logger=logger)
-                success = True
+                with span("video.encode", codec=perfil["encoder"], motor="moviepy"):
+                    final_video.write_videofile(caminho_saida, **params, logger=logger)
+                break
             except Exception as e:
-                msg_fail = f"   ⚠️ Falha GPU: {e}. Tentando CPU..."
+                if i == len(perfis) - 1:
+                    raise
+                msg_fail = f"   ⚠️ Falha em {perfil['encoder']}: {e}. Tentando CPU..."
                 if log_callback: log_callback(msg_fail)
                 else: print(msg_fail)
-                # Fallback para CPU logic abaixo
-        
-        if not success: # Se não era rápido ou se falhou
-            msg_cpu = "   🎬 Renderizando (CPU libx264)..."
-            if log_callback: log_callback(msg_cpu)
-            else: print(msg_cpu)
-            final_video.write_videofile(caminho_saida, **params_cpu, logger=logger)
             
         render_time = f"   ⏱️ Tempo render: {time.time() - start_t:.1f}s"
         if log_callback: log_callback(render_time)
@@ -3,8 +3,16 @@ import os
 import shutil
 import sys
 
+_ffmpeg_exe = None
+
 def obter_ffmpeg_exe():
-    """Retorna o caminho do executável ffmpeg."""
+    """Retorna o caminho do executável ffmpeg (resolvido uma vez por processo)."""
+    global _ffmpeg_exe
+    if _ffmpeg_exe is None:
+        _ffmpeg_exe = _resolver_ffmpeg_exe()
+    return _ffmpeg_exe
+
+def _resolver_ffmpeg_exe():
     # Tentar obter via imageio_ffmpeg
     try:
         import imageio_ffmpeg
@@ -26,6 +34,42 @@ def obter_ffmpeg_exe():
     except:
         return "ffmpeg" # Fallback
 
+def memoria_disponivel_bytes(device):
+    """
+    Retorna a memória livre (bytes) no dispositivo, ou None se não for possível medir.
+
+    Para CUDA usa `torch.cuda.mem_get_info`; para CPU, as páginas físicas livres
+    do sistema (Linux/macOS).
+    """
+    try:
+        if "cuda" in str(device):
+            import torch
+            livre, _ = torch.cuda.mem_get_info(torch.device(device))
+            return livre
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def eh_erro_oom(erro):
+    """Indica se a exceção é falta de memória (CUDA ou alocador de CPU)."""
+    try:
+        import torch
+        if isinstance(erro, torch.cuda.OutOfMemoryError):
+            return True
+    except Exception:
+        pass
+    msg = str(erro).lower()
+    return "out of memory" in msg or "can't allocate memory" in msg or isinstance(erro, MemoryError)
+
+def liberar_memoria_gpu():
+    """Devolve ao driver a memória CUDA em cache (no-op sem GPU)."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
 def formatar_tempo_srt(segundos):
     """Converte segundos para formato SRT (HH:MM:SS,mmm)"""
     if segundos is None or segundos < 0:
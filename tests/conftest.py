@@ -48,3 +48,23 @@ def mock_directories(monkeypatch, output_dir):
     # Importar aqui para evitar execucao prematura
     import sys
     sys.path.append(os.getcwd())
+
+@pytest.fixture(autouse=True)
+def device_sem_torch(monkeypatch):
+    """
+    Sem torch instalado, fixa o dispositivo em CPU: os testes com modelos falsos
+    montam chaves de cache (`identificador_modelo`) sem importar o torch.
+    """
+    import importlib.util
+    if os.environ.get("VIDEO_DUB_DEVICE") or importlib.util.find_spec("torch") is not None:
+        return
+    from src import config
+    monkeypatch.setattr(config, "_device", "cpu")
+
+@pytest.fixture(scope="session")
+def synthetic_video_longo(input_dir):
+    """Vídeo dummy de 10 minutos (cor sólida, sem áudio) para o benchmark de renderização."""
+    filename = input_dir / "test_video_10min.mp4"
+    video = ColorClip(size=(640, 360), color=(0, 0, 255), duration=600)
+    video.write_videofile(str(filename), fps=24, codec="libx264", preset="ultrafast", logger=None)
+    return str(filename)
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.services.cache import CacheResultados, chave_cache, hash_arquivo
+
+
+def test_chave_cache_deterministica():
+    """Mesmas entradas geram a mesma chave; entradas diferentes, chaves diferentes."""
+    a = chave_cache("Olá mundo", "eng_Latn", "por_Latn", "nllb")
+    b = chave_cache("Olá mundo", "eng_Latn", "por_Latn", "nllb")
+    c = chave_cache("Olá mundo", "eng_Latn", "spa_Latn", "nllb")
+    assert a == b
+    assert a != c
+
+
+def test_hash_arquivo_conteudo(tmp_path):
+    """O hash depende apenas do conteúdo do arquivo."""
+    f1 = tmp_path / "a.wav"
+    f2 = tmp_path / "b.wav"
+    f1.write_bytes(b"RIFF" + b"\x00" * 100)
+    f2.write_bytes(b"RIFF" + b"\x00" * 100)
+    assert hash_arquivo(str(f1)) == hash_arquivo(str(f2))
+    assert hash_arquivo(str(tmp_path / "nao_existe.wav")) is None
+
+
+def test_cache_json_e_audio(tmp_path):
+    """Segmentos (JSON) e formas de onda (npz) sobrevivem ao round-trip."""
+    cache = CacheResultados(str(tmp_path / "cache"))
+    segmentos = [{"start": 0.0, "end": 1.5, "text": "Olá"}]
+    cache.salvar_json("transcricao", "abc123", segmentos)
+    assert cache.obter_json("transcricao", "abc123") == segmentos
+    assert cache.obter_json("transcricao", "inexistente") is None
+
+    audio = np.linspace(-1, 1, 1600).astype(np.float32)
+    cache.salvar_audio("def456", audio, 16000)
+    lido, sr = cache.obter_audio("def456")
+    assert sr == 16000
+    assert np.allclose(lido, audio)
+
+
+def test_cache_evicta_lru(tmp_path):
+    """Ao exceder o limite, remove as entradas usadas há mais tempo."""
+    cache = CacheResultados(str(tmp_path / "cache"), limite_bytes=2500)
+    texto = "x" * 1000
+    cache.salvar_json("traducao", "aa01", texto)
+    cache.salvar_json("traducao", "bb02", texto)
+    # Deixar 'aa01' mais antiga e depois usar 'bb02'
+    antigo = time.time() - 100
+    os.utime(cache._caminho("traducao", "aa01", ".json"), (antigo, antigo))
+    cache.salvar_json("traducao", "cc03", texto)
+
+    assert cache.obter_json("traducao", "aa01") is None
+    assert cache.obter_json("traducao", "bb02") == texto
+    assert cache.obter_json("traducao", "cc03") == texto
+
+
+def test_cache_limpar_namespace(tmp_path):
+    """`limpar` restringe a remoção ao namespace informado."""
+    cache = CacheResultados(str(tmp_path / "cache"))
+    cache.salvar_json("traducao", "aa01", "texto")
+    cache.salvar_json("transcricao", "bb02", [])
+    removidos, _ = cache.limpar("traducao")
+
+    assert removidos == 1
+    stats = cache.estatisticas()
+    assert stats["namespaces"]["traducao"]["entradas"] == 0
+    assert stats["namespaces"]["transcricao"]["entradas"] == 1
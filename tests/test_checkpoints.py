@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.services.checkpoints import ManifestoJob
+
+
+def test_manifesto_salva_e_valida_por_fingerprint(tmp_path):
+    """Áudios e plano voltam iguais; outra impressão digital invalida o checkpoint."""
+    manifesto = ManifestoJob(str(tmp_path))
+    audios = [(np.linspace(-1, 1, 100, dtype=np.float32), 16000), (None, None), (np.ones(7, dtype=np.float32), 22050)]
+    manifesto.salvar_audios("tts", "fp1", audios)
+    plano = [{"indice": 0, "start": 0.0, "end": 1.0, "ratio": 1.0, "duracao": 1.0, "audio": audios[0][0], "sr": 16000},
+             {"indice": 2, "start": 2.0, "end": 3.0, "ratio": 1.0, "duracao": 1.0, "audio": audios[2][0], "sr": 22050}]
+    manifesto.salvar_plano("fp2", plano, [{"start": 0.0, "end": 1.0, "text": "oi"}])
+
+    # Recarregado do disco, como numa execução retomada
+    manifesto = ManifestoJob(str(tmp_path))
+    assert manifesto.carregar_audios("tts", "outro") is None
+    carregados = manifesto.carregar_audios("tts", "fp1")
+    assert carregados[1] == (None, None)
+    assert carregados[2][1] == 22050
+    np.testing.assert_array_equal(carregados[0][0], audios[0][0])
+
+    plano2, legendas = manifesto.carregar_plano("fp2", carregados)
+    assert [item["indice"] for item in plano2] == [0, 2]
+    np.testing.assert_array_equal(plano2[1]["audio"], audios[2][0])
+    assert legendas[0]["text"] == "oi"
+
+    manifesto.limpar()
+    assert not manifesto.valido("tts", "fp1")
+
+
+def test_pipeline_retoma_da_etapa_que_falhou(tmp_path, monkeypatch):
+    """Com `retomar`, só a etapa sem checkpoint (o render que falhou) é refeita."""
+    import src.pipeline as pipeline
+
+    chamadas = []
+    video = tmp_path / "entrada.mp4"
+    video.write_bytes(b"video")
+    render_ok = [False]
+
+    def extrair_audio(caminho_video, saida, log_callback=None):
+        chamadas.append("extracao")
+        open(saida, "wb").close()
+        return True
+
+    def transcrever(caminho, modelo=None, log_callback=None):
+        chamadas.append("transcricao")
+        return [{"start": 0.0, "end": 1.0, "text": "hello"}, {"start": 1.0, "end": 2.0, "text": "world"}]
+
+    def traduzir(segmentos, origem, destino, log_callback=None):
+        chamadas.append("traducao")
+        return [{**s, "text": s["text"].upper()} for s in segmentos]
+
+    class TTSFalso:
+        def __init__(self, **kwargs): pass
+        def sintetizar_batch(self, textos):
+            chamadas.append("tts")
+            return [(np.zeros(16000, dtype=np.float32), 16000) for _ in textos]
+        def liberar(self): pass
+
+    class EditorFalso:
+        def __init__(self, caminho): pass
+        def planejar_segmentos(self, segmentos, audios, log_callback=None):
+            chamadas.append("plano")
+            plano = [{"indice": i, "start": s["start"], "end": s["end"], "ratio": 1.0, "duracao": 1.0,
+                      "audio": a, "sr": sr} for i, (s, (a, sr)) in enumerate(zip(segmentos, audios))]
+            return plano, [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in segmentos]
+        def preserva_tempo(self, plano): return False
+        def renderizar_ffmpeg(self, plano, saida, modo="rapido", log_callback=None):
+            chamadas.append("render")
+            assert all(item["audio"] is not None for item in plano)
+            if render_ok[0]:
+                open(saida, "wb").close()
+            return render_ok[0]
+        def close(self): pass
+
+    monkeypatch.setattr(pipeline, "extrair_audio", extrair_audio)
+    monkeypatch.setattr(pipeline, "transcrever_audio_whisper", transcrever)
+    monkeypatch.setattr(pipeline, "traduzir_segmentos", traduzir)
+    monkeypatch.setattr(pipeline, "TTSEngine", TTSFalso)
+    monkeypatch.setattr(pipeline, "VideoEditor", EditorFalso)
+
+    kwargs = dict(caminho_video=str(video), idioma_origem="eng_Latn", idioma_destino="por_Latn",
+                  idioma_voz="por", motor_tts="mms", modo_encoding="qualidade", motor_render="ffmpeg",
+                  sobreposto=False, diretorio_saida=str(tmp_path / "saida"))
+
+    assert not pipeline.executar_pipeline(**kwargs)
+    assert chamadas == ["extracao", "transcricao", "traducao", "tts", "plano", "render"]
+
+    chamadas.clear()
+    render_ok[0] = True
+    assert pipeline.executar_pipeline(**kwargs, retomar=True)
+    assert chamadas == ["render"]
+
+    # Outro idioma de destino invalida a tradução e tudo o que depende dela
+    chamadas.clear()
+    assert pipeline.executar_pipeline(**{**kwargs, "idioma_destino": "spa_Latn"}, retomar=True)
+    assert chamadas == ["traducao", "tts", "plano", "render"]
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from src.services import codificacao
+from src.services.codificacao import argumentos_encoder, escolher_perfil
+
+
+def test_perfil_pela_sonda():
+    """Hardware só no modo rápido e só se a sonda o validou; CPU escala com os núcleos."""
+    gpu = {"encoders": ["h264_nvenc", "libx264", "libx265"], "hwaccels": ["cuda"], "cpus": 16}
+    perfil = escolher_perfil("rapido", codec="h264", sonda=gpu)
+    assert perfil["encoder"] == "h264_nvenc" and perfil["hardware"]
+    perfil = escolher_perfil("qualidade", codec="h264", sonda=gpu)
+    assert argumentos_encoder(perfil) == ["-c:v", "libx264", "-preset", "slow", "-threads", "16", "-crf", "18"]
+    assert escolher_perfil("rapido", codec="h264", sonda=gpu, usar_hardware=False)["encoder"] == "libx264"
+
+    vaapi = {"encoders": ["h264_vaapi", "hevc_vaapi", "libx264"], "hwaccels": ["vaapi"], "cpus": 4}
+    perfil = escolher_perfil("rapido", codec="hevc", sonda=vaapi)
+    assert perfil["encoder"] == "hevc_vaapi" and perfil["filtro"] == "format=nv12,hwupload"
+    assert perfil["entrada"][0] == "-vaapi_device"
+    # MoviePy não sobe quadros para a GPU: VAAPI fica de fora
+    perfil = escolher_perfil("rapido", codec="h264", sonda=vaapi, aceita_vaapi=False)
+    assert perfil["encoder"] == "libx264" and perfil["preset"] == "veryfast" and perfil["threads"] == 4
+
+    cpu = {"encoders": ["libx264"], "hwaccels": [], "cpus": 2}
+    assert escolher_perfil("rapido", codec="av1", sonda=cpu)["encoder"] == "libsvtav1"
+
+
+def test_sonda_executada_uma_vez(monkeypatch):
+    """A sonda roda uma vez por processo e vem do cache nos processos seguintes."""
+    chamadas = []
+    monkeypatch.setattr(codificacao, "_sondar", lambda ffmpeg: chamadas.append(ffmpeg) or
+                        {"versao": "x", "encoders": ["libx264"], "hwaccels": [], "cpus": 1})
+
+    class CacheFalso:
+        def __init__(self): self.dados = {}
+        def obter_json(self, ns, chave): return self.dados.get((ns, chave))
+        def salvar_json(self, ns, chave, valor): self.dados[(ns, chave)] = valor
+
+    cache = CacheFalso()
+    monkeypatch.setattr(codificacao, "obter_cache", lambda: cache)
+    monkeypatch.setattr(codificacao, "_sonda", None)
+    assert codificacao.sondar_ffmpeg() is codificacao.sondar_ffmpeg()
+    # Novo processo: memória vazia, cache em disco preenchido
+    monkeypatch.setattr(codificacao, "_sonda", None)
+    assert codificacao.sondar_ffmpeg()["encoders"] == ["libx264"]
+    assert len(chamadas) == 1
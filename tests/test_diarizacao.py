@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.services import tts as modulo_tts
+from src.services.diarizacao import diarizar_segmentos, extrair_referencias_falantes, mapear_vozes
+from src.services.tts import TTSEngine
+
+SR = 16000
+# Timbres sintéticos: frequência fundamental e formantes de cada falante
+VOZES = {"a": (110.0, (500, 1500, 2500)), "b": (230.0, (800, 2200, 3300))}
+# (início, fim, falante); o último segmento de "a" é curto demais para ser analisado e
+# herda o falante do vizinho mais próximo ("b")
+TURNOS = [(0.5, 4.0, "a"), (4.6, 7.0, "b"), (7.8, 12.0, "a"), (12.3, 14.0, "b"), (15.0, 19.5, "a"),
+          (20.0, 22.5, "b"), (23.0, 23.5, "a"), (24.5, 28.0, "b")]
+
+
+def _voz(duracao, f0, formantes, rng):
+    t = np.arange(int(duracao * SR)) / SR
+    # Variação de formantes por segmento (conteúdo fonético diferente)
+    formantes = [f * rng.uniform(0.92, 1.08) for f in formantes]
+    f0_t = f0 * (1 + 0.03 * np.sin(2 * np.pi * 4 * t))
+    fase = 2 * np.pi * np.cumsum(f0_t) / SR
+    sinal = np.zeros_like(t)
+    for k in range(1, int(4000 // f0)):
+        ganho = sum(np.exp(-((k * f0 - f) / 120.0) ** 2) for f in formantes) + 0.02
+        sinal += ganho * np.sin(k * fase)
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 3 * t + rng.uniform(0, np.pi))
+    return 0.1 * sinal * envelope / max(1e-9, np.abs(sinal).max())
+
+
+def _audio_dialogo(caminho):
+    rng = np.random.default_rng(1)
+    sinal = rng.normal(0, 0.001, int(29 * SR))
+    for inicio, fim, falante in TURNOS:
+        f0, formantes = VOZES[falante]
+        trecho = _voz(fim - inicio, f0, formantes, rng)
+        sinal[int(inicio * SR):int(inicio * SR) + len(trecho)] += trecho
+    sf.write(caminho, sinal.astype(np.float32), SR, subtype="PCM_16")
+    return [{"start": i, "end": f, "text": f"fala {n}"} for n, (i, f, _) in enumerate(TURNOS)]
+
+
+def test_diarizacao_separa_falantes_e_extrai_referencias(tmp_path):
+    """Dois timbres viram dois falantes; cada um recebe uma referência só com a própria voz."""
+    caminho = str(tmp_path / "audio.wav")
+    segmentos = _audio_dialogo(caminho)
+
+    resultado = diarizar_segmentos(caminho, segmentos, modelo=None, log_callback=lambda m: None)
+
+    esperado = [falante for _, _, falante in TURNOS]
+    esperado[6] = "b"
+    obtido = [s["falante"] for s in resultado]
+    assert len(set(obtido)) == 2
+    # O falante 0 é o de maior tempo de fala ("a")
+    tempos = {f: sum(fim - ini for ini, fim, g in TURNOS if g == f) for f in VOZES}
+    principal = max(tempos, key=tempos.get)
+    assert all((o == 0) == (e == principal) for o, e in zip(obtido, esperado))
+    assert [s["text"] for s in resultado] == [s["text"] for s in segmentos]
+
+    referencias = extrair_referencias_falantes(caminho, resultado, str(tmp_path / "referencia_voz.wav"),
+                                               duracao=6, log_callback=lambda m: None)
+    assert [os.path.basename(r) for r in referencias] == ["referencia_voz_falante0.wav",
+                                                          "referencia_voz_falante1.wav"]
+    for referencia in referencias:
+        info = sf.info(referencia)
+        assert info.samplerate == SR and 5.0 <= info.duration <= 6.0
+
+
+def test_vozes_por_falante_no_tts(monkeypatch):
+    """Cada falante é sintetizado com o seu speaker, e a ordem dos áudios é preservada."""
+    vozes = mapear_vozes(3, "qwen3", "custom", "Ryan")
+    assert [v["qwen3_speaker"] for v in vozes.values()] == ["ryan", "vivian", "aiden"]
+    assert mapear_vozes(2, "mms") == {}
+    assert mapear_vozes(2, "qwen3", "clone", referencias=["r0.wav", None]) == {0: {"ref_wav": "r0.wav"}}
+
+    class Qwen3Falso:
+        def __init__(self):
+            self.chamadas = []
+
+        def generate_custom_voice(self, text, language, speaker, instruct):
+            self.chamadas.append((speaker[0], list(text)))
+            return [np.full(100, len(t), dtype=np.float32) for t in text], 12000
+
+    monkeypatch.setattr(modulo_tts, "obter_cache", lambda: None)
+    monkeypatch.setattr(TTSEngine, "_garantir_modelo", lambda self: None)
+    engine = TTSEngine(motor="qwen3", idioma="por", qwen3_mode="custom", qwen3_speaker="ryan",
+                       log_callback=lambda m: None, vozes=vozes)
+    engine.config["model"] = falso = Qwen3Falso()
+    engine._modelo_carregado = True
+    engine._modelo_qwen3 = "Qwen/Qwen3-TTS-12Hz-1.7B-CustomVoice"
+    engine.speaker = "ryan"
+    engine.qwen3_language = "Portuguese"
+
+    textos = ["a", "bb", "ccc", "dddd"]
+    audios = engine.sintetizar_batch(textos, falantes=[1, 0, 1, 2])
+
+    assert sorted(falso.chamadas) == [("aiden", ["dddd"]), ("ryan", ["bb"]), ("vivian", ["ccc", "a"])]
+    assert [int(a[0]) for a, _ in audios] == [1, 2, 3, 4]
+    assert engine.speaker == "ryan" and engine.qwen3_speaker == "ryan"
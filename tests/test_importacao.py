@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que só devem ser importados quando um estágio precisar deles
+PESADOS = ["torch", "transformers", "moviepy", "qwen_tts"]
+
+# Orçamento de tempo de importação (segundos, cumulativo do módulo raiz)
+LIMITES_S = {
+    "src.pipeline": 2.0,
+    "src.backend.app": 4.0,
+}
+
+
+def _importar(modulo):
+    """
+    Importa `modulo` num processo novo com `-X importtime`.
+
+    Returns:
+        tuple: (tempo cumulativo em segundos, módulos pesados carregados, ffmpeg resolvido?)
+    """
+    codigo = (
+        f"import sys, {modulo}, src.utils; "
+        f"print([m for m in {PESADOS!r} if m in sys.modules]); "
+        f"print(src.utils._ffmpeg_exe is not None)"
+    )
+    env = {**os.environ, "PYTHONPATH": RAIZ}
+    env.pop("VIDEO_DUB_DEVICE", None)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                          cwd=RAIZ, env=env, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        pytest.skip(f"{modulo} não importável neste ambiente: {proc.stderr.strip().splitlines()[-1]}")
+
+    cumulativo_us = None
+    for linha in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        partes = [p.strip() for p in linha.split("|")]
+        if len(partes) == 3 and partes[2] == modulo:
+            cumulativo_us = int(partes[1])
+    pesados, ffmpeg = proc.stdout.strip().splitlines()[-2:]
+    return cumulativo_us / 1e6, eval(pesados), ffmpeg == "True"
+
+
+@pytest.mark.parametrize("modulo", sorted(LIMITES_S))
+def test_importacao_rapida_sem_dependencias_pesadas(modulo):
+    """Importar o pipeline/backend não carrega torch, transformers nem moviepy."""
+    tempo, pesados, ffmpeg = _importar(modulo)
+    print(f"\n{modulo}: {tempo:.2f}s")
+
+    assert pesados == []
+    assert not ffmpeg, "obter_ffmpeg_exe() não deve rodar na importação"
+    assert tempo < LIMITES_S[modulo], f"{modulo} levou {tempo:.2f}s (limite {LIMITES_S[modulo]}s)"
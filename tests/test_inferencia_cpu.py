@@ -0,0 +1,159 @@
+import importlib.util
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.services import inferencia_cpu
+
+# Fixture pequena: frases em inglês com a tradução de referência em português
+FRASES = [
+    ("Hello and welcome to this video.", "Olá e bem-vindos a este vídeo."),
+    ("Today we are going to talk about machine learning.", "Hoje vamos falar sobre aprendizado de máquina."),
+    ("This is very important.", "Isso é muito importante."),
+    ("Thank you for watching.", "Obrigado por assistir."),
+    ("Let's get started with a quick overview of the tools.", "Vamos começar com uma visão geral rápida das ferramentas."),
+    ("The weather is nice today.", "O tempo está bom hoje."),
+    ("Please subscribe to the channel.", "Por favor, inscreva-se no canal."),
+    ("We will see you in the next lesson.", "Nos vemos na próxima aula."),
+]
+
+
+def _normalizar(texto):
+    return "".join(c for c in texto.lower() if c.isalnum() or c.isspace()).split()
+
+
+def _wer(referencia, hipotese):
+    """Word error rate (distância de edição entre palavras / palavras da referência)."""
+    ref, hip = _normalizar(referencia), _normalizar(hipotese)
+    anterior = list(range(len(hip) + 1))
+    for i, r in enumerate(ref, 1):
+        atual = [i] + [0] * len(hip)
+        for j, h in enumerate(hip, 1):
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (r != h))
+        anterior = atual
+    return anterior[-1] / max(1, len(ref))
+
+
+def _chrf(referencia, hipotese, n=6, beta=2.0):
+    """chrF (F-beta médio de n-gramas de caracteres, 1..n), em 0-100."""
+    ref, hip = " ".join(referencia.split()), " ".join(hipotese.split())
+    precisoes, revocacoes = [], []
+    for k in range(1, n + 1):
+        r = Counter(ref[i:i + k] for i in range(len(ref) - k + 1))
+        h = Counter(hip[i:i + k] for i in range(len(hip) - k + 1))
+        comum = sum((r & h).values())
+        if r and h:
+            precisoes.append(comum / sum(h.values()))
+            revocacoes.append(comum / sum(r.values()))
+    if not precisoes:
+        return 0.0
+    p, rc = np.mean(precisoes), np.mean(revocacoes)
+    return 0.0 if p + rc == 0 else 100 * (1 + beta**2) * p * rc / (beta**2 * p + rc)
+
+
+def test_metricas_de_qualidade():
+    assert _wer("o gato subiu no telhado", "o gato subiu no telhado") == 0.0
+    assert _wer("o gato subiu no telhado", "o rato subiu telhado") == pytest.approx(2 / 5)
+    assert _chrf("Olá mundo", "Olá mundo") == pytest.approx(100.0)
+    assert _chrf("Olá mundo", "Olá mundos") > _chrf("Olá mundo", "Adeus")
+
+
+def test_backend_e_threads(monkeypatch):
+    """Na GPU o backend é sempre torch; em CPU as threads são divididas entre os workers."""
+    monkeypatch.setattr(inferencia_cpu, "BACKEND_CPU", "int8")
+    monkeypatch.setattr(inferencia_cpu, "obter_device", lambda: "cuda:0")
+    assert inferencia_cpu.identificador_modelo("m") == "m"
+
+    monkeypatch.setattr(inferencia_cpu, "obter_device", lambda: "cpu")
+    assert inferencia_cpu.identificador_modelo("m") == "m@int8"
+
+    monkeypatch.setattr(inferencia_cpu, "CPU_THREADS", 0)
+    monkeypatch.setattr(inferencia_cpu, "JOBS_WORKERS_CPU", 2)
+    monkeypatch.setattr(inferencia_cpu.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    assert inferencia_cpu.threads_cpu() == 4
+
+    # 'onnx' sem optimum/onnxruntime: a chave reflete o int8 de fato usado
+    monkeypatch.setattr(inferencia_cpu, "BACKEND_CPU", "onnx")
+    monkeypatch.setattr(inferencia_cpu, "_onnx_disponivel", lambda: False)
+    assert inferencia_cpu.identificador_modelo("m") == "m@int8"
+    monkeypatch.setattr(inferencia_cpu, "_onnx_disponivel", lambda: True)
+    assert inferencia_cpu.identificador_modelo("m") == "m@onnx"
+
+    monkeypatch.setattr(inferencia_cpu, "BACKEND_CPU", "fp8")
+    with pytest.raises(ValueError):
+        inferencia_cpu.backend_efetivo()
+
+
+def _backends_disponiveis():
+    backends = ["torch", "int8"]
+    if importlib.util.find_spec("optimum") and importlib.util.find_spec("onnxruntime"):
+        backends.append("onnx")
+    return backends
+
+
+@pytest.fixture(scope="module")
+def audio_fixture():
+    """Áudio em inglês sintetizado (MMS-TTS) para as frases da fixture."""
+    from src.services.tts import TTSEngine
+    try:
+        tts = TTSEngine(motor="mms", idioma="eng", usar_cache=False)
+        audios = tts.sintetizar_batch([en for en, _ in FRASES])
+        tts.liberar()
+    except Exception as e:
+        pytest.skip(f"MMS-TTS indisponível: {e}")
+    return audios
+
+
+def test_benchmark_backends_cpu(monkeypatch, audio_fixture):
+    """
+    Compara latência e qualidade dos backends de CPU: WER do Whisper sobre a
+    fala sintetizada e chrF do NLLB contra as traduções de referência.
+    Requer os modelos em cache; 'onnx' só entra com `optimum` instalado.
+    """
+    from src.services.translation import MODELO_TRADUCAO
+
+    monkeypatch.setattr(inferencia_cpu, "obter_device", lambda: "cpu")
+    resultados = {}
+    for backend in _backends_disponiveis():
+        monkeypatch.setattr(inferencia_cpu, "BACKEND_CPU", backend)
+        try:
+            asr = inferencia_cpu.criar_pipeline_cpu("automatic-speech-recognition", "openai/whisper-base",
+                                                    log_callback=lambda m: None, chunk_length_s=30)
+            mt = inferencia_cpu.criar_pipeline_cpu("translation", MODELO_TRADUCAO, log_callback=lambda m: None)
+        except Exception as e:
+            pytest.skip(f"Modelos indisponíveis: {e}")
+
+        inicio = time.time()
+        transcricoes = [asr({"raw": np.asarray(a, dtype=np.float32), "sampling_rate": sr})["text"]
+                        for a, sr in audio_fixture]
+        tempo_asr = time.time() - inicio
+
+        inicio = time.time()
+        traducoes = [r["translation_text"] for r in mt([en for en, _ in FRASES], src_lang="eng_Latn",
+                                                       tgt_lang="por_Latn", max_length=512, batch_size=len(FRASES))]
+        tempo_mt = time.time() - inicio
+
+        resultados[backend] = {
+            "asr_s": tempo_asr,
+            "mt_s": tempo_mt,
+            "wer": np.mean([_wer(en, t) for (en, _), t in zip(FRASES, transcricoes)]),
+            "chrf": np.mean([_chrf(pt, t) for (_, pt), t in zip(FRASES, traducoes)]),
+        }
+        del asr, mt
+
+    print()
+    base = resultados["torch"]
+    for backend, r in resultados.items():
+        print(f"{backend:>6}: Whisper {r['asr_s']:.2f}s ({base['asr_s'] / r['asr_s']:.2f}x) WER {r['wer']:.3f} | "
+              f"NLLB {r['mt_s']:.2f}s ({base['mt_s'] / r['mt_s']:.2f}x) chrF {r['chrf']:.1f}")
+
+    for backend, r in resultados.items():
+        # Perda de qualidade limitada em relação ao float32
+        assert r["wer"] <= base["wer"] + 0.10, backend
+        assert r["chrf"] >= base["chrf"] - 5.0, backend
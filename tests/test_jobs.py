@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.getcwd())
+
+from src.services.jobs import FilaJobs, PoolWorkers, PENDENTE, EXECUTANDO, CONCLUIDO, FALHOU
+
+
+def _fila(tmp_path):
+    return FilaJobs(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "jobs"))
+
+
+def test_job_tem_diretorio_proprio_e_entrada(tmp_path):
+    """Cada job recebe um diretório; o vídeo enviado é movido para dentro dele."""
+    fila = _fila(tmp_path)
+    upload = tmp_path / "abc.mp4"
+    upload.write_bytes(b"video")
+
+    job = fila.criar({"motor": "mms"}, recurso="cpu", arquivo_entrada=str(upload))
+    outro = fila.criar({"motor": "mms"}, recurso="cpu")
+
+    assert job["status"] == PENDENTE
+    assert job["diretorio"] != outro["diretorio"]
+    assert os.path.dirname(job["parametros"]["entrada"]) == job["diretorio"]
+    assert os.path.exists(job["parametros"]["entrada"]) and not upload.exists()
+    assert fila.posicao(outro["id"]) == 1
+
+
+def test_retirar_em_ordem_e_reenfileirar(tmp_path):
+    """Jobs saem por ordem de criação e por recurso; os interrompidos voltam à fila."""
+    fila = _fila(tmp_path)
+    a = fila.criar({}, recurso="gpu")
+    time.sleep(0.01)
+    b = fila.criar({}, recurso="gpu")
+    c = fila.criar({}, recurso="cpu")
+
+    assert fila.retirar("gpu")["id"] == a["id"]
+    assert fila.obter(a["id"])["status"] == EXECUTANDO
+    assert fila.retirar("cpu")["id"] == c["id"]
+    assert fila.retirar("cpu") is None
+
+    # Simula reinício do servidor com 'a' e 'c' em execução
+    reaberta = _fila(tmp_path)
+    assert reaberta.reenfileirar_interrompidos() == 2
+    retomado = reaberta.retirar("gpu")
+    assert retomado["id"] == a["id"] and retomado["parametros"]["retomar"] is True
+    assert reaberta.retirar("gpu")["id"] == b["id"]
+
+
+def test_pool_respeita_paralelismo(tmp_path):
+    """No máximo N jobs do recurso rodam ao mesmo tempo; falhas não param o pool."""
+    fila = _fila(tmp_path)
+    ativos = [0]
+    pico = [0]
+    lock = threading.Lock()
+
+    def executar(job):
+        with lock:
+            ativos[0] += 1
+            pico[0] = max(pico[0], ativos[0])
+        time.sleep(0.05)
+        with lock:
+            ativos[0] -= 1
+        if job["parametros"].get("falhar"):
+            raise RuntimeError("falha simulada")
+        return {"video": "ok.mp4"}
+
+    pool = PoolWorkers(fila, executar, {"gpu": 2, "cpu": 0}, log_callback=lambda m: None)
+    pool.iniciar()
+    ids = [fila.criar({"falhar": i == 3}, recurso="gpu")["id"] for i in range(6)]
+    for _ in ids: pool.notificar("gpu")
+
+    limite = time.time() + 10
+    while time.time() < limite and any(fila.obter(i)["status"] in (PENDENTE, EXECUTANDO) for i in ids):
+        time.sleep(0.05)
+    pool.parar(timeout=5)
+
+    status = [fila.obter(i)["status"] for i in ids]
+    assert status.count(CONCLUIDO) == 5 and status[3] == FALHOU
+    assert fila.obter(ids[0])["resultado"] == {"video": "ok.mp4"}
+    assert pico[0] == 2
+
+
+def test_pool_de_um_recurso_assume_jobs_dos_outros(tmp_path):
+    """Jobs pendentes criados para a GPU rodam num servidor só com workers de CPU."""
+    fila = _fila(tmp_path)
+    job = fila.criar({}, recurso="gpu")
+    executados = []
+
+    pool = PoolWorkers(fila, lambda j: executados.append(j["recurso"]) or {}, {"cpu": 1},
+                       log_callback=lambda m: None)
+    pool.iniciar()
+    limite = time.time() + 10
+    while time.time() < limite and fila.obter(job["id"])["status"] != CONCLUIDO:
+        time.sleep(0.05)
+    pool.parar(timeout=5)
+
+    assert executados == ["cpu"]
@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src import lote
+from src.lote import executar_lote, listar_videos
+
+
+def test_listar_videos_por_diretorio_glob_e_manifesto(tmp_path):
+    """Diretório (só vídeos), glob e manifesto .txt com caminhos relativos e comentários."""
+    for nome in ("b.mp4", "a.mkv", "notas.txt"):
+        (tmp_path / nome).write_bytes(b"")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.mp4").write_bytes(b"")
+
+    assert listar_videos(str(tmp_path)) == [str(tmp_path / "a.mkv"), str(tmp_path / "b.mp4")]
+    assert listar_videos(str(tmp_path / "*" / "*.mp4")) == [str(tmp_path / "sub" / "c.mp4")]
+
+    manifesto = tmp_path / "lista.txt"
+    manifesto.write_text("# aulas\nsub/c.mp4\n\nb.mp4\nsub/c.mp4\n", encoding="utf-8")
+    assert listar_videos(str(manifesto)) == [str(tmp_path / "sub" / "c.mp4"), str(tmp_path / "b.mp4")]
+
+    manifesto.write_text("falta.mp4\n", encoding="utf-8")
+    with pytest.raises(FileNotFoundError):
+        listar_videos(str(manifesto))
+
+
+def test_estagios_de_videos_diferentes_se_sobrepoem(monkeypatch, tmp_path):
+    """O render de um vídeo roda junto com a dublagem do seguinte; uma falha não para o lote."""
+    intervalos = {}
+    lock = threading.Lock()
+
+    def pipeline_falso(video, *args, diretorio_saida=None, retomar=False, ate_etapa=None, **kwargs):
+        nome = os.path.basename(video)
+        inicio = time.time()
+        time.sleep({"extracao": 0.02, "plano": 0.1, None: 0.1}[ate_etapa])
+        with lock:
+            intervalos[(nome, ate_etapa)] = (inicio, time.time())
+        assert retomar == (ate_etapa != "extracao")
+        return not (nome == "v1.mp4" and ate_etapa == "plano")
+
+    monkeypatch.setattr(lote, "executar_pipeline", pipeline_falso)
+    monkeypatch.setattr(lote, "_duracao_video", lambda caminho: 30.0)
+
+    videos = [str(tmp_path / f"v{i}.mp4") for i in range(4)]
+    resultados = executar_lote(videos, str(tmp_path / "saida"), "eng_Latn", "por_Latn", "por", "mms",
+                               "rapido", log_callback=lambda m: None)
+
+    assert [r["ok"] for r in resultados] == [True, False, True, True]
+    assert "render" not in resultados[1]["tempos"]
+    assert resultados[0]["saida"] == str(tmp_path / "saida" / "v0" / "video_dublado_mms.mp4")
+    # Render do v2 e dublagem do v3 ao mesmo tempo
+    render, dublagem = intervalos[("v2.mp4", None)], intervalos[("v3.mp4", "plano")]
+    assert render[0] < dublagem[1] and dublagem[0] < render[1]
+
+    resumo = (tmp_path / "saida" / "resumo_lote.txt").read_text(encoding="utf-8")
+    assert "3/4 vídeos" in resumo and "falhou" in resumo
@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.services.models import ModelRegistry
+
+
+class _ModeloFalso:
+    """Objeto leve que simula um modelo com tamanho conhecido."""
+    def __init__(self, nome, tamanho):
+        self.nome = nome
+        self.tamanho = tamanho
+
+
+@pytest.fixture(autouse=True)
+def tamanho_declarado(monkeypatch):
+    """Sem torch nos testes: usa o tamanho declarado pelo modelo falso."""
+    monkeypatch.setattr("src.services.models.estimar_bytes_modelo",
+                        lambda m: getattr(m, "tamanho", 0))
+
+
+def test_registro_reaproveita_modelo_carregado():
+    """Segunda aquisição da mesma chave não recarrega o modelo."""
+    registro = ModelRegistry()
+    cargas = []
+    def carregar():
+        cargas.append(1)
+        return _ModeloFalso("whisper", 10)
+
+    with registro.usar("openai/whisper-base", carregar, device="cpu", dtype="float32", modo="asr") as m1:
+        pass
+    with registro.usar("openai/whisper-base", carregar, device="cpu", dtype="float32", modo="asr") as m2:
+        pass
+
+    assert m1 is m2
+    assert len(cargas) == 1
+    stats = registro.estatisticas()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bytes_residentes"] == 10
+
+
+def test_registro_chaves_distintas_por_device():
+    """Mesmo model_id em dispositivos diferentes são entradas separadas."""
+    registro = ModelRegistry()
+    a = registro.adquirir("nllb", lambda: _ModeloFalso("a", 1), device="cpu")
+    b = registro.adquirir("nllb", lambda: _ModeloFalso("b", 1), device="cuda:0")
+    assert a is not b
+    assert registro.estatisticas()["misses"] == 2
+
+
+def test_registro_evicta_lru_sem_referencias():
+    """Ao exceder o orçamento, descarrega o modelo ocioso menos usado."""
+    registro = ModelRegistry(limite_bytes=25)
+    a = registro.adquirir("a", lambda: _ModeloFalso("a", 10))
+    registro.liberar(a)
+    b = registro.adquirir("b", lambda: _ModeloFalso("b", 10))
+    registro.liberar(b)
+    # 'c' estoura o orçamento: 'a' (LRU, sem referências) sai
+    c = registro.adquirir("c", lambda: _ModeloFalso("c", 10))
+
+    ids = [m["model_id"] for m in registro.estatisticas()["modelos"]]
+    assert ids == ["b", "c"]
+    assert registro.estatisticas()["evictions"] == 1
+
+
+def test_registro_nao_evicta_modelo_em_uso():
+    """Modelos com referências ativas permanecem mesmo acima do orçamento."""
+    registro = ModelRegistry(limite_bytes=5)
+    a = registro.adquirir("a", lambda: _ModeloFalso("a", 10))
+    b = registro.adquirir("b", lambda: _ModeloFalso("b", 10))
+    assert len(registro.estatisticas()["modelos"]) == 2
+
+    registro.liberar(a)
+    ids = [m["model_id"] for m in registro.estatisticas()["modelos"]]
+    assert ids == ["b"]
+
+
+def test_registro_carga_unica_com_threads_concorrentes():
+    """Jobs concorrentes pedindo o mesmo modelo disparam uma única carga."""
+    registro = ModelRegistry()
+    cargas = []
+    barreira = threading.Barrier(4)
+
+    def carregar():
+        cargas.append(1)
+        return _ModeloFalso("qwen3", 1)
+
+    resultados = []
+    def job():
+        barreira.wait()
+        with registro.usar("qwen3", carregar) as m:
+            resultados.append(m)
+
+    threads = [threading.Thread(target=job) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert len(cargas) == 1
+    assert all(m is resultados[0] for m in resultados)
@@ -0,0 +1,72 @@
+import os
+import re
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.utils import obter_ffmpeg_exe
+
+ALVOS = [{"idioma_destino": "por_Latn"}, {"idioma_destino": "spa_Latn"}, {"idioma_destino": "fra_Latn"}]
+
+
+@pytest.fixture
+def video_curto(tmp_path):
+    """8s a 25 fps, H.264 com áudio."""
+    caminho = str(tmp_path / "fonte.mp4")
+    subprocess.run([obter_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+                    "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25", "-f", "lavfi", "-i", "sine=f=300",
+                    "-t", "8", "-c:v", "libx264", "-g", "50", "-pix_fmt", "yuv420p", "-c:a", "aac", caminho],
+                   check=True)
+    return caminho
+
+
+def test_varios_idiomas_com_uma_transcricao(video_curto, tmp_path, monkeypatch):
+    """Whisper uma vez, uma tradução multi-idioma, um MP4 por idioma e um multipistas."""
+    import src.pipeline as pipeline
+
+    chamadas = {"transcricao": 0, "traducao": [], "tts": []}
+
+    def transcrever(caminho, modelo=None, log_callback=None):
+        chamadas["transcricao"] += 1
+        return [{"start": 1.0, "end": 3.0, "text": "hello"}, {"start": 4.0, "end": 6.0, "text": "world"}]
+
+    def traduzir_multi(segmentos, origem, destinos, log_callback=None):
+        chamadas["traducao"].append(list(destinos))
+        return {d: [{**s, "text": f"{d}:{s['text']}"} for s in segmentos] for d in destinos}
+
+    class TTSFalso:
+        def __init__(self, idioma=None, **kwargs):
+            self.idioma = idioma
+        def sintetizar_batch(self, textos):
+            chamadas["tts"].append(self.idioma)
+            return [(np.full(16000, 0.1, dtype=np.float32), 16000) for _ in textos]
+        def liberar(self): pass
+
+    monkeypatch.setattr(pipeline, "transcrever_audio_whisper", transcrever)
+    monkeypatch.setattr(pipeline, "traduzir_multi", traduzir_multi)
+    monkeypatch.setattr(pipeline, "TTSEngine", TTSFalso)
+
+    kwargs = dict(caminho_video=video_curto, idioma_origem="eng_Latn", alvos=ALVOS, modo_encoding="qualidade",
+                  motor_render="ffmpeg", diretorio_saida=str(tmp_path / "saida"), diarizar=False)
+    resultado = pipeline.executar_pipeline_multi(**kwargs, multipistas=True)
+
+    assert chamadas["transcricao"] == 1
+    assert chamadas["traducao"] == [["por_Latn", "spa_Latn", "fra_Latn"]]
+    assert sorted(chamadas["tts"]) == ["fra", "por", "spa"]
+    assert list(resultado["videos"]) == ["por_Latn_mms", "spa_Latn_mms", "fra_Latn_mms"]
+    assert all(os.path.exists(v) for v in resultado["videos"].values())
+
+    info = subprocess.run([obter_ffmpeg_exe(), "-hide_banner", "-i", resultado["multipistas"]],
+                          capture_output=True).stderr.decode()
+    assert re.findall(r"\((\w+)\): Audio", info) == ["por", "spa", "fra"]
+    assert len(re.findall(r": Subtitle", info)) == 3
+
+    # Retomada: tudo tem checkpoint válido, nada é refeito
+    chamadas.update(transcricao=0, traducao=[], tts=[])
+    resultado = pipeline.executar_pipeline_multi(**kwargs, retomar=True)
+    assert chamadas == {"transcricao": 0, "traducao": [], "tts": []}
+    assert all(resultado["videos"].values())
@@ -0,0 +1,63 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.pipeline_concorrente import executar_estagios_sobrepostos, resumo_estagios
+
+
+def _segmentos(n, atraso=0.0):
+    for i in range(n):
+        if atraso: time.sleep(atraso)
+        yield {"start": float(i), "end": i + 0.9, "text": f"seg {i}"}
+
+
+def test_estagios_preservam_ordem_e_sobrepoem():
+    """A montagem recebe os segmentos em ordem e começa antes do fim da transcrição."""
+    transcricao_fim = threading.Event()
+    montagem_antes_do_fim = []
+    montados = []
+
+    def fonte():
+        yield from _segmentos(50, atraso=0.005)
+        transcricao_fim.set()
+
+    def traduzir(lote):
+        return [{**s, "text": s["text"].upper()} for s in lote]
+
+    def sintetizar(textos):
+        return [(t, 16000) for t in textos]
+
+    def montar(seg, audio):
+        montagem_antes_do_fim.append(not transcricao_fim.is_set())
+        montados.append((seg["text"], audio[0]))
+
+    stats = executar_estagios_sobrepostos(fonte(), traduzir, sintetizar, montar, tamanho_lote=4)
+
+    assert [t for t, _ in montados] == [f"SEG {i}" for i in range(50)]
+    assert all(t == a for t, a in montados)
+    assert any(montagem_antes_do_fim)
+    assert [s.itens for s in stats] == [50, 50, 50, 50]
+    assert "Gargalo" in resumo_estagios(stats)
+
+
+def test_falha_em_estagio_cancela_os_demais():
+    """Uma exceção no TTS interrompe a transcrição e é propagada ao chamador."""
+    fechado = threading.Event()
+
+    def fonte():
+        try:
+            yield from _segmentos(10_000)
+        finally:
+            fechado.set()
+
+    def sintetizar(textos):
+        raise RuntimeError("falha simulada")
+
+    with pytest.raises(RuntimeError, match="falha simulada"):
+        executar_estagios_sobrepostos(fonte(), lambda lote: lote, sintetizar, lambda seg, audio: None)
+    assert fechado.wait(timeout=2)
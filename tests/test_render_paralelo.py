@@ -0,0 +1,80 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.services.video import VideoEditor
+from src.utils import obter_ffmpeg_exe
+
+SR = 16000
+
+
+def _fala(duracao):
+    return np.full(int(duracao * SR), 0.2, dtype=np.float32), SR
+
+
+def _tempos_quadros(caminho):
+    saida = subprocess.run([obter_ffmpeg_exe(), "-hide_banner", "-i", caminho, "-map", "0:v:0",
+                            "-vf", "showinfo", "-f", "null", "-"], capture_output=True).stderr.decode()
+    return np.array([float(t) for t in re.findall(r"pts_time:([0-9.]+)", saida)])
+
+
+def _plano(editor, duracao, passo):
+    """Um segmento por `passo` segundos, com falas alternando entre curtas e longas."""
+    inicios = np.arange(0.0, duracao - passo + 1e-9, passo)
+    segmentos = [{"start": float(s) + 0.2, "end": float(s) + passo - 0.2, "text": "x"} for s in inicios]
+    audios = [_fala(passo * (0.6 if i % 2 else 1.3)) for i in range(len(segmentos))]
+    plano, _ = editor.planejar_segmentos(segmentos, audios, log_callback=lambda m: None, ajuste="video")
+    return plano
+
+
+def test_partes_tem_os_mesmos_quadros_do_render_unico(synthetic_video, tmp_path):
+    """Render em 3 partes: mesmos quadros do render único, tempos contínuos entre as partes."""
+    editor = VideoEditor(synthetic_video)
+    try:
+        plano = _plano(editor, editor.duration, 1.0)
+        saidas = {}
+        for partes in (1, 3):
+            saidas[partes] = str(tmp_path / f"saida_{partes}.mp4")
+            assert editor.renderizar_ffmpeg(plano, saidas[partes], modo="qualidade", partes=partes,
+                                            log_callback=lambda m: None)
+        fps = editor.fps
+    finally:
+        editor.close()
+
+    unico, paralelo = _tempos_quadros(saidas[1]), _tempos_quadros(saidas[3])
+    assert len(unico) == len(paralelo) == round(sum(item["duracao"] for item in plano) * fps)
+    np.testing.assert_allclose(np.diff(paralelo), 1 / fps, atol=1e-3)
+
+
+def test_benchmark_render_paralelo(synthetic_video_longo, tmp_path):
+    """Benchmark: vídeo de 10 minutos em um processo vs. em partes pelos núcleos."""
+    cpus = os.cpu_count() or 1
+    if cpus < 4:
+        pytest.skip(f"Benchmark de partes paralelas precisa de 4+ CPUs (há {cpus})")
+
+    editor = VideoEditor(synthetic_video_longo)
+    try:
+        plano = _plano(editor, editor.duration, 5.0)
+        tempos, quadros = {}, {}
+        for partes in (1, max(2, cpus // 2)):
+            saida = str(tmp_path / f"saida_{partes}.mp4")
+            inicio = time.perf_counter()
+            assert editor.renderizar_ffmpeg(plano, saida, modo="qualidade", partes=partes,
+                                            log_callback=lambda m: None)
+            tempos[partes] = time.perf_counter() - inicio
+            quadros[partes] = len(_tempos_quadros(saida))
+    finally:
+        editor.close()
+
+    for partes, tempo in tempos.items():
+        print(f"\n{partes} parte(s): {tempo:.2f}s ({quadros[partes]} quadros)")
+    unico, paralelo = tempos.values()
+    print(f"Speedup: {unico / paralelo:.2f}x")
+    assert len(set(quadros.values())) == 1
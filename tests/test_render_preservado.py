@@ -0,0 +1,103 @@
+import os
+import re
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.services.video import VideoEditor, quadros_chave
+from src.utils import obter_ffmpeg_exe
+
+SR = 16000
+SEGMENTOS = [{"start": 1.0, "end": 3.0, "text": "a"}, {"start": 4.5, "end": 5.5, "text": "b"},
+             {"start": 5.5, "end": 9.0, "text": "c"}]
+
+
+@pytest.fixture
+def video_gop(tmp_path):
+    """12s a 25 fps, H.264 com quadros B e um quadro-chave a cada 2s."""
+    caminho = str(tmp_path / "fonte.mp4")
+    subprocess.run([obter_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+                    "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25", "-f", "lavfi", "-i", "sine=f=300",
+                    "-t", "12", "-c:v", "libx264", "-g", "50", "-pix_fmt", "yuv420p", "-c:a", "aac", caminho],
+                   check=True)
+    return caminho
+
+
+def _fala(duracao):
+    return np.full(int(duracao * SR), 0.2, dtype=np.float32), SR
+
+
+def _pacotes_video(caminho):
+    """Hash de cada pacote de vídeo (sem decodificar)."""
+    saida = subprocess.run([obter_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-i", caminho,
+                            "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"], capture_output=True).stdout.decode()
+    return [linha.split(",")[5].strip() for linha in saida.splitlines() if not linha.startswith("#")]
+
+
+def _tempos_quadros(caminho):
+    saida = subprocess.run([obter_ffmpeg_exe(), "-hide_banner", "-i", caminho, "-map", "0:v:0",
+                            "-vf", "showinfo", "-f", "null", "-"], capture_output=True).stderr.decode()
+    return np.array([float(t) for t in re.findall(r"pts_time:([0-9.]+)", saida)])
+
+
+def test_sem_trechos_alterados_copia_o_video(video_gop, tmp_path):
+    """Plano que cabe no tempo original: os pacotes de vídeo saem idênticos, só o áudio muda."""
+    editor = VideoEditor(video_gop)
+    try:
+        plano, _ = editor.planejar_segmentos(SEGMENTOS, [_fala(1.5), _fala(1.0), _fala(2.0)],
+                                             log_callback=lambda m: None, ajuste="audio")
+        assert editor.preserva_tempo(plano)
+        saida = str(tmp_path / "saida.mp4")
+        assert editor.renderizar_preservando(plano, saida, modo="qualidade", log_callback=lambda m: None)
+    finally:
+        editor.close()
+    assert _pacotes_video(saida) == _pacotes_video(video_gop)
+
+
+def test_trecho_desacelerado_recodifica_so_o_gop(video_gop, tmp_path):
+    """Só o GOP do trecho desacelerado é recodificado; os quadros seguem contínuos até o fim."""
+    assert [pts for pts, _ in quadros_chave(video_gop)[1]] == [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+    editor = VideoEditor(video_gop)
+    try:
+        plano, _ = editor.planejar_segmentos(SEGMENTOS, [_fala(1.5), _fala(2.5), _fala(2.0)],
+                                             log_callback=lambda m: None, ajuste="audio")
+        assert [item["ratio"] < 1.0 for item in plano] == [False, False, True, False]
+        saida = str(tmp_path / "saida.mp4")
+        assert editor.renderizar_preservando(plano, saida, modo="qualidade", log_callback=lambda m: None)
+    finally:
+        editor.close()
+
+    duracao = sum(item["duracao"] for item in plano)
+    tempos = _tempos_quadros(saida)
+    assert abs(len(tempos) - duracao * 25) <= 1
+    np.testing.assert_allclose(np.diff(tempos), 0.04, atol=1e-3)
+    # GOPs fora da faixa [4s, 6s) são copiados sem recodificar (o concat só acrescenta os
+    # parâmetros H.264 aos pacotes dos quadros-chave, um a cada 50)
+    originais, novos = _pacotes_video(video_gop), _pacotes_video(saida)
+    copiados = list(range(100)) + list(range(150, 300))
+    deslocamento = len(novos) - len(originais)
+    assert all(novos[i + (deslocamento if i >= 150 else 0)] == originais[i] for i in copiados if i % 50)
+
+
+def test_item_com_audio_mais_longo_sem_mudar_velocidade_e_recodificado(video_gop, tmp_path):
+    """Item com ratio 1.0 mas duração maior (fala até 5% mais longa): vídeo e áudio continuam com a mesma duração."""
+    fala = _fala(2.08)
+    plano = [{"indice": 0, "start": 0.0, "end": 4.0, "ratio": 1.0, "duracao": 4.0, "audio": None, "sr": None},
+             {"indice": 1, "start": 4.0, "end": 6.0, "ratio": 1.0, "duracao": 2.08, "audio": fala[0], "sr": SR},
+             {"indice": 2, "start": 6.0, "end": 12.0, "ratio": 1.0, "duracao": 6.0, "audio": None, "sr": None}]
+    editor = VideoEditor(video_gop)
+    try:
+        assert editor.preserva_tempo(plano) and not editor.mantem_video(plano)
+        saida = str(tmp_path / "saida.mp4")
+        assert editor.renderizar_preservando(plano, saida, modo="qualidade", log_callback=lambda m: None)
+    finally:
+        editor.close()
+
+    duracao = sum(item["duracao"] for item in plano)
+    tempos = _tempos_quadros(saida)
+    assert abs(len(tempos) - duracao * 25) <= 1
+    np.testing.assert_allclose(np.diff(tempos), 0.04, atol=1e-3)
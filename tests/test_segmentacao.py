@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.services import audio
+from src.services.audio import AgrupadorSegmentos, PoliticaSegmentacao
+
+
+def _chunks_sinteticos(n, seed=0):
+    """Palavras do Whisper com pausas, pontuação, timestamps ausentes e fora de ordem."""
+    rng = np.random.default_rng(seed)
+    letras = np.array(list("abcdefghijklmnopqrstuvwxyzçãé"))
+    t = 0.0
+    chunks = []
+    for _ in range(n):
+        texto = "".join(rng.choice(letras, rng.integers(1, 13)))
+        sorteio = rng.random()
+        if sorteio < 0.06: texto += rng.choice([".", "?", "!", ","])
+        elif sorteio < 0.07: texto = " "
+        t += rng.exponential(0.08) + (rng.uniform(0.4, 3.0) if rng.random() < 0.05 else 0.0)
+        fim = t + rng.uniform(0.05, 0.6)
+        sorteio = rng.random()
+        if sorteio < 0.01: timestamp = (None, round(fim, 2))
+        elif sorteio < 0.02: timestamp = (round(t, 2), None)
+        elif sorteio < 0.025: timestamp = None
+        elif sorteio < 0.027: timestamp = (round(t - 30, 2), round(t + 20, 2))  # alucinação
+        else: timestamp = (round(t, 2), round(fim, 2))
+        chunks.append({"text": " " + texto, "timestamp": timestamp})
+        t = fim
+    return chunks
+
+
+def _agrupar_palavra_a_palavra(chunks, politica=None):
+    """Comportamento original: `AgrupadorSegmentos` alimentado palavra a palavra."""
+    agrupador = AgrupadorSegmentos(politica)
+    segmentos = []
+    for chunk in chunks:
+        times = chunk.get("timestamp")
+        if isinstance(times, (list, tuple)):
+            start, end = times
+        else:
+            start, end = agrupador.last_end, agrupador.last_end + 1.0
+        segmentos.extend(agrupador.adicionar(chunk.get("text", ""), start, end))
+    return segmentos + agrupador.finalizar()
+
+
+def test_agrupamento_vetorizado_igual_ao_original():
+    """Golden: 100k palavras geram exatamente os mesmos segmentos, com a política padrão e outra."""
+    chunks = _chunks_sinteticos(100_000)
+    for politica in [None, PoliticaSegmentacao(max_caracteres=42, max_duracao=3.5, pausa_min=0.25,
+                                               pontuacao_final=".?!,")]:
+        esperado = _agrupar_palavra_a_palavra(chunks, politica)
+        obtido = audio._processar_chunks_whisper({"chunks": chunks}, log_callback=lambda m: None,
+                                                 politica=politica)
+        assert len(obtido) == len(esperado)
+        assert obtido == esperado
+
+
+def test_benchmark_agrupamento_palavras():
+    """Tempo do agrupamento palavra a palavra e do vetorizado numa transcrição de 100k palavras."""
+    chunks = _chunks_sinteticos(100_000, seed=1)
+
+    inicio = time.perf_counter()
+    esperado = _agrupar_palavra_a_palavra(chunks)
+    tempo_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtido = audio._processar_chunks_whisper({"chunks": chunks}, log_callback=lambda m: None)
+    tempo_vetorizado = time.perf_counter() - inicio
+
+    print(f"\n100k palavras -> {len(obtido)} segmentos: palavra a palavra {tempo_original * 1000:.0f} ms, "
+          f"vetorizado {tempo_vetorizado * 1000:.0f} ms ({tempo_original / tempo_vetorizado:.1f}x)")
+    assert obtido == esperado
+
+
+def test_chave_transcricao_depende_do_modelo_e_da_politica(tmp_path):
+    """Trocar o modelo Whisper ou as regras de segmentação invalida a transcrição em cache."""
+    caminho = tmp_path / "audio.wav"
+    caminho.write_bytes(b"RIFF" + bytes(64))
+    base = audio.chave_transcricao(str(caminho), "openai/whisper-base", vad=True)
+
+    assert base == audio.chave_transcricao(str(caminho), "openai/whisper-base", vad=True,
+                                           politica=PoliticaSegmentacao())
+    assert base != audio.chave_transcricao(str(caminho), "openai/whisper-small", vad=True)
+    assert base != audio.chave_transcricao(str(caminho), "openai/whisper-base", vad=True,
+                                           politica=PoliticaSegmentacao(max_caracteres=42))
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.services.sincronia import esticar_audio
+from src.services.video import VideoEditor
+
+SR = 16000
+
+
+def _editor(duracao):
+    """VideoEditor sem abrir arquivo (só o planejamento é usado)."""
+    editor = VideoEditor.__new__(VideoEditor)
+    editor.duration, editor.fps = duracao, 24
+    return editor
+
+
+def _fala(duracao):
+    t = np.arange(int(duracao * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 180 * t)).astype(np.float32), SR
+
+
+def test_esticar_audio_muda_duracao_sem_mudar_o_tom():
+    """WSOLA: duração dividida pelo fator, frequência fundamental preservada."""
+    t = np.arange(2 * SR) / SR
+    sinal = (0.5 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+    for fator in (1.25, 0.8):
+        esticado = esticar_audio(sinal, fator, SR)
+        assert len(esticado) == round(len(sinal) / fator)
+        espectro = np.abs(np.fft.rfft(esticado * np.hanning(len(esticado))))
+        assert abs(np.argmax(espectro) * SR / len(esticado) - 220) < 2
+        # Sem cancelamentos de fase: a energia se mantém
+        assert abs(np.sqrt(np.mean(esticado ** 2)) / np.sqrt(np.mean(sinal ** 2)) - 1) < 0.1
+
+
+def test_ajuste_pelo_audio_mantem_a_duracao_do_video():
+    """Falas longas usam o silêncio vizinho e aceleram até 1.25x; o vídeo não muda de duração."""
+    segmentos = [{"start": 1.0, "end": 3.0, "text": "cabe"},
+                 {"start": 4.0, "end": 6.0, "text": "antecipa e acelera"},
+                 {"start": 6.5, "end": 8.0, "text": "acelera"},
+                 {"start": 9.0, "end": 10.0, "text": "usa o silêncio seguinte"}]
+    audios = [_fala(1.5), _fala(3.2), _fala(3.0), _fala(2.5)]
+
+    plano, legendas = _editor(12.0).planejar_segmentos(segmentos, audios, log_callback=lambda m: None,
+                                                       ajuste="audio")
+
+    # Itens contíguos cobrindo o vídeo inteiro, sem mudar a velocidade do vídeo
+    assert plano[0]["indice"] is None and plano[0]["start"] == 0.0
+    assert all(a["end"] == b["start"] for a, b in zip(plano, plano[1:])) and plano[-1]["end"] == 12.0
+    assert all(item["ratio"] == 1.0 for item in plano)
+    assert abs(sum(item["duracao"] for item in plano) - 12.0) < 1e-9
+    assert [round(item["fator"], 3) for item in plano[1:]] == [1.0, 1.143, 1.2, 1.0]
+    assert abs(plano[2]["start"] - 3.7) < 1e-9  # começou 0.3s antes, no silêncio anterior
+    assert [round(l["start"], 2) for l in legendas] == [1.0, 3.7, 6.5, 9.0]
+
+    trilha, sr = VideoEditor.montar_trilha(plano)
+    assert len(trilha) == 12 * sr
+    # Fala acelerada encaixada até o início do segmento seguinte
+    fala = np.flatnonzero(np.abs(trilha[int(6.5 * sr):int(9.0 * sr)]) > 0.01)
+    assert abs((fala[-1] - fala[0]) / sr - 2.5) < 0.01
+
+
+def test_ajuste_pelo_audio_desacelera_o_video_em_ultimo_caso():
+    """Fala que não cabe nem a 1.25x: só esse trecho do vídeo é desacelerado."""
+    segmentos = [{"start": 0.0, "end": 2.0, "text": "longa demais"}, {"start": 2.0, "end": 4.0, "text": "ok"}]
+    plano, _ = _editor(5.0).planejar_segmentos(segmentos, [_fala(5.0), _fala(1.0)],
+                                               log_callback=lambda m: None, ajuste="audio")
+
+    assert [item["indice"] for item in plano] == [0, 1]
+    assert plano[0]["fator"] == 1.25 and abs(plano[0]["duracao"] - 4.0) < 1e-9
+    assert abs(plano[0]["ratio"] - 0.5) < 1e-9
+    assert plano[1]["ratio"] == 1.0 and plano[1]["duracao"] == 3.0
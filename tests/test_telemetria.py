@@ -0,0 +1,112 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.services import telemetria
+from src.services.telemetria import Rastreador, MetricasSpans, span
+
+
+def test_spans_aninhados_e_trace_json(tmp_path):
+    """Spans registram pai, itens e medidas; o trace é salvo em JSON."""
+    with Rastreador("pipeline", motor_tts="mms") as r:
+        with span("traducao") as sp:
+            for _ in range(3):
+                with span("traducao.lote", itens=4):
+                    sum(range(10000))
+            sp.definir(itens=12)
+        with pytest.raises(ValueError):
+            with span("tts"):
+                raise ValueError("falha")
+
+    caminho = tmp_path / "trace.json"
+    r.salvar_json(str(caminho))
+    trace = json.loads(caminho.read_text(encoding="utf-8"))
+    spans = {s["nome"]: s for s in trace["spans"]}
+
+    assert trace["atributos"] == {"motor_tts": "mms"}
+    assert spans["traducao.lote"]["pai"] == "traducao"
+    assert spans["traducao"]["pai"] == "pipeline"
+    assert spans["traducao"]["itens"] == 12
+    assert spans["tts"]["atributos"]["erro"].startswith("ValueError")
+    assert all(s["duracao_s"] >= 0 and s["cpu_s"] is not None for s in trace["spans"])
+
+    agregado = {a["nome"]: a for a in r.agregado()}
+    assert agregado["traducao.lote"]["n"] == 3 and agregado["traducao.lote"]["itens"] == 12
+    assert "traducao.lote" in r.resumo()
+
+
+def test_span_sem_rastreador_nao_registra():
+    """Fora de um Rastreador, `span` apenas executa o bloco."""
+    with Rastreador() as r:
+        pass
+    with span("solto", itens=1) as sp:
+        sp.definir(extra=True)
+    assert [s.nome for s in r.spans] == ["pipeline"]
+
+
+def test_spans_em_threads_com_contexto_copiado():
+    """Threads iniciadas com o contexto copiado registram no rastreador ativo."""
+    def trabalho(i):
+        with span("worker", itens=i):
+            pass
+
+    with Rastreador() as r:
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(trabalho, i)) for i in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+    workers = [s for s in r.spans if s.nome == "worker"]
+    assert len(workers) == 4
+    assert all(s.pai.nome == "pipeline" for s in workers)
+
+
+def test_prometheus_acumula_execucoes(monkeypatch):
+    """As métricas somam os spans de todas as execuções."""
+    metricas = MetricasSpans()
+    monkeypatch.setattr(telemetria, "_metricas", metricas)
+    for _ in range(2):
+        with Rastreador():
+            with span("render", itens=5):
+                pass
+
+    texto = metricas.prometheus()
+    assert "# TYPE video_dub_span_segundos_total counter" in texto
+    assert 'video_dub_span_execucoes_total{span="render"} 2' in texto
+    assert 'video_dub_span_itens_total{span="render"} 10' in texto
+    assert 'video_dub_span_execucoes_total{span="pipeline"} 2' in texto
+
+
+def test_medidas_sao_do_intervalo_do_span():
+    """CPU da própria thread; pico de RSS amostrado só enquanto o span está aberto."""
+    parar = threading.Event()
+
+    def ocupar():
+        while not parar.is_set():
+            sum(range(1000))
+
+    with Rastreador(intervalo_amostragem=0.01) as r:
+        with span("alocacao"):
+            bloco = bytearray(64 * 1024**2)
+            bloco[::4096] = b"\x01" * len(bloco[::4096])
+            threading.Event().wait(0.1)
+            del bloco
+        with span("espera"):
+            ocupada = threading.Thread(target=ocupar)
+            ocupada.start()
+            threading.Event().wait(0.2)
+            parar.set()
+            ocupada.join()
+
+    spans = {s.nome: s for s in r.spans}
+    if spans["alocacao"].rss_bytes is None:
+        pytest.skip("RSS indisponível nesta plataforma")
+    assert spans["alocacao"].rss_pico_bytes - spans["alocacao"]._rss_inicio >= 60 * 1024**2
+    assert spans["espera"].rss_pico_bytes < spans["alocacao"].rss_pico_bytes
+    # A CPU gasta pela outra thread não entra no span
+    assert spans["espera"].cpu_s < 0.1
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.services.translation import _agrupar_lotes, traduzir_segmentos, MODELO_TRADUCAO
+
+
+def test_agrupar_lotes_cobre_todos_indices():
+    """Cada índice aparece exatamente uma vez nos lotes."""
+    comprimentos = [5, 40, 12, 3, 40, 7, 90, 1]
+    lotes = _agrupar_lotes(comprimentos, max_tokens=100, max_itens=4)
+    indices = sorted(i for lote in lotes for i in lote)
+    assert indices == list(range(len(comprimentos)))
+
+
+def test_agrupar_lotes_respeita_orcamento():
+    """Nenhum lote com mais de um item excede o orçamento de tokens com padding."""
+    comprimentos = [5, 40, 12, 3, 40, 7, 90, 1, 33, 18]
+    lotes = _agrupar_lotes(comprimentos, max_tokens=100, max_itens=8)
+    for lote in lotes:
+        assert len(lote) <= 8
+        if len(lote) > 1:
+            assert len(lote) * max(comprimentos[i] for i in lote) <= 100
+
+
+def test_agrupar_lotes_ordena_por_comprimento():
+    """Lotes reúnem itens de tamanho parecido (ordem decrescente)."""
+    comprimentos = [1, 50, 2, 49, 3, 48]
+    lotes = _agrupar_lotes(comprimentos, max_tokens=1000, max_itens=3)
+    assert lotes == [[1, 3, 5], [4, 2, 0]]
+
+
+def _segmentos_benchmark(n):
+    frases = [
+        "Hello and welcome to this video.",
+        "Today we are going to talk about machine learning and how it changes the way we build software.",
+        "Thanks.",
+        "Let's get started with a quick overview of the tools we will be using in the next sections of the course.",
+        "This is important.",
+    ]
+    return [{"start": float(i), "end": float(i) + 0.9, "text": frases[i % len(frases)]} for i in range(n)]
+
+
+def test_benchmark_traducao_em_lote_vs_loop():
+    """
+    Compara a vazão (segmentos/s) da tradução em lote com o loop
+    segmento-a-segmento anterior. Requer o modelo NLLB em cache.
+    """
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from transformers import pipeline
+    from src.config import DEVICE
+
+    try:
+        pipe = pipeline(
+            task="translation",
+            model=MODELO_TRADUCAO,
+            device=0 if DEVICE == "cuda:0" else -1,
+            torch_dtype=torch.float16 if "cuda" in DEVICE else torch.float32
+        )
+    except Exception as e:
+        pytest.skip(f"Modelo NLLB indisponível: {e}")
+
+    segmentos = _segmentos_benchmark(120)
+
+    # Loop anterior: uma chamada (forward) por segmento
+    inicio = time.time()
+    loop = [pipe(s["text"], src_lang="eng_Latn", tgt_lang="por_Latn", max_length=512)[0]["translation_text"]
+            for s in segmentos]
+    tempo_loop = time.time() - inicio
+    del pipe
+
+    # Aquece o registro de modelos para que a carga não entre na medição
+    traduzir_segmentos(segmentos[:2], "eng_Latn", "por_Latn", usar_cache=False)
+
+    inicio = time.time()
+    em_lote = traduzir_segmentos(segmentos, "eng_Latn", "por_Latn", usar_cache=False)
+    tempo_lote = time.time() - inicio
+
+    print(f"\nLoop: {len(segmentos) / tempo_loop:.1f} seg/s | Lote: {len(segmentos) / tempo_lote:.1f} seg/s "
+          f"| speedup: {tempo_loop / tempo_lote:.2f}x")
+
+    assert len(em_lote) == len(loop)
+    assert [s["start"] for s in em_lote] == [s["start"] for s in segmentos]
+    assert tempo_lote < tempo_loop
+
+
+def test_traducao_multi_tokeniza_uma_vez(monkeypatch):
+    """Vários destinos: um modelo, uma tokenização, cada destino traduzido com o seu tgt_lang."""
+    from contextlib import contextmanager
+    from src.services import translation
+
+    chamadas = {"tokenizer": 0, "destinos": []}
+
+    class PipeFalso:
+        def tokenizer(self, textos):
+            chamadas["tokenizer"] += 1
+            return {"input_ids": [t.split() for t in textos]}
+
+        def __call__(self, textos, src_lang, tgt_lang, **kwargs):
+            chamadas["destinos"].append(tgt_lang)
+            return [{"translation_text": f"{tgt_lang[:3]}:{t}"} for t in textos]
+
+    class RegistroFalso:
+        @contextmanager
+        def usar(self, *args, **kwargs):
+            yield PipeFalso()
+
+    monkeypatch.setattr(translation, "obter_registro", lambda: RegistroFalso())
+    monkeypatch.setattr(translation, "obter_device", lambda: "cpu")
+    monkeypatch.setattr(translation, "backend_efetivo", lambda: "float32")
+
+    segmentos = _segmentos_benchmark(7) + [{"start": 9.0, "end": 9.5, "text": "  "}]
+    resultado = translation.traduzir_multi(segmentos, "eng_Latn", ["por_Latn", "spa_Latn", "por_Latn"],
+                                           usar_cache=False)
+
+    assert list(resultado) == ["por_Latn", "spa_Latn"]
+    assert chamadas["tokenizer"] == 1
+    assert set(chamadas["destinos"]) == {"por_Latn", "spa_Latn"}
+    for destino, prefixo in (("por_Latn", "por"), ("spa_Latn", "spa")):
+        assert [s["text"] for s in resultado[destino]] == [f"{prefixo}:{s['text']}" for s in segmentos[:7]]
+        assert [s["start"] for s in resultado[destino]] == [s["start"] for s in segmentos[:7]]
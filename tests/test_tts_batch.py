@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+
+def _textos_benchmark(n):
+    frases = [
+        "Olá e bem-vindos a este vídeo.",
+        "Hoje vamos falar sobre aprendizado de máquina e como ele muda a forma de construir software.",
+        "Obrigado.",
+        "Vamos começar com uma visão geral rápida das ferramentas que usaremos nas próximas seções.",
+        "Isso é importante.",
+        "",
+    ]
+    return [frases[i % len(frases)] for i in range(n)]
+
+
+@pytest.fixture(scope="module")
+def tts_mms():
+    from src.services.tts import TTSEngine
+    try:
+        return TTSEngine(motor="mms", idioma="por", usar_cache=False)
+    except Exception as e:
+        pytest.skip(f"MMS-TTS indisponível: {e}")
+
+
+def test_mms_lote_preserva_ordem_e_vazios(tts_mms):
+    """Textos vazios retornam (None, None) e a ordem de saída segue a entrada."""
+    textos = ["Um texto bem mais longo que os outros para forçar outro lote.", "", "Curto."]
+    audios = tts_mms.sintetizar_batch(textos)
+
+    assert len(audios) == 3
+    assert audios[1] == (None, None)
+    assert audios[0][1] == tts_mms.sample_rate
+    # O texto longo gera mais amostras que o curto (corte pela duração prevista)
+    assert len(audios[0][0]) > len(audios[2][0])
+
+
+def test_benchmark_mms_lote_vs_loop(tts_mms):
+    """
+    Compara a síntese MMS em lote com o loop anterior (um forward por texto)
+    em 320 segmentos.
+    """
+    import torch
+    from src.config import DEVICE
+
+    textos = _textos_benchmark(320)
+    model = tts_mms.config["model"]
+    tokenizer = tts_mms.config["tokenizer"]
+
+    # Loop anterior: um forward por segmento
+    inicio = time.time()
+    loop = []
+    with torch.no_grad():
+        for texto in textos:
+            clean = "".join([c for c in texto if c.isalnum() or c in " ,.?!"])
+            if not clean.strip():
+                loop.append(None)
+                continue
+            inputs = tokenizer(clean, return_tensors="pt").to(DEVICE)
+            loop.append(model(**inputs).waveform.cpu().numpy().squeeze())
+    tempo_loop = time.time() - inicio
+
+    inicio = time.time()
+    em_lote = tts_mms.sintetizar_batch(textos)
+    tempo_lote = time.time() - inicio
+
+    print(f"\nLoop: {tempo_loop:.1f}s | Lote: {tempo_lote:.1f}s | speedup: {tempo_loop / tempo_lote:.2f}x")
+
+    assert len(em_lote) == len(textos)
+    for ref, (audio, _) in zip(loop, em_lote):
+        assert (ref is None) == (audio is None)
+        if ref is not None:
+            # VITS é estocástico: comparar apenas a ordem de grandeza da duração
+            assert 0.5 < len(audio) / len(ref) < 2.0
+    assert tempo_lote < tempo_loop
+
+
+def test_qwen3_clone_calcula_prompt_uma_vez(tmp_path, monkeypatch):
+    """O prompt de voz é calculado uma vez por motor e reaproveitado do cache por outros jobs."""
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("qwen_tts")
+    from src.services import tts as modulo_tts
+    from src.services.cache import CacheResultados
+    from src.services.tts import TTSEngine
+
+    try:
+        from qwen_tts import VoiceClonePromptItem
+    except ImportError:
+        from qwen_tts.inference.qwen3_tts_model import VoiceClonePromptItem
+
+    class Qwen3Falso:
+        def __init__(self):
+            self.prompts = 0
+            self.recebidos = []
+
+        def create_voice_clone_prompt(self, ref_audio, ref_text="", x_vector_only_mode=False):
+            self.prompts += 1
+            return [VoiceClonePromptItem(ref_code=None, ref_spk_embedding=torch.ones(4, dtype=torch.bfloat16),
+                                         x_vector_only_mode=True, icl_mode=False, ref_text=None)]
+
+        def generate_voice_clone(self, text, language, voice_clone_prompt):
+            self.recebidos.append(voice_clone_prompt)
+            return [np.zeros(1200, dtype=np.float32) for _ in text], 12000
+
+    ref = tmp_path / "referencia.wav"
+    ref.write_bytes(b"RIFF-referencia")
+    cache = CacheResultados(str(tmp_path / "cache"))
+    monkeypatch.setattr(modulo_tts, "obter_cache", lambda: cache)
+    monkeypatch.setattr(modulo_tts, "obter_device", lambda: "cpu")
+
+    def motor(falso):
+        engine = TTSEngine(motor="qwen3", idioma="por", ref_wav=str(ref), qwen3_mode="clone",
+                           log_callback=lambda m: None)
+        engine.config["model"] = falso
+        engine._modelo_carregado = True
+        engine._modelo_qwen3 = "Qwen/Qwen3-TTS-12Hz-1.7B-Base"
+        engine.qwen3_language = "Portuguese"
+        return engine
+
+    primeiro = Qwen3Falso()
+    audios = motor(primeiro).sintetizar_batch(["um", "dois", "três"])
+    assert primeiro.prompts == 1 and len(primeiro.recebidos) == 1 and len(primeiro.recebidos[0]) == 3
+    assert all(a is not None for a, _ in audios)
+
+    # Outro job com o mesmo falante: prompt vem do cache em disco
+    segundo = Qwen3Falso()
+    motor(segundo).sintetizar_batch(["quatro"])
+    assert segundo.prompts == 0
+    assert segundo.recebidos[0][0].ref_spk_embedding.dtype == torch.bfloat16
+
+
+def test_qwen3_lotes_por_comprimento_com_backoff_de_oom(monkeypatch):
+    """Lotes saem em uma chamada cada, em ordem; OOM reduz o lote e falhas isolam o segmento."""
+    from src.services import tts as modulo_tts
+    from src.services.tts import TTSEngine
+
+    class Qwen3Falso:
+        def __init__(self):
+            self.lotes = []
+
+        def generate_custom_voice(self, text, language, speaker, instruct):
+            assert len(language) == len(speaker) == len(instruct) == len(text)
+            if len(text) > 2:
+                raise RuntimeError("CUDA out of memory")
+            if "falha" in text:
+                raise ValueError("texto inválido")
+            self.lotes.append(list(text))
+            # Áudio com tantas amostras quanto caracteres: identifica o texto
+            return [np.full(len(t) * 100, len(t), dtype=np.float32) for t in text], 12000
+
+    monkeypatch.setattr(modulo_tts, "obter_cache", lambda: None)
+    monkeypatch.setattr(TTSEngine, "_garantir_modelo", lambda self: None)
+    engine = TTSEngine(motor="qwen3", idioma="por", qwen3_mode="custom", log_callback=lambda m: None)
+    falso = Qwen3Falso()
+    engine.config["model"] = falso
+    engine.speaker = "vivian"
+    engine.qwen3_language = "Portuguese"
+    engine._modelo_qwen3 = "Qwen/Qwen3-TTS-12Hz-0.6B-CustomVoice"
+
+    textos = ["um texto médio", "", "curto", "um texto bem mais longo que os outros", "falha", "xy"]
+    audios = engine.sintetizar_batch(textos)
+
+    assert audios[1] == (None, None) and audios[4] == (None, None)
+    for texto, (audio, sr) in zip(textos, audios):
+        if audio is not None:
+            assert sr == 12000 and len(audio) == len(texto) * 100
+    # Após o OOM, lotes de até 2 itens, do maior texto para o menor
+    assert all(len(lote) <= 2 for lote in falso.lotes)
+    assert falso.lotes[0][0] == "um texto bem mais longo que os outros"
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.services import audio
+from src.services.models import ModelRegistry
+from src.services.vad import detectar_fala
+
+SR = 16000
+# Trechos com "fala" (tom modulado) num fundo de ruído baixo
+FALAS = [(2.0, 5.0), (5.3, 7.0), (20.0, 22.5), (40.0, 95.0)]
+
+
+def _audio_sintetico(duracao=120.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duracao * SR)) / SR
+    sinal = rng.normal(0, 0.001, len(t))
+    for inicio, fim in FALAS:
+        m = (t >= inicio) & (t < fim)
+        sinal[m] += 0.3 * np.sin(2 * np.pi * 220 * t[m]) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t[m]))
+    return sinal.astype(np.float32)
+
+
+def test_vad_detecta_regioes_e_divide_longas():
+    """Pausas curtas são unidas, o silêncio fica de fora e nenhuma região passa de 30s."""
+    regioes = detectar_fala(_audio_sintetico(), SR)
+
+    assert regioes[0][0] < 2.0 < regioes[0][1] and regioes[0][1] >= 7.0  # 2-5 e 5.3-7 unidas
+    assert any(i <= 20.0 and f >= 22.5 for i, f in regioes)
+    assert all(f - i <= 30.0 + 1e-6 for i, f in regioes)
+    assert all(a[1] <= b[0] for a, b in zip(regioes, regioes[1:]))
+    # Cobertura da fala longa (40-95s) por regiões contíguas
+    longas = [r for r in regioes if r[0] >= 39.0]
+    assert longas[0][0] <= 40.0 and longas[-1][1] >= 95.0 and len(longas) >= 2
+    fala = sum(f - i for i, f in regioes)
+    assert fala < 0.6 * 120
+
+
+class _WhisperLoteFalso:
+    """Devolve uma palavra no início de cada entrada, com tempo relativo."""
+    def __init__(self):
+        self.chamadas = []
+
+    def __call__(self, entradas, return_timestamps=None, batch_size=None):
+        self.chamadas.append(len(entradas))
+        return [{"chunks": [{"text": f" p{len(e['raw'])}.", "timestamp": (0.5, 0.9)}]} for e in entradas]
+
+
+def test_whisper_recebe_so_as_regioes_em_lotes(monkeypatch, tmp_path):
+    """Timestamps voltam para a linha do tempo original; lotes respeitam o tamanho."""
+    caminho = str(tmp_path / "audio.wav")
+    sf.write(caminho, _audio_sintetico(), SR, subtype="PCM_16")
+    falso = _WhisperLoteFalso()
+    monkeypatch.setattr(audio, "obter_registro", lambda: ModelRegistry())
+    monkeypatch.setattr(audio, "_carregador_whisper", lambda modelo: (lambda: falso, "float32"))
+
+    regioes = [(2.0, 7.0), (20.0, 23.0), (40.0, 60.0)]
+    segmentos = list(audio.transcrever_regioes_fala(caminho, "teste/whisper-falso", regioes=regioes,
+                                                    tamanho_lote=2, log_callback=lambda m: None))
+
+    assert falso.chamadas == [2, 1]
+    assert [round(s["start"], 2) for s in segmentos] == [2.5, 20.5, 40.5]
+    assert [s["text"] for s in segmentos] == [f"p{int(round((f - i) * SR))}." for i, f in regioes]
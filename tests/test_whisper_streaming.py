@@ -0,0 +1,117 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.services import audio
+from src.services.models import ModelRegistry
+
+SR = 16000
+ESCALA = 10000.0
+
+
+def _palavras_sinteticas(duracao, rng):
+    """Palavras com pausas variadas e pontuação ocasional ao longo do áudio."""
+    palavras = []
+    t = 0.2
+    n = 0
+    while t < duracao - 1.0:
+        dur = rng.uniform(0.15, 0.5)
+        texto = f"w{n}" + ("." if rng.random() < 0.08 else "")
+        palavras.append({"text": f" {texto}", "timestamp": (round(t, 3), round(t + dur, 3))})
+        t += dur + (rng.uniform(0.6, 1.5) if rng.random() < 0.1 else rng.uniform(0.02, 0.2))
+        n += 1
+    return palavras
+
+
+class _WhisperFalso:
+    """
+    Simula a pipeline ASR: descobre o início absoluto da janela pelo valor
+    da primeira amostra (o WAV de teste codifica o tempo em cada amostra) e
+    devolve as palavras contidas na janela com timestamps relativos.
+    """
+    def __init__(self, palavras):
+        self.palavras = palavras
+        self.chamadas = 0
+
+    def __call__(self, entrada, return_timestamps=None):
+        self.chamadas += 1
+        raw = entrada["raw"]
+        t0 = float(raw[0]) * ESCALA
+        t1 = t0 + len(raw) / entrada["sampling_rate"]
+        chunks = [
+            {"text": p["text"], "timestamp": (p["timestamp"][0] - t0, p["timestamp"][1] - t0)}
+            for p in self.palavras
+            if p["timestamp"][0] >= t0 and p["timestamp"][1] <= t1
+        ]
+        return {"text": "".join(c["text"] for c in chunks), "chunks": chunks}
+
+
+@pytest.fixture
+def wav_temporal(tmp_path):
+    """WAV float32 de 5 minutos cujas amostras valem t / ESCALA."""
+    duracao = 300
+    amostras = (np.arange(duracao * SR, dtype=np.float64) / SR / ESCALA).astype(np.float32)
+    caminho = str(tmp_path / "audio.wav")
+    sf.write(caminho, amostras, SR, subtype="FLOAT")
+    return caminho, duracao
+
+
+def test_memmap_le_pcm16_estereo(tmp_path):
+    """O memmap respeita canais e converte PCM16 para float mono."""
+    caminho = str(tmp_path / "estereo.wav")
+    dados = np.stack([np.full(SR, 0.5), np.full(SR, -0.5)], axis=1)
+    sf.write(caminho, dados, SR, subtype="PCM_16")
+
+    amostras, sr, n = audio._abrir_wav_memmap(caminho)
+    assert sr == SR and n == SR and amostras.shape == (SR, 2)
+    mono = audio._janela_mono_float32(amostras, 0, 100)
+    assert mono.dtype == np.float32
+    assert np.allclose(mono, 0.0, atol=1e-3)
+
+
+def test_streaming_equivale_a_transcricao_completa(monkeypatch, wav_temporal):
+    """Os segmentos costurados das janelas são iguais aos da transcrição inteira."""
+    caminho, duracao = wav_temporal
+    palavras = _palavras_sinteticas(duracao, np.random.default_rng(42))
+    falso = _WhisperFalso(palavras)
+
+    monkeypatch.setattr(audio, "obter_registro", lambda: ModelRegistry())
+    monkeypatch.setattr(audio, "_carregador_whisper", lambda modelo: (lambda: falso, "float32"))
+
+    esperado = audio._processar_chunks_whisper({"chunks": palavras})
+    gerador = audio.transcrever_audio_whisper_stream(caminho, "teste/whisper-falso",
+                                                     janela_s=30, sobreposicao_s=5, log_callback=lambda m: None)
+
+    primeiro = next(gerador)
+    # O primeiro segmento sai antes de todas as janelas serem processadas
+    assert falso.chamadas < 3
+    obtido = [primeiro] + list(gerador)
+
+    assert falso.chamadas == 12
+    assert [s["text"] for s in obtido] == [s["text"] for s in esperado]
+    assert np.allclose([s["start"] for s in obtido], [s["start"] for s in esperado], atol=1e-3)
+    assert np.allclose([s["end"] for s in obtido], [s["end"] for s in esperado], atol=1e-3)
+
+
+def test_extracao_unica_alimenta_referencia(tmp_path):
+    """O áudio sai em 16 kHz mono PCM16 e a referência de voz é recortada dele."""
+    origem = str(tmp_path / "origem.wav")
+    t = np.arange(3 * 44100) / 44100
+    sf.write(origem, np.stack([np.sin(2 * np.pi * 440 * t)] * 2, axis=1) * 0.5, 44100)
+    extraido = str(tmp_path / "audio_extraido.wav")
+    if not audio.extrair_audio(origem, extraido, log_callback=lambda m: None):
+        pytest.skip("FFmpeg indisponível")
+
+    amostras, sr, n = audio._abrir_wav_memmap(extraido)
+    assert sr == audio.AUDIO_SR and amostras.shape[1] == 1 and amostras.dtype == np.int16
+    assert abs(n / sr - 3.0) < 0.05
+
+    referencia = str(tmp_path / "referencia.wav")
+    assert audio.extrair_referencia_voz(extraido, referencia, duracao=2, log_callback=lambda m: None)
+    dados, sr_ref = sf.read(referencia)
+    assert sr_ref == sr and len(dados) == 2 * sr